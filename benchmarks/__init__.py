@@ -0,0 +1,6 @@
+""" Benchmarks of the hot paths of the fuzzy logic system and the car controller. """
+from .harness import (
+    Benchmark, BenchmarkResult, measure, run_benchmarks, compare,
+    MemoryBenchmark, MemoryResult, measure_memory, compare_memory
+)
+from .cases import BENCHMARKS, MEMORY_BENCHMARKS
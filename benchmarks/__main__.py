@@ -0,0 +1,91 @@
+""" Runs the benchmarks, writes their results as JSON and compares them with a stored baseline. """
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import sys
+
+import numpy as np
+
+from benchmarks import BENCHMARKS, MEMORY_BENCHMARKS, BenchmarkResult, MemoryResult, run_benchmarks, compare, measure_memory, compare_memory
+
+# baseline stored in the repository
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def parse_arguments():
+    """ Parses provided command line arguments. """
+    parser = argparse.ArgumentParser(description='Benchmarks of the fuzzy logic system and the car controller')
+    parser.add_argument('-k', '--filter', metavar='PATTERN', help='run only the benchmarks whose names match the (glob) pattern')
+    parser.add_argument('-o', '--output', metavar='FILE', help='write the results to a JSON file (instead of the standard output)')
+    parser.add_argument('-b', '--baseline', metavar='FILE', default=DEFAULT_BASELINE, help='JSON file with the baseline results')
+    parser.add_argument('-t', '--tolerance', default=0.25, type=float, help='allowed relative drop of the throughput')
+    parser.add_argument('-s', '--save-baseline', action='store_true', help='store the results as the new baseline instead of comparing them')
+    parser.add_argument('-mt', '--min-sample-time', default=0.01, type=float, help='minimal duration of a timed sample [s]')
+    return parser.parse_args()
+
+
+def report(result: BenchmarkResult):
+    """ Prints a human readable line of the result. """
+    print(f'{result.name:<48} {result.ops_per_sec:>14,.1f} ops/s  p50={result.p50 * 1e6:,.2f}us  p99={result.p99 * 1e6:,.2f}us',
+          file=sys.stderr)
+
+
+def report_memory(result: MemoryResult):
+    """ Prints a human readable line of the memory result. """
+    print(f'{result.name:<48} {result.bytes_per_100k_nodes / 2 ** 20:>14,.2f} MiB per 100k nodes', file=sys.stderr)
+
+
+def main():
+    """ Main entrypoint. """
+    args = parse_arguments()
+    benchmarks = [b for b in BENCHMARKS if args.filter is None or fnmatch.fnmatch(b.name, args.filter)]
+    results = run_benchmarks(benchmarks, args.min_sample_time, callback=report)
+    memory_results = [
+        measure_memory(benchmark)
+        for benchmark in MEMORY_BENCHMARKS
+        if args.filter is None or fnmatch.fnmatch(benchmark.name, args.filter)
+    ]
+    for result in memory_results:
+        report_memory(result)
+
+    document = {
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'system': platform.system(),
+        },
+        'results': {result.name: result.to_dict() for result in results},
+        'memory': {result.name: result.to_dict() for result in memory_results},
+    }
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(document, file, indent=2)
+        sys.exit()
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(document, file, indent=2)
+    else:
+        json.dump(document, sys.stdout, indent=2)
+        print()
+
+    if not os.path.exists(args.baseline):
+        print(f'No baseline found at {args.baseline}', file=sys.stderr)
+        sys.exit()
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results, baseline['results'], args.tolerance)
+    for name, change in regressions.items():
+        print(f'REGRESSION {name}: throughput {change:+.1%} against the baseline', file=sys.stderr)
+    memory_regressions = compare_memory(memory_results, baseline.get('memory', {}), args.tolerance)
+    for name, change in memory_regressions.items():
+        print(f'REGRESSION {name}: memory {change:+.1%} against the baseline', file=sys.stderr)
+    sys.exit(1 if regressions or memory_regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
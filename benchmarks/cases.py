@@ -0,0 +1,148 @@
+import functools
+import random
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+import fuzzy_logic as fl
+from car_controller import CarController, CarSimulation
+from benchmarks.harness import Benchmark, MemoryBenchmark
+
+
+def membership_call(points: int) -> Callable[[], object]:
+    """ Evaluation of a piecewise membership with the given number of breakpoints. """
+    xs = np.linspace(0.0, 100.0, points)
+    membership = fl.PiecewiseMembership(list(zip(xs.tolist(), (np.arange(points) % 2).tolist())))
+    return functools.partial(membership, 37.3)
+
+
+def _tree(depth: int, variables: List[str], rng: random.Random, width: float = 50.0) -> fl.Expression:
+    """ Balanced expression tree of the given depth with random terms (of the given width) in its leaves. """
+    if depth == 0:
+        variable = rng.choice(variables)
+        low = rng.uniform(0.0, 100.0 - width)
+        return fl.Term(variable, f'{variable}_{low:.3f}', fl.TriangularMembership(low, low + width / 2, low + width))
+    left, right = _tree(depth - 1, variables, rng, width), _tree(depth - 1, variables, rng, width)
+    expression = left & right if depth % 2 else left | right
+    return ~expression if depth % 3 == 0 else expression
+
+
+def expression_call(depth: int) -> Callable[[], object]:
+    """ Evaluation of an expression tree of the given depth. """
+    expression = _tree(depth, ['a', 'b', 'c'], random.Random(depth))
+    return functools.partial(expression, a=30.0, b=40.0, c=50.0)
+
+
+def _system(rules: int, outputs: int, compiled: bool = True, sparse: bool = False, depth: int = 2, width: float = 50.0) -> fl.System:
+    """
+    System with the given number of rules (of the given depth) spread across the given number of output variables,
+    narrow memberships (of the inputs ranging from 0 to 100) make the rules sparse.
+    """
+    rng = random.Random(rules * outputs)
+    consequents = [
+        fl.Term(f'out{o}', f'label{i}', fl.TriangularMembership(10.0 * i, 10.0 * i + 5.0, 10.0 * i + 10.0))
+        for o in range(outputs) for i in range(5)
+    ]
+    return fl.System(*(
+        _tree(depth, ['a', 'b', 'c'], rng, width) >> consequents[r % len(consequents)]
+        for r in range(rules)
+    ), compiled=compiled, sparse=sparse)
+
+
+def system_call(rules: int, outputs: int, compiled: bool = True, sparse: bool = False, depth: int = 2, width: float = 50.0) -> Callable[[], object]:
+    """ Evaluation of a system (see `_system()`) for a single input. """
+    system = _system(rules, outputs, compiled, sparse, depth, width)
+    return functools.partial(system, a=30.0, b=40.0, c=50.0)
+
+
+def system_batch(rules: int, outputs: int, size: int) -> Callable[[], object]:
+    """ Evaluation of a system (see `_system()`) for a batch of the given number of inputs at once. """
+    system = _system(rules, outputs)
+    rng = np.random.default_rng(size)
+    inputs = {variable: rng.uniform(0.0, 100.0, size) for variable in 'abc'}
+    return functools.partial(system.evaluate_batch, inputs)
+
+
+def rule_base(nodes: int, variables: int = 10, labels: int = 20) -> Tuple[List[fl.Rule], int]:
+    """
+    Generated rule base of (about) the given number of expression nodes, `(a & b) | ~c >> x` per rule, whose terms
+    are built anew for each use from a fixed set of definitions (as when they are loaded from JSON).
+    """
+    rng = random.Random(nodes)
+    definitions = [
+        (f'in{v}', f'label{i}', [[10.0 * i, 0.0], [10.0 * i + 5.0, 1.0], [10.0 * i + 10.0, 0.0]])
+        for v in range(variables) for i in range(labels)
+    ]
+
+    def term(variable: str, label: str, points: List[List[float]]) -> fl.Term:
+        return fl.Term(variable, label, fl.PiecewiseMembership(points))
+
+    rules = [
+        ((term(*rng.choice(definitions)) & term(*rng.choice(definitions))) | ~term(*rng.choice(definitions)))
+        >> term('out', f'label{r % labels}', definitions[r % labels][2])
+        for r in range(nodes // 6)
+    ]
+    return rules, 6 * len(rules)
+
+
+def controller_call(lut: bool = False) -> Callable[[], object]:
+    """ Single decision of the car controller. """
+    car_controller = CarController()
+    if lut:
+        car_controller.compile_lut()
+    return functools.partial(car_controller, car_speed=20.0, obstacle_distance=30.0, obstacle_relative_speed=-3.0)
+
+
+def controller_batch(size: int, lut: bool = False) -> Callable[[], object]:
+    """ Decisions of the car controller for a batch of the given number of situations at once. """
+    car_controller = CarController()
+    if lut:
+        car_controller.compile_lut()
+    rng = np.random.default_rng(size)
+    return functools.partial(
+        car_controller.evaluate_batch,
+        rng.uniform(0.0, 40.0, size),
+        rng.uniform(0.0, 100.0, size),
+        rng.uniform(-20.0, 20.0, size)
+    )
+
+
+def simulation_simulate(simulation_time: float) -> Callable[[], object]:
+    """ Simulation of an obstacle braking in front of the car over the given horizon. """
+    car_controller = CarController()
+
+    def simulate():
+        simulation = CarSimulation(initial_car_speed=20.0, initial_obstacle_position=50.0, initial_obstacle_speed=20.0)
+        simulation.simulate(car_controller, lambda t: -2.0 if 5.0 <= t < 12.0 else 0.0, simulation_time)
+
+    return simulate
+
+
+BENCHMARKS = [
+    *(Benchmark(f'membership_call[points={n}]', functools.partial(membership_call, n)) for n in (3, 10, 100, 1000)),
+    *(Benchmark(f'expression_call[depth={d}]', functools.partial(expression_call, d)) for d in (1, 3, 6, 9)),
+    *(
+        Benchmark(f'system_call[rules={r},outputs={o}]', functools.partial(system_call, r, o))
+        for r in (10, 100) for o in (1, 4)
+    ),
+    Benchmark('system_call[rules=100,outputs=4,interpreted]', functools.partial(system_call, 100, 4, compiled=False)),
+    Benchmark('system_call[rules=500,outputs=4,narrow]', functools.partial(system_call, 500, 4, depth=1, width=20.0)),
+    Benchmark('system_call[rules=500,outputs=4,narrow,sparse]', functools.partial(system_call, 500, 4, sparse=True, depth=1, width=20.0)),
+    *(
+        Benchmark(f'system_batch[rules=100,outputs=4,size={n}]', functools.partial(system_batch, 100, 4, n))
+        for n in (1000, 10000)
+    ),
+    Benchmark('controller_call', controller_call),
+    Benchmark('controller_call[lut]', functools.partial(controller_call, lut=True)),
+    Benchmark('controller_batch[size=100000]', functools.partial(controller_batch, 100000)),
+    Benchmark('controller_batch[size=100000,lut]', functools.partial(controller_batch, 100000, lut=True)),
+    *(
+        Benchmark(f'simulation_simulate[time={t:g}]', functools.partial(simulation_simulate, t), repeat=5)
+        for t in (60.0, 600.0)
+    ),
+]
+
+MEMORY_BENCHMARKS = [
+    MemoryBenchmark('rule_base[nodes=100000]', functools.partial(rule_base, 100_000)),
+    MemoryBenchmark('rule_base[nodes=100000,distinct]', functools.partial(rule_base, 100_000, labels=10_000)),
+]
@@ -0,0 +1,163 @@
+import gc
+import time
+import tracemalloc
+from typing import Callable, NamedTuple, Dict, List, Iterable, Optional, Tuple
+
+import numpy as np
+
+
+class Benchmark(NamedTuple):
+    """
+    Benchmarked operation. `setup` is called once (outside of the measurement) and returns the function that
+    performs a single operation, `repeat` is the number of timed samples.
+    """
+    name: str
+    setup: Callable[[], Callable[[], object]]
+    repeat: int = 30
+
+
+class BenchmarkResult(NamedTuple):
+    """ Statistics of the duration of a single operation (in seconds) over all the samples of a benchmark. """
+    name: str
+    ops_per_sec: float
+    mean: float
+    stdev: float
+    min: float
+    p50: float
+    p90: float
+    p99: float
+    samples: int
+    number: int
+
+    def to_dict(self) -> Dict:
+        return self._asdict()
+
+
+class MemoryBenchmark(NamedTuple):
+    """ Memory retained by a structure. `setup` builds it and returns it together with the number of its nodes. """
+    name: str
+    setup: Callable[[], Tuple[object, int]]
+
+
+class MemoryResult(NamedTuple):
+    """ Memory (in bytes) retained by a structure, in total and scaled to 100k of its nodes. """
+    name: str
+    bytes: int
+    nodes: int
+    bytes_per_100k_nodes: float
+
+    def to_dict(self) -> Dict:
+        return self._asdict()
+
+
+def measure(benchmark: Benchmark, min_sample_time: float = 0.01) -> BenchmarkResult:
+    """
+    Measures the given benchmark. The number of operations per sample is calibrated so that a sample
+    takes at least `min_sample_time` (to amortize the timer overhead), the garbage collector is disabled
+    during the measurement. Operations per second are derived from the median.
+    """
+    operation = benchmark.setup()
+
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            operation()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_sample_time:
+            break
+        number = max(number * 2, int(number * min_sample_time / elapsed) + 1) if elapsed > 0 else number * 10
+
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        samples = []
+        for _ in range(benchmark.repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                operation()
+            samples.append((time.perf_counter() - start) / number)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    samples = np.array(samples)
+    p50, p90, p99 = np.percentile(samples, [50, 90, 99]).tolist()
+    return BenchmarkResult(
+        name=benchmark.name,
+        ops_per_sec=1.0 / p50,
+        mean=float(samples.mean()),
+        stdev=float(samples.std()),
+        min=float(samples.min()),
+        p50=p50,
+        p90=p90,
+        p99=p99,
+        samples=len(samples),
+        number=number
+    )
+
+
+def measure_memory(benchmark: MemoryBenchmark) -> MemoryResult:
+    """
+    Measures the memory allocated by the setup of the given benchmark that is still retained once it returns
+    (traced by `tracemalloc`, so it includes the memory of the objects themselves, not of the allocator).
+    """
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        structure, nodes = benchmark.setup()
+        gc.collect()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del structure
+
+    return MemoryResult(
+        name=benchmark.name,
+        bytes=after - before,
+        nodes=nodes,
+        bytes_per_100k_nodes=(after - before) * 100_000 / nodes
+    )
+
+
+def run_benchmarks(benchmarks: Iterable[Benchmark],
+                   min_sample_time: float = 0.01,
+                   callback: Optional[Callable[[BenchmarkResult], None]] = None) -> List[BenchmarkResult]:
+    """ Measures all the given benchmarks, calling the callback after each of them. """
+    results = []
+    for benchmark in benchmarks:
+        result = measure(benchmark, min_sample_time)
+        if callback is not None:
+            callback(result)
+        results.append(result)
+    return results
+
+
+def compare(results: Iterable[BenchmarkResult], baseline: Dict[str, Dict], tolerance: float = 0.25) -> Dict[str, float]:
+    """
+    Compares the results with the baseline (results of a previous run as dictionaries, keyed by name).
+    Returns the relative changes of the throughput of the benchmarks where it dropped by more than the tolerance,
+    benchmarks missing from the baseline are skipped. The throughput is compared by the fastest samples,
+    as the noise of a busy machine only ever slows the samples down.
+    """
+    regressions = {}
+    for result in results:
+        if result.name not in baseline:
+            continue
+        change = baseline[result.name]['min'] / result.min - 1.0
+        if change < -tolerance:
+            regressions[result.name] = change
+    return regressions
+
+
+def compare_memory(results: Iterable[MemoryResult], baseline: Dict[str, Dict], tolerance: float = 0.25) -> Dict[str, float]:
+    """ Relative growths of the memory per node of the benchmarks where it grew by more than the tolerance. """
+    regressions = {}
+    for result in results:
+        if result.name not in baseline:
+            continue
+        change = result.bytes_per_100k_nodes / baseline[result.name]['bytes_per_100k_nodes'] - 1.0
+        if change > tolerance:
+            regressions[result.name] = change
+    return regressions
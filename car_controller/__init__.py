@@ -1,3 +1,60 @@
-""" Module that implements the given task of controlling the acceleration of a car. """
-from .controller import CarController
-from .simulation import CarSimulation
+"""
+Module that implements the given task of controlling the acceleration of a car.
+Submodules are imported lazily, on the first access to any of their names, so importing the package is cheap.
+"""
+import importlib
+
+# typing is not imported just for this (type checkers treat the constant as if it was)
+TYPE_CHECKING = False
+
+# public names and the submodules that define them
+_EXPORTS = {
+    'CarController': 'controller',
+    'CarSimulation': 'simulation',
+    'BatchCarSimulation': 'simulation',
+    'PulseAcceleration': 'simulation',
+    'LookupTable': 'lut',
+    'Scenario': 'sweep',
+    'SweepResult': 'sweep',
+    'scenario_grid': 'sweep',
+    'run_sweep': 'sweep',
+    'CostWeights': 'optimizer',
+    'OptimizationResult': 'optimizer',
+    'MembershipEncoding': 'optimizer',
+    'MembershipOptimizer': 'optimizer',
+    'evaluate_cost': 'optimizer',
+    'ControllerCache': 'cache',
+    'BulkReport': 'bulk',
+    'run_bulk': 'bulk',
+    'ControllerServer': 'server',
+    'serve': 'server',
+}
+_SUBMODULES = {'controller', 'simulation', 'lut', 'sweep', 'optimizer', 'cache', 'bulk', 'server'}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .controller import CarController
+    from .simulation import CarSimulation, BatchCarSimulation, PulseAcceleration
+    from .lut import LookupTable
+    from .sweep import Scenario, SweepResult, scenario_grid, run_sweep
+    from .optimizer import CostWeights, OptimizationResult, MembershipEncoding, MembershipOptimizer, evaluate_cost
+    from .cache import ControllerCache
+    from .bulk import BulkReport, run_bulk
+    from .server import ControllerServer, serve
+
+
+def __getattr__(name: str):
+    """ Imports the submodule that defines the given name (once, the name is then cached in this module). """
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
@@ -0,0 +1,154 @@
+import csv
+import io
+import itertools
+import sys
+import time
+from typing import NamedTuple, BinaryIO, Iterable, Iterator, Optional, TextIO, Tuple
+
+import numpy as np
+
+from car_controller.controller import CarController, INPUTS
+
+# column of the written accelerations
+OUTPUT_COLUMN = 'car_acceleration'
+
+# size of the buffers of the streamed files
+BUFFER_SIZE = 1 << 20
+
+# chunk of the inputs - an array per input variable (in the order of INPUTS)
+Chunk = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+class BulkReport(NamedTuple):
+    """ Summary of a bulk evaluation. """
+    rows: int
+    chunks: int
+    seconds: float
+
+    @property
+    def throughput(self) -> float:
+        """ Evaluated rows per second (including reading and writing). """
+        return self.rows / self.seconds if self.seconds > 0 else float('inf')
+
+
+def read_csv_chunks(file: TextIO, chunk_size: int = 65536) -> Iterator[Chunk]:
+    """
+    Reads the input columns from a CSV file (with a header naming the columns, other columns are ignored)
+    in chunks of at most `chunk_size` rows.
+    """
+    header = next(csv.reader([file.readline()]), None)
+    if not header:
+        return
+    header = [name.strip() for name in header]
+    missing = [name for name in INPUTS if name not in header]
+    if missing:
+        raise ValueError(f'missing input columns: {", ".join(missing)}')
+    columns = [header.index(name) for name in INPUTS]
+
+    while True:
+        lines = list(itertools.islice(file, chunk_size))
+        if not lines:
+            return
+        values = np.loadtxt(lines, delimiter=',', usecols=columns, dtype=float, ndmin=2)
+        yield values[:, 0], values[:, 1], values[:, 2]
+
+
+def read_npy_chunks(path: str, chunk_size: int = 65536) -> Iterator[Chunk]:
+    """
+    Reads the inputs from a NPY file in chunks of at most `chunk_size` rows. The file is mapped (not loaded), it is
+    either a structured array with fields named by the inputs, or a 2D array with a column per input (in their order).
+    """
+    array = np.load(path, mmap_mode='r')
+    if array.dtype.names is not None:
+        missing = [name for name in INPUTS if name not in array.dtype.names]
+        if missing:
+            raise ValueError(f'missing input fields: {", ".join(missing)}')
+    elif array.ndim != 2 or array.shape[1] != len(INPUTS):
+        raise ValueError(f'expected an array of shape (N, {len(INPUTS)}), got {array.shape}')
+
+    for start in range(0, len(array), chunk_size):
+        chunk = array[start:start + chunk_size]
+        if array.dtype.names is not None:
+            yield tuple(np.asarray(chunk[name], dtype=float) for name in INPUTS)
+        else:
+            chunk = np.asarray(chunk, dtype=float)
+            yield chunk[:, 0], chunk[:, 1], chunk[:, 2]
+
+
+def evaluate_chunks(controller: CarController, chunks: Iterable[Chunk]) -> Iterator[np.ndarray]:
+    """ Evaluates the controller for each chunk of the inputs by a single batch evaluation. """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for car_speed, obstacle_distance, obstacle_relative_speed in chunks:
+            yield controller.evaluate_batch(car_speed, obstacle_distance, obstacle_relative_speed)
+
+
+def write_csv_chunks(chunks: Iterable[np.ndarray], file: TextIO) -> Tuple[int, int]:
+    """ Writes the accelerations to a single column CSV file, returns the number of rows and chunks. """
+    file.write(OUTPUT_COLUMN + '\n')
+    rows = count = 0
+    for chunk in chunks:
+        if len(chunk):
+            file.write('\n'.join(map(repr, chunk.tolist())))
+            file.write('\n')
+        rows += len(chunk)
+        count += 1
+    return rows, count
+
+
+def write_npy_chunks(chunks: Iterable[np.ndarray], file: BinaryIO) -> Tuple[int, int]:
+    """
+    Writes the accelerations to a 1D NPY file, returns the number of rows and chunks. The number of rows is
+    not known in advance, so the header is written once more at the end (it has the same size for any row count).
+    """
+    header = _npy_header(0)
+    file.write(header)
+    rows = count = 0
+    for chunk in chunks:
+        file.write(np.ascontiguousarray(chunk, dtype='<f8').tobytes())
+        rows += len(chunk)
+        count += 1
+
+    final_header = _npy_header(rows)
+    assert len(final_header) == len(header)
+    file.seek(0)
+    file.write(final_header)
+    file.seek(0, io.SEEK_END)
+    return rows, count
+
+
+def _npy_header(rows: int) -> bytes:
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, {'descr': '<f8', 'fortran_order': False, 'shape': (rows,)})
+    return header.getvalue()
+
+
+def run_bulk(controller: CarController,
+             input_path: Optional[str] = None,
+             output_path: Optional[str] = None,
+             chunk_size: int = 65536) -> BulkReport:
+    """
+    Evaluates the controller for all the rows of the input file and writes the accelerations to the output file
+    chunk by chunk, so the used memory depends only on the chunk size. Files ending with .npy are read/written
+    as NPY, others as CSV (the standard input/output is used if a path is not given or it is '-').
+    """
+    start = time.perf_counter()
+    input_file = output_file = None
+    try:
+        if input_path is not None and input_path.endswith('.npy'):
+            chunks = read_npy_chunks(input_path, chunk_size)
+        else:
+            input_file = open(input_path, newline='', buffering=BUFFER_SIZE) if input_path not in (None, '-') else None
+            chunks = read_csv_chunks(input_file or sys.stdin, chunk_size)
+        accelerations = evaluate_chunks(controller, chunks)
+
+        if output_path is not None and output_path.endswith('.npy'):
+            output_file = open(output_path, 'wb', buffering=BUFFER_SIZE)
+            rows, count = write_npy_chunks(accelerations, output_file)
+        else:
+            output_file = open(output_path, 'w', newline='', buffering=BUFFER_SIZE) if output_path not in (None, '-') else None
+            rows, count = write_csv_chunks(accelerations, output_file or sys.stdout)
+    finally:
+        for file in (input_file, output_file):
+            if file is not None:
+                file.close()
+    return BulkReport(rows, count, time.perf_counter() - start)
@@ -0,0 +1,171 @@
+import functools
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+
+import fuzzy_logic
+from car_controller import controller, lut
+from car_controller.controller import CarController, DEFAULT_MEMBERSHIPS
+
+# cache directory used by default (unless overridden by the environment)
+DEFAULT_DIRECTORY = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'car_controller')
+
+# extension of the cache entries
+ENTRY_SUFFIX = '.controller'
+
+
+class ControllerCache:
+    """
+    Persistent cache of compiled controllers - with the precomputed geometry of the memberships, the compiled
+    rule program (including its bytecode) and optionally the lookup table - each stored in a single file.
+    Entries are keyed by a content hash of the memberships, the lookup table parameters, the versions
+    of the interpreter and numpy and the sources of all the modules the stored objects are defined by (see
+    `source_digest()`), so an entry can never be stale - entries of old memberships, rules or code are just
+    no longer used and they are evicted in the least recently used order once the cache exceeds `max_size` bytes.
+    The cache is only an optimization, a cache directory that cannot be written just leaves the controllers uncached.
+    """
+
+    def __init__(self, directory: Optional[str] = None, max_size: int = 64 << 20):
+        self._directory = directory or DEFAULT_DIRECTORY
+        self._max_size = max_size
+
+    def key(self,
+            membership_points: Dict = DEFAULT_MEMBERSHIPS,
+            lut_resolution: Union[None, int, Sequence[int]] = None,
+            lut_max_error: Optional[float] = None) -> str:
+        """ Key of the controller with the given memberships and lookup table parameters. """
+        digest = hashlib.sha256()
+        digest.update(json.dumps(membership_points, sort_keys=True).encode())
+        digest.update(json.dumps([lut_resolution, lut_max_error]).encode())
+        digest.update(json.dumps([sys.implementation.cache_tag, np.__version__]).encode())
+        digest.update(source_digest())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CarController]:
+        """ Loads the controller stored under the given key (None if there is none or it is not readable). """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as file:
+                car_controller = pickle.loads(file.read())
+        except OSError:
+            return None
+        except Exception:
+            # corrupted (e.g. partially written) entries are dropped
+            self._remove(path)
+            return None
+
+        # marks the entry as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return car_controller
+
+    def put(self, key: str, car_controller: CarController):
+        """ Stores the controller under the given key and evicts the least recently used entries if needed. """
+        os.makedirs(self._directory, exist_ok=True)
+
+        # written to a temporary file first so that other processes never see a partial entry
+        descriptor, temporary = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                pickle.dump(car_controller, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self._path(key))
+        except BaseException:
+            self._remove(temporary)
+            raise
+        self.evict(keep=key)
+
+    def load(self,
+             membership_points: Dict = DEFAULT_MEMBERSHIPS,
+             lut_resolution: Union[None, int, Sequence[int]] = None,
+             lut_max_error: Optional[float] = None) -> CarController:
+        """
+        Gets the controller with the given memberships (in the lookup table mode if a resolution is given)
+        from the cache, or creates it and stores it in the cache (if the cache directory can be written).
+        """
+        key = self.key(membership_points, lut_resolution, lut_max_error)
+        car_controller = self.get(key)
+        if car_controller is None:
+            car_controller = CarController(membership_points)
+            if lut_resolution is not None:
+                car_controller.compile_lut(lut_resolution, lut_max_error)
+            try:
+                self.put(key, car_controller)
+            except OSError:
+                pass
+        return car_controller
+
+    def evict(self, keep: Optional[str] = None):
+        """ Removes the least recently used entries (except the given one) until the cache fits its size. """
+        entries = []
+        for entry in self._entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        size = sum(size for _, size, _ in entries)
+        kept = self._path(keep) if keep is not None else None
+        for _, entry_size, path in sorted(entries):
+            if size <= self._max_size:
+                break
+            if path != kept:
+                self._remove(path)
+                size -= entry_size
+
+    def clear(self):
+        """ Removes all the entries. """
+        for entry in self._entries():
+            self._remove(entry.path)
+
+    @property
+    def directory(self) -> str:
+        return self._directory
+
+    @property
+    def size(self) -> int:
+        """ Total size of the entries in bytes. """
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        try:
+            return [entry for entry in os.scandir(self._directory) if entry.name.endswith(ENTRY_SUFFIX)]
+        except OSError:
+            return []
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._directory, key + ENTRY_SUFFIX)
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+@functools.lru_cache(maxsize=None)
+def source_digest() -> bytes:
+    """
+    Hash of the sources of all the modules that define the pickled controllers - the fuzzy logic package,
+    the controller (including its rules) and the lookup table. Any change of the code invalidates the entries.
+    """
+    paths = sorted(
+        os.path.join(os.path.dirname(fuzzy_logic.__file__), name)
+        for name in os.listdir(os.path.dirname(fuzzy_logic.__file__))
+        if name.endswith('.py')
+    )
+    digest = hashlib.sha256()
+    for path in [*paths, controller.__file__, lut.__file__]:
+        with open(path, 'rb') as file:
+            digest.update(os.path.basename(path).encode())
+            digest.update(file.read())
+    return digest.digest()
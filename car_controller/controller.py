@@ -1,4 +1,9 @@
+from typing import Optional, Union, Sequence, List, Tuple
+
+import numpy as np
+
 import fuzzy_logic as fl
+from car_controller.lut import LookupTable
 
 # default membership functions
 DEFAULT_MEMBERSHIPS = {
@@ -27,11 +32,25 @@ DEFAULT_MEMBERSHIPS = {
 }
 
 
+# input variables of the controller (in the order of the arguments)
+INPUTS = ['car_speed', 'obstacle_distance', 'obstacle_relative_speed']
+
+
 class CarController:
-    """ Implements the logic of a controller that controls vehicle acceleration. """
+    """
+    Implements the logic of a controller that controls vehicle acceleration.
+    The controller can be switched into a lookup-table mode, in which instead of evaluating the fuzzy logic system
+    it interpolates its control surface that was sampled on a dense grid (see `compile_lut()`).
+    """
 
     def __init__(self, membership_points=DEFAULT_MEMBERSHIPS):
         """ Sets up the fuzzy logic system. """
+        self._lut: Optional[LookupTable] = None
+        self._bounds = [
+            (min(x for points in membership_points[variable].values() for x, _ in points),
+             max(x for points in membership_points[variable].values() for x, _ in points))
+            for variable in INPUTS
+        ]
 
         # car speed turned out to e redundant - the final system does not use it
         car_slow = fl.Term('car_speed', 'low', fl.PiecewiseMembership(membership_points['car_speed']['low']))
@@ -64,12 +83,59 @@ class CarController:
 
     def __call__(self, car_speed: float, obstacle_distance: float, obstacle_relative_speed: float) -> float:
         """ Calculates the requested acceleration of a car based on the given variables. """
+        if self._lut is not None:
+            return self._lut(car_speed, obstacle_distance, obstacle_relative_speed)
         return self._system(
             car_speed=car_speed,
             obstacle_distance=obstacle_distance,
             obstacle_relative_speed=obstacle_relative_speed
         )['car_acceleration']
 
+    def evaluate_batch(self, car_speed: np.ndarray, obstacle_distance: np.ndarray, obstacle_relative_speed: np.ndarray) -> np.ndarray:
+        """ Calculates the requested accelerations element-wise for arrays of the variables. """
+        if self._lut is not None:
+            return self._lut.evaluate_batch(car_speed, obstacle_distance, obstacle_relative_speed)
+        return self._evaluate_system(car_speed, obstacle_distance, obstacle_relative_speed)
+
+    def _evaluate_system(self, car_speed: np.ndarray, obstacle_distance: np.ndarray, obstacle_relative_speed: np.ndarray) -> np.ndarray:
+        """ Evaluates the fuzzy logic system (ignoring the lookup table) for arrays of the variables. """
+        return self._system.evaluate_batch(dict(
+            car_speed=car_speed,
+            obstacle_distance=obstacle_distance,
+            obstacle_relative_speed=obstacle_relative_speed
+        ))['car_acceleration']
+
+    def compile_lut(self, resolution: Union[int, Sequence[int]] = 65, max_error: Optional[float] = None) -> LookupTable:
+        """
+        Samples the fuzzy logic system over the universes of the inputs and switches the controller into
+        the lookup-table mode. If `max_error` is given the resolution is increased until the table is within
+        this error from the exact system in the middles of the grid cells (an estimate, see `LookupTable.sample()`).
+        Inputs outside of the universes are clamped to them, so the table gives the values at the nearest bound
+        where the exact system gives NaN (no rule is activated there).
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self._lut = LookupTable.sample(self._evaluate_system, self._bounds, resolution, max_error)
+        return self._lut
+
+    def load_lut(self, path: str) -> LookupTable:
+        """ Switches the controller into the lookup-table mode using a table saved to a file. """
+        self._lut = LookupTable.load(path)
+        return self._lut
+
+    @property
+    def lut(self) -> Optional[LookupTable]:
+        """ Lookup table used by this controller (None if the fuzzy logic system is evaluated directly). """
+        return self._lut
+
+    @lut.setter
+    def lut(self, lut: Optional[LookupTable]):
+        self._lut = lut
+
+    @property
+    def bounds(self) -> List[Tuple[float, float]]:
+        """ Universes (lower and upper bound) of the controller inputs. """
+        return self._bounds
+
     @property
     def system(self) -> fl.System:
         return self._system
@@ -0,0 +1,250 @@
+import itertools
+import math
+import struct
+from typing import Callable, Sequence, Tuple, Union, Optional
+
+import numpy as np
+
+# layout of the mapped files - a header (magic, format version, number of axes and offset of the samples),
+# a record per axis (low and high bound, number of samples) and the samples as little-endian doubles (in C order)
+MAPPED_MAGIC = b'FLUT'
+MAPPED_VERSION = 1
+MAPPED_HEADER = struct.Struct('<4sIII')
+MAPPED_AXIS = struct.Struct('<ddQ')
+MAPPED_ALIGNMENT = 64
+MAPPED_DTYPE = np.dtype('<f8')
+
+
+class LookupTable:
+    """
+    Function sampled on a dense regular grid that is evaluated by multilinear interpolation between the samples.
+    The evaluation costs the same regardless of the complexity of the sampled function, queries outside
+    of the grid are clamped to its bounds and queries with a NaN coordinate give NaN.
+    """
+
+    def __init__(self, lows: Sequence[float], highs: Sequence[float], values: np.ndarray):
+        self._lows = np.asarray(lows, dtype=float)
+        self._highs = np.asarray(highs, dtype=float)
+        self._values = np.asarray(values, dtype=float)
+        assert self._values.ndim == len(self._lows) == len(self._highs)
+        assert all(n >= 2 for n in self._values.shape)
+
+        shape = np.array(self._values.shape)
+        self._steps = (self._highs - self._lows) / (shape - 1)
+        self._strides = np.array([int(np.prod(shape[d + 1:])) for d in range(len(shape))])
+        self._flat = self._values.reshape(-1)
+
+        # offsets of all corners of a grid cell (the last dimension changes fastest)
+        self._offsets = np.array([
+            int(np.dot(corner, self._strides))
+            for corner in itertools.product((0, 1), repeat=len(shape))
+        ])
+
+        # plain python copies for the scalar evaluation
+        self._scalar_axes = list(zip(self._lows.tolist(), self._steps.tolist(), (shape - 1).tolist(), self._strides.tolist()))
+        self._scalar_offsets = self._offsets.tolist()
+        self._scalar_flat = memoryview(np.ascontiguousarray(self._flat))
+
+        # file the samples are mapped from (if any)
+        self._path: Optional[str] = None
+
+    def __reduce__(self):
+        """ Tables are pickled by their samples (the rest is derived from them), mapped tables just by their file. """
+        if self._path is not None:
+            return type(self).load_mapped, (self._path,)
+        return type(self), (self._lows, self._highs, self._values)
+
+    @classmethod
+    def sample(cls,
+               function: Callable[..., np.ndarray],
+               bounds: Sequence[Tuple[float, float]],
+               resolution: Union[int, Sequence[int]] = 65,
+               max_error: Optional[float] = None,
+               max_samples: int = 2 ** 22) -> 'LookupTable':
+        """
+        Samples the given vectorized function on a regular grid with the given bounds and resolution.
+        If `max_error` is given the table is compared with the function in the middles of the grid cells and
+        of their edges along each axis. Until the error at these points is within `max_error` the resolution is
+        doubled along the axes which contribute the most to it (failing if the grid would exceed `max_samples`
+        samples). The error is only estimated at these points - it is not a guaranteed bound elsewhere in the cells
+        (e.g. near a sharp feature of the function that falls between them).
+        """
+        if isinstance(resolution, int):
+            resolution = [resolution] * len(bounds)
+        lows, highs = zip(*bounds)
+
+        while True:
+            axes = [np.linspace(low, high, n) for (low, high), n in zip(bounds, resolution)]
+            table = cls(lows, highs, function(*np.meshgrid(*axes, indexing='ij')))
+
+            if max_error is None:
+                return table
+
+            middles = [(axis[1:] + axis[:-1]) / 2.0 for axis in axes]
+            error = table.error(function, np.meshgrid(*middles, indexing='ij'))
+            if error <= max_error:
+                return table
+
+            # error of the interpolation along each axis separately
+            axis_errors = [
+                table.error(function, np.meshgrid(*axes[:d], middles[d], *axes[d + 1:], indexing='ij'))
+                for d in range(len(axes))
+            ]
+            refined = [
+                2 * n - 1 if axis_error > max_error / len(axes) or axis_error == max(axis_errors) else n
+                for n, axis_error in zip(resolution, axis_errors)
+            ]
+            if np.prod(refined) > max_samples:
+                raise ValueError(f'Could not reach the error of {max_error} (error {error} at resolution {resolution})')
+            resolution = refined
+
+    def error(self, function: Callable[..., np.ndarray], points: Sequence[np.ndarray]) -> float:
+        """ Maximal absolute difference between this table and the given function at the given points. """
+        expected = function(*points)
+        actual = self.evaluate_batch(*points)
+        defined = np.isfinite(expected)
+        return float(np.max(np.abs(expected[defined] - actual[defined]), initial=0.0))
+
+    def __call__(self, *point: float) -> float:
+        """ Evaluates the table at a single point. """
+        if len(point) == 3:
+            return self._trilinear(*point)
+
+        base, fractions = 0, []
+        for value, (low, step, last, stride) in zip(point, self._scalar_axes):
+            position = (value - low) / step
+            if position != position:
+                return math.nan
+            position = 0.0 if position < 0.0 else last if position > last else position
+            index = int(position)
+            index = index if index < last else last - 1
+            base += index * stride
+            fractions.append(position - index)
+
+        flat = self._scalar_flat
+        corners = [flat[base + offset] for offset in self._scalar_offsets]
+        for t in reversed(fractions):
+            corners = [a + (b - a) * t for a, b in zip(corners[::2], corners[1::2])]
+        return corners[0]
+
+    def _trilinear(self, x: float, y: float, z: float) -> float:
+        """ Unrolled version of the scalar evaluation for three dimensional tables. """
+        (x_low, x_step, x_last, x_stride), (y_low, y_step, y_last, y_stride), (z_low, z_step, z_last, _) = self._scalar_axes
+
+        x = (x - x_low) / x_step
+        y = (y - y_low) / y_step
+        z = (z - z_low) / z_step
+        if x != x or y != y or z != z:
+            return math.nan
+
+        x = 0.0 if x < 0.0 else x_last if x > x_last else x
+        i = int(x)
+        i = i if i < x_last else x_last - 1
+        x -= i
+
+        y = 0.0 if y < 0.0 else y_last if y > y_last else y
+        j = int(y)
+        j = j if j < y_last else y_last - 1
+        y -= j
+
+        z = 0.0 if z < 0.0 else z_last if z > z_last else z
+        k = int(z)
+        k = k if k < z_last else z_last - 1
+        z -= k
+
+        f = self._scalar_flat
+        base = i * x_stride + j * y_stride + k
+        c000, c001 = f[base], f[base + 1]
+        c010, c011 = f[base + y_stride], f[base + y_stride + 1]
+        c100, c101 = f[base + x_stride], f[base + x_stride + 1]
+        c110, c111 = f[base + x_stride + y_stride], f[base + x_stride + y_stride + 1]
+
+        c00 = c000 + (c001 - c000) * z
+        c01 = c010 + (c011 - c010) * z
+        c10 = c100 + (c101 - c100) * z
+        c11 = c110 + (c111 - c110) * z
+        c0 = c00 + (c01 - c00) * y
+        c1 = c10 + (c11 - c10) * y
+        return c0 + (c1 - c0) * x
+
+    def evaluate_batch(self, *points: np.ndarray) -> np.ndarray:
+        """ Evaluates the table element-wise for the given arrays of coordinates. """
+        points = np.broadcast_arrays(*(np.asarray(p, dtype=float) for p in points))
+        shape = np.array(self._values.shape)
+
+        base = np.zeros(points[0].shape, dtype=np.intp)
+        fractions = []
+        undefined = None
+        for d, values in enumerate(points):
+            position = np.clip((values - self._lows[d]) / self._steps[d], 0.0, shape[d] - 1)
+            # NaN coordinates are looked up at the first sample and their results are replaced by NaN
+            nan = np.isnan(position)
+            if nan.any():
+                undefined = nan if undefined is None else undefined | nan
+                position = np.where(nan, 0.0, position)
+            index = np.minimum(position.astype(np.intp), shape[d] - 2)
+            base += index * self._strides[d]
+            fractions.append(position - index)
+
+        corners = [self._flat[base + offset] for offset in self._offsets]
+        for t in reversed(fractions):
+            corners = [a + (b - a) * t for a, b in zip(corners[::2], corners[1::2])]
+        if undefined is not None:
+            return np.where(undefined, np.nan, corners[0])
+        return corners[0]
+
+    def save(self, path: str):
+        """ Saves this table to a binary file. """
+        with open(path, 'wb') as file:
+            np.savez(file, lows=self._lows, highs=self._highs, values=self._values)
+
+    @classmethod
+    def load(cls, path: str) -> 'LookupTable':
+        """ Loads a table saved with `save()` or `save_mapped()` (which is mapped). """
+        with open(path, 'rb') as file:
+            mapped = file.read(len(MAPPED_MAGIC)) == MAPPED_MAGIC
+        if mapped:
+            return cls.load_mapped(path)
+
+        with np.load(path) as data:
+            return cls(data['lows'], data['highs'], data['values'])
+
+    def save_mapped(self, path: str):
+        """ Saves this table to a binary file that can be memory-mapped (see `load_mapped()`). """
+        ndim = self._values.ndim
+        offset = MAPPED_HEADER.size + ndim * MAPPED_AXIS.size
+        offset += -offset % MAPPED_ALIGNMENT
+
+        with open(path, 'wb') as file:
+            file.write(MAPPED_HEADER.pack(MAPPED_MAGIC, MAPPED_VERSION, ndim, offset))
+            for low, high, n in zip(self._lows.tolist(), self._highs.tolist(), self._values.shape):
+                file.write(MAPPED_AXIS.pack(low, high, n))
+            file.write(bytes(offset - file.tell()))
+            np.ascontiguousarray(self._values, dtype=MAPPED_DTYPE).tofile(file)
+
+    @classmethod
+    def load_mapped(cls, path: str) -> 'LookupTable':
+        """
+        Opens a table saved with `save_mapped()`. The samples are memory-mapped read-only instead of being read,
+        so opening takes the same time regardless of the size of the table and all the processes which map
+        the same file share its pages.
+        """
+        with open(path, 'rb') as file:
+            magic, version, ndim, offset = MAPPED_HEADER.unpack(file.read(MAPPED_HEADER.size))
+            if magic != MAPPED_MAGIC or version != MAPPED_VERSION:
+                raise ValueError(f'{path} is not a mapped lookup table (of version {MAPPED_VERSION})')
+            axes = [MAPPED_AXIS.unpack(file.read(MAPPED_AXIS.size)) for _ in range(ndim)]
+
+        lows, highs, shape = zip(*axes)
+        values = np.memmap(path, dtype=MAPPED_DTYPE, mode='r', offset=offset, shape=shape)
+        table = cls(lows, highs, values)
+        table._path = path
+        return table
+
+    @property
+    def bounds(self) -> Tuple[Tuple[float, float], ...]:
+        return tuple(zip(self._lows.tolist(), self._highs.tolist()))
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values
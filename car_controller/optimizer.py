@@ -0,0 +1,301 @@
+import copy
+import math
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import NamedTuple, Optional, Dict, List, Tuple, Sequence, Iterator
+
+import numpy as np
+
+from car_controller.controller import CarController, DEFAULT_MEMBERSHIPS
+from car_controller.sweep import Scenario, create_batch
+
+
+class CostWeights(NamedTuple):
+    """ Weights of the components of the cost of a controller over a scenario suite. """
+    collision: float = 1000.0
+    gap: float = 1.0
+    jerk: float = 0.1
+    target_gap: float = 35.0
+
+
+class OptimizationResult(NamedTuple):
+    """ Outcome of an optimization - the best membership points found and the course of the search. """
+    membership_points: Dict
+    cost: float
+    history: List[float]
+    evaluations: int
+    cache_hits: int
+
+
+class MembershipEncoding:
+    """
+    Mapping between membership points and the flat vector of their breakpoints (the x coordinates).
+    The degrees of membership stay fixed, decoded breakpoints are clipped to the universe of their variable
+    (the range spanned by its initial memberships) and sorted within each membership.
+    """
+
+    def __init__(self, membership_points: Dict = DEFAULT_MEMBERSHIPS):
+        self._template = copy.deepcopy(membership_points)
+        self._layout: List[Tuple[str, str, int]] = [
+            (variable, label, len(points))
+            for variable, memberships in self._template.items()
+            for label, points in memberships.items()
+        ]
+
+        lows, highs = [], []
+        for variable, memberships in self._template.items():
+            xs = [x for points in memberships.values() for x, _ in points]
+            count = len(xs)
+            lows += [min(xs)] * count
+            highs += [max(xs)] * count
+        self._lows = np.array(lows, dtype=float)
+        self._highs = np.array(highs, dtype=float)
+
+    def encode(self, membership_points: Dict) -> np.ndarray:
+        """ Flattens the breakpoints of the given membership points into a vector. """
+        return np.array([
+            float(x)
+            for variable, label, _ in self._layout
+            for x, _ in membership_points[variable][label]
+        ])
+
+    def decode(self, vector: np.ndarray) -> Dict:
+        """ Creates membership points from the given vector of breakpoints. """
+        vector = np.clip(np.asarray(vector, dtype=float), self._lows, self._highs).tolist()
+        points, start = {}, 0
+        for variable, label, count in self._layout:
+            xs = sorted(vector[start:start + count])
+            ys = [y for _, y in self._template[variable][label]]
+            points.setdefault(variable, {})[label] = list(zip(xs, ys))
+            start += count
+        return points
+
+    def canonical(self, vector: np.ndarray) -> np.ndarray:
+        """ Vector of the breakpoints that are actually used when the given vector is decoded. """
+        return self.encode(self.decode(vector))
+
+    @property
+    def size(self) -> int:
+        return len(self._lows)
+
+    @property
+    def bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """ Lowest and highest value of each breakpoint. """
+        return self._lows, self._highs
+
+
+def evaluate_cost(membership_points: Dict,
+                  scenarios: Sequence[Scenario],
+                  simulation_time: float = 20.0,
+                  time_step: float = 0.05,
+                  weights: CostWeights = CostWeights()) -> float:
+    """
+    Cost of the controller with the given membership points over the given scenarios, all of them are simulated
+    in a single batch. It is the weighted sum of the fraction of scenarios with a collision, the mean distance
+    of the final gap from the target gap and the mean absolute jerk (in the scenarios without a collision).
+    Scenarios in which the controller is not defined (no rule fires) count as collisions.
+    """
+    car_controller = CarController(membership_points)
+    simulation, profile = create_batch(scenarios)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        simulation.simulate(car_controller, profile, simulation_time, time_step, stop_on_collision=True)
+
+    gap = simulation.current_obstacle_position - simulation.current_car_position
+    failed = simulation.collision | ~np.isfinite(gap) | ~np.isfinite(simulation.total_jerk)
+    if failed.all():
+        return weights.collision
+
+    succeeded = ~failed
+    gap_error = np.abs(gap[succeeded] - weights.target_gap).mean()
+    jerk = simulation.total_jerk[succeeded].mean() / simulation_time
+    return float(weights.collision * failed.mean() + weights.gap * gap_error + weights.jerk * jerk)
+
+
+# scenario suite of a worker process, it is set once per worker (not per candidate)
+_worker_suite: Optional[Tuple[Sequence[Scenario], float, float, CostWeights]] = None
+
+
+def _initialize_worker(scenarios: Sequence[Scenario], simulation_time: float, time_step: float, weights: CostWeights):
+    """ Stores the scenario suite used by all the evaluations run in this worker process. """
+    global _worker_suite
+    _worker_suite = (scenarios, simulation_time, time_step, weights)
+
+
+def _evaluate_candidate(membership_points: Dict) -> float:
+    """ Task run in a worker process. """
+    return evaluate_cost(membership_points, *_worker_suite)
+
+
+class MembershipOptimizer:
+    """
+    Searches the breakpoints of the membership functions that minimize the cost over a scenario suite
+    (see `evaluate_cost()`). Each candidate is evaluated by a single batch simulation of the whole suite,
+    the candidates of a population are evaluated in parallel by a pool of `workers` processes (with 0 everything
+    runs in this process). Costs are cached by the breakpoint vectors (rounded to `resolution`), so candidates
+    that decode to already evaluated memberships are not simulated again.
+
+    The search runs in a normalized space - a step of 1 moves a breakpoint across the whole universe of its variable.
+    """
+
+    def __init__(self,
+                 scenarios: Sequence[Scenario],
+                 membership_points: Dict = DEFAULT_MEMBERSHIPS,
+                 simulation_time: float = 20.0,
+                 time_step: float = 0.05,
+                 weights: CostWeights = CostWeights(),
+                 workers: Optional[int] = 0,
+                 resolution: float = 1e-3):
+        self._scenarios = list(scenarios)
+        self._encoding = MembershipEncoding(membership_points)
+        self._initial = self._encoding.encode(membership_points)
+        lows, highs = self._encoding.bounds
+        self._scale = np.where(highs > lows, highs - lows, 1.0)
+        self._simulation_time = simulation_time
+        self._time_step = time_step
+        self._weights = weights
+        self._workers = workers
+        self._resolution = resolution
+
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._cache: Dict[Tuple[float, ...], float] = {}
+        self._evaluations = 0
+        self._hits = 0
+
+    def evaluate(self, candidates: np.ndarray) -> np.ndarray:
+        """ Costs of the given candidates (rows of normalized breakpoint offsets). """
+        keys = [self._key(candidate) for candidate in np.atleast_2d(candidates)]
+        missing = list(dict.fromkeys(key for key in keys if key not in self._cache))
+        self._hits += len(keys) - len(missing)
+        self._evaluations += len(missing)
+
+        points = [self._encoding.decode(key) for key in missing]
+        if self._executor is None:
+            costs = [evaluate_cost(p, self._scenarios, self._simulation_time, self._time_step, self._weights) for p in points]
+        else:
+            costs = self._executor.map(_evaluate_candidate, points)
+        self._cache.update(zip(missing, costs))
+
+        return np.array([self._cache[key] for key in keys])
+
+    def random_search(self,
+                      iterations: int = 20,
+                      population: int = 16,
+                      sigma: float = 0.05,
+                      seed: Optional[int] = None) -> OptimizationResult:
+        """
+        Samples populations of candidates normally distributed around the best candidate so far,
+        the spread is halved whenever a population does not improve it.
+        """
+        rng = np.random.default_rng(seed)
+        best = np.zeros(self._encoding.size)
+        with self._parallel():
+            best_cost = float(self.evaluate(best)[0])
+            history = []
+            for _ in range(iterations):
+                candidates = best + sigma * rng.standard_normal((population, best.size))
+                costs = self.evaluate(candidates)
+                i = int(np.argmin(costs))
+                if costs[i] < best_cost:
+                    best, best_cost = candidates[i], float(costs[i])
+                else:
+                    sigma /= 2.0
+                history.append(best_cost)
+        return self._result(best, best_cost, history)
+
+    def cma_es(self,
+               generations: int = 20,
+               population: Optional[int] = None,
+               sigma: float = 0.05,
+               seed: Optional[int] = None) -> OptimizationResult:
+        """
+        Evolution strategy with covariance matrix adaptation restricted to a diagonal covariance (sep-CMA-ES),
+        which keeps the update linear in the number of breakpoints.
+        """
+        rng = np.random.default_rng(seed)
+        n = self._encoding.size
+        population = population or 4 + int(3 * math.log(n))
+        mu = population // 2
+        weights = math.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        weights /= weights.sum()
+        mu_eff = 1.0 / np.sum(weights ** 2)
+
+        # learning rates (the covariance ones are scaled up for the diagonal model)
+        c_sigma = (mu_eff + 2.0) / (n + mu_eff + 5.0)
+        d_sigma = 1.0 + 2.0 * max(0.0, math.sqrt((mu_eff - 1.0) / (n + 1.0)) - 1.0) + c_sigma
+        c_c = (4.0 + mu_eff / n) / (n + 4.0 + 2.0 * mu_eff / n)
+        c_1 = 2.0 / ((n + 1.3) ** 2 + mu_eff) * (n + 2.0) / 3.0
+        c_mu = min(1.0 - c_1, 2.0 * (mu_eff - 2.0 + 1.0 / mu_eff) / ((n + 2.0) ** 2 + mu_eff) * (n + 2.0) / 3.0)
+        expected_norm = math.sqrt(n) * (1.0 - 1.0 / (4.0 * n) + 1.0 / (21.0 * n ** 2))
+
+        mean = np.zeros(n)
+        variances = np.ones(n)
+        path_sigma, path_c = np.zeros(n), np.zeros(n)
+        best = mean
+        with self._parallel():
+            best_cost = float(self.evaluate(best)[0])
+            history = []
+            for generation in range(1, generations + 1):
+                z = rng.standard_normal((population, n))
+                y = z * np.sqrt(variances)
+                candidates = mean + sigma * y
+                costs = self.evaluate(candidates)
+
+                order = np.argsort(costs, kind='stable')
+                if costs[order[0]] < best_cost:
+                    best, best_cost = candidates[order[0]], float(costs[order[0]])
+                history.append(best_cost)
+
+                selected = order[:mu]
+                y_w = weights @ y[selected]
+                mean = mean + sigma * y_w
+
+                path_sigma = (1.0 - c_sigma) * path_sigma + math.sqrt(c_sigma * (2.0 - c_sigma) * mu_eff) * (weights @ z[selected])
+                norm = np.linalg.norm(path_sigma)
+                stalled = norm / math.sqrt(1.0 - (1.0 - c_sigma) ** (2 * generation)) < (1.4 + 2.0 / (n + 1.0)) * expected_norm
+                path_c = (1.0 - c_c) * path_c + stalled * math.sqrt(c_c * (2.0 - c_c) * mu_eff) * y_w
+
+                variances = (
+                    (1.0 - c_1 - c_mu) * variances +
+                    c_1 * (path_c ** 2 + (not stalled) * c_c * (2.0 - c_c) * variances) +
+                    c_mu * (weights @ y[selected] ** 2)
+                )
+                sigma *= math.exp((c_sigma / d_sigma) * (norm / expected_norm - 1.0))
+        return self._result(best, best_cost, history)
+
+    @property
+    def encoding(self) -> MembershipEncoding:
+        return self._encoding
+
+    @property
+    def evaluations(self) -> int:
+        """ Number of simulated candidates (cache misses). """
+        return self._evaluations
+
+    @property
+    def cache_hits(self) -> int:
+        return self._hits
+
+    def _key(self, candidate: np.ndarray) -> Tuple[float, ...]:
+        """ Cache key of a candidate - its canonical breakpoints rounded to the resolution. """
+        breakpoints = self._encoding.canonical(self._initial + candidate * self._scale)
+        return tuple((np.round(breakpoints / self._resolution) * self._resolution).tolist())
+
+    def _result(self, best: np.ndarray, cost: float, history: List[float]) -> OptimizationResult:
+        return OptimizationResult(
+            self._encoding.decode(self._key(best)), cost, history, self._evaluations, self._hits
+        )
+
+    @contextmanager
+    def _parallel(self) -> Iterator[None]:
+        """ Keeps a pool of worker processes for the duration of a search (unless everything runs in this process). """
+        if self._workers == 0:
+            yield
+            return
+
+        with ProcessPoolExecutor(max_workers=self._workers, initializer=_initialize_worker,
+                                 initargs=(self._scenarios, self._simulation_time, self._time_step, self._weights)) as executor:
+            self._executor = executor
+            try:
+                yield
+            finally:
+                self._executor = None
@@ -0,0 +1,204 @@
+import asyncio
+import collections
+import json
+import math
+import time
+from typing import Optional, Dict, List, Tuple
+
+import numpy as np
+
+from car_controller.controller import CarController, INPUTS
+
+
+class ControllerServer:
+    """
+    Serves the decisions of a controller over line-delimited JSON. Each request line is an object with the inputs
+    of the controller (and an optional `id` which is echoed back), e.g.
+    `{"id": 1, "car_speed": 20.0, "obstacle_distance": 30.0, "obstacle_relative_speed": -3.0}`,
+    answered by `{"id": 1, "car_acceleration": -4.1}` (or `{"id": 1, "error": "..."}`).
+    A request `{"command": "metrics"}` is answered by the metrics of the server (see `metrics()`).
+
+    Concurrent requests (of all the connections) are collected into micro-batches - a batch is evaluated by a single
+    vectorized call of the controller once it has `max_batch` requests or `batch_window` seconds after its first
+    request arrived. Requests of a connection can be pipelined, their responses are written in the same order.
+    Failed requests are answered by errors, only a request line longer than the limit of the stream closes
+    the connection (after its error is written).
+    """
+
+    def __init__(self, controller: CarController, batch_window: float = 0.002, max_batch: int = 1024, history: int = 10000):
+        self._controller = controller
+        self._batch_window = batch_window
+        self._max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._latencies = collections.deque(maxlen=history)
+        self._batch_sizes = collections.deque(maxlen=history)
+        self._requests = 0
+        self._batches = 0
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, path: Optional[str] = None) -> asyncio.AbstractServer:
+        """ Starts listening on the TCP address or on the Unix socket (if a path is given) and batching the requests. """
+        self._queue = asyncio.Queue()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle_connection, path=path)
+        return await asyncio.start_server(self._handle_connection, host=host, port=port)
+
+    async def close(self):
+        """ Stops batching the requests (requests which are still queued are cancelled). """
+        if self._batcher is not None:
+            self._batcher.cancel()
+            try:
+                await self._batcher
+            except asyncio.CancelledError:
+                pass
+            self._batcher = None
+        while self._queue is not None and not self._queue.empty():
+            _, _, future = self._queue.get_nowait()
+            future.cancel()
+
+    async def evaluate(self, car_speed: float, obstacle_distance: float, obstacle_relative_speed: float) -> float:
+        """ Evaluates the controller for the given inputs as a part of the next batch. """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(((car_speed, obstacle_distance, obstacle_relative_speed), time.perf_counter(), future))
+        return await future
+
+    def metrics(self) -> Dict:
+        """
+        Number of the served requests and evaluated batches, percentiles of the latencies of the requests
+        (from their arrival to their evaluation, in seconds) and of the batch sizes (over the recent history).
+        """
+        latencies = np.array(self._latencies)
+        batch_sizes = np.array(self._batch_sizes)
+        return {
+            'requests': self._requests,
+            'batches': self._batches,
+            'latency_p50': float(np.percentile(latencies, 50)) if len(latencies) else None,
+            'latency_p99': float(np.percentile(latencies, 99)) if len(latencies) else None,
+            'batch_size_mean': float(batch_sizes.mean()) if len(batch_sizes) else None,
+            'batch_size_p50': float(np.percentile(batch_sizes, 50)) if len(batch_sizes) else None,
+            'batch_size_p99': float(np.percentile(batch_sizes, 99)) if len(batch_sizes) else None,
+            'batch_size_max': int(batch_sizes.max()) if len(batch_sizes) else None,
+        }
+
+    async def _batch_loop(self):
+        """ Collects the queued requests into batches and evaluates them. """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self._batch_window
+            while len(batch) < self._max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # requests queued in the meantime join the batch without waiting
+            while len(batch) < self._max_batch and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            self._evaluate_batch(batch)
+
+    def _evaluate_batch(self, batch: List[Tuple[Tuple[float, float, float], float, asyncio.Future]]):
+        inputs, arrivals, futures = zip(*batch)
+        try:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                accelerations = self._controller.evaluate_batch(*np.array(inputs, dtype=float).T).tolist()
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        now = time.perf_counter()
+        for future, acceleration, arrival in zip(futures, accelerations, arrivals):
+            if not future.done():
+                future.set_result(acceleration)
+            self._latencies.append(now - arrival)
+        self._requests += len(batch)
+        self._batches += 1
+        self._batch_sizes.append(len(batch))
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """ Reads the requests of a connection and writes the responses in the order of the requests. """
+        responses = asyncio.Queue()
+        responder = asyncio.create_task(self._respond(responses, writer))
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await responses.put(asyncio.ensure_future(self._process(line)))
+        except ValueError:
+            # the line exceeds the limit of the stream, the rest of it cannot be told from the next request
+            # so the error is answered and the connection is closed
+            error = asyncio.get_running_loop().create_future()
+            error.set_result({'error': 'invalid request: line too long'})
+            await responses.put(error)
+        except ConnectionError:
+            pass
+        finally:
+            await responses.put(None)
+            await responder
+
+    async def _respond(self, responses: asyncio.Queue, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                response = await responses.get()
+                if response is None:
+                    break
+                writer.write(json.dumps(await response).encode() + b'\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _process(self, line: bytes) -> Dict:
+        """ Processes a single request line and returns the response. """
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+        except ValueError as e:
+            return {'error': f'invalid request: {e}'}
+
+        response = {'id': request['id']} if 'id' in request else {}
+        if request.get('command') == 'metrics':
+            response.update(self.metrics())
+            return response
+
+        try:
+            inputs = [float(request[name]) for name in INPUTS]
+        except KeyError as e:
+            response['error'] = f'missing input {e}'
+            return response
+        except (TypeError, ValueError) as e:
+            response['error'] = f'invalid input: {e}'
+            return response
+
+        try:
+            acceleration = await self.evaluate(*inputs)
+        except Exception as e:
+            response['error'] = f'evaluation failed: {e}'
+            return response
+        response['car_acceleration'] = acceleration if math.isfinite(acceleration) else None
+        return response
+
+
+async def serve(controller: CarController,
+                host: str = '127.0.0.1',
+                port: int = 8765,
+                path: Optional[str] = None,
+                batch_window: float = 0.002,
+                max_batch: int = 1024):
+    """ Serves the controller until cancelled. """
+    server = ControllerServer(controller, batch_window, max_batch)
+    listener = await server.start(host, port, path)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
@@ -1,74 +1,200 @@
-from typing import Union, Callable, Tuple
+import math
+from typing import Union, Callable, Tuple, Optional, Iterator, Dict
+
+import numpy as np
 
 from car_controller import CarController
 
 
+# columns of the simulation history (in the order of the rows of the history array)
+HISTORY_COLUMNS = [
+    'time',
+    'car_position', 'car_speed', 'car_acceleration',
+    'obstacle_position', 'obstacle_speed', 'obstacle_acceleration'
+]
+TIME, CAR_POSITION, CAR_SPEED, CAR_ACCELERATION, OBSTACLE_POSITION, OBSTACLE_SPEED, OBSTACLE_ACCELERATION = range(len(HISTORY_COLUMNS))
+
+
 class CarSimulation:
-    """ Class responsible for simulating a simplified world in which the car controller can be tested. """
+    """
+    Class responsible for simulating a simplified world in which the car controller can be tested.
+    The current state is kept in plain attributes while the history is stored in a preallocated
+    array (one contiguous row per column) that grows geometrically when needed.
+    Collision state (first collision time and minimal gap) is tracked incrementally at every step.
+    """
+
+    __slots__ = (
+        '_history', '_length',
+        '_collision_time', '_min_gap',
+        '_simulation_time',
+        '_car_position', '_car_speed', '_car_acceleration',
+        '_obstacle_position', '_obstacle_speed', '_obstacle_acceleration'
+    )
 
     def __init__(self,
                  initial_car_position: float = 0.0,
                  initial_car_speed: float = 0.0,
                  initial_obstacle_position: float = 10.0,
-                 initial_obstacle_speed: float = 1.0):
-        """ Initializes the simulation. """
-        self._car_positions = [initial_car_position]
-        self._car_speeds = [initial_car_speed]
-        self._car_accelerations = [0.0]
+                 initial_obstacle_speed: float = 1.0,
+                 capacity: int = 256):
+        """ Initializes the simulation, `capacity` is the initial number of steps for which the history is allocated. """
+        self._history = np.empty((len(HISTORY_COLUMNS), max(1, capacity)))
+        self._length = 0
+        self._collision_time: Optional[float] = None
+        self._min_gap = math.inf
+
+        self._simulation_time = 0.0
+        self._car_position = float(initial_car_position)
+        self._car_speed = float(initial_car_speed)
+        self._car_acceleration = 0.0
+        self._obstacle_position = float(initial_obstacle_position)
+        self._obstacle_speed = float(initial_obstacle_speed)
+        self._obstacle_acceleration = 0.0
+
+        self._record()
 
-        self._obstacle_positions = [initial_obstacle_position]
-        self._obstacle_speeds = [initial_obstacle_speed]
-        self._obstacle_accelerations = [0.0]
+    def _record(self):
+        """ Appends the current state to the history and updates the collision state. """
+        gap = self._obstacle_position - self._car_position
+        if gap < self._min_gap:
+            self._min_gap = gap
+            if gap <= 0 and self._collision_time is None:
+                self._collision_time = self._simulation_time
 
-        self._simulation_times = [0.0]
+        if self._length == self._history.shape[1]:
+            self.reserve(self._length)
+
+        self._history[:, self._length] = (
+            self._simulation_time,
+            self._car_position, self._car_speed, self._car_acceleration,
+            self._obstacle_position, self._obstacle_speed, self._obstacle_acceleration
+        )
+        self._length += 1
+
+    def reserve(self, steps: int):
+        """ Makes sure that the history has space for at least the given number of additional steps. """
+        capacity = self._length + steps
+        if capacity > self._history.shape[1]:
+            history = np.empty((len(HISTORY_COLUMNS), capacity))
+            history[:, :self._length] = self._history[:, :self._length]
+            self._history = history
 
     def step(self, time_step: float = 0.1):
         """ Performs one step of the simulation. """
-        self._simulation_times.append(self.current_simulation_time + time_step)
+        self._simulation_time += time_step
+
+        car_speed = max(0.0, self._car_speed + self._car_acceleration * time_step)
+        self._car_position += (self._car_speed + car_speed) / 2 * time_step
+        self._car_speed = car_speed
+
+        obstacle_speed = max(0.0, self._obstacle_speed + self._obstacle_acceleration * time_step)
+        self._obstacle_position += (self._obstacle_speed + obstacle_speed) / 2 * time_step
+        self._obstacle_speed = obstacle_speed
+
+        self._record()
 
-        self._car_speeds.append(max(0.0, self.current_car_speed + self.current_car_acceleration * time_step))
-        self._car_positions.append(self.current_car_position + sum(self._car_speeds[-2:]) / 2 * time_step)
-        self._car_accelerations.append(self.current_car_acceleration)
+    def simulate(self,
+                 car_controller: CarController,
+                 obstacle_acceleration: Union[float, Callable[[float], float]],
+                 simulation_time: float,
+                 time_step: float = 0.05,
+                 stop_on_collision: bool = False,
+                 steady_state_tolerance: Optional[float] = None,
+                 steady_state_after: float = 0.0) -> int:
+        """
+        Runs the simulation for a given number of steps using the given controller and returns the number
+        of performed steps. The simulation can be terminated early when the car collides with the obstacle or
+        when it reaches a steady state - both the accelerations and relative speed are within the given tolerance.
+        As the obstacle has to keep moving at a constant speed from then on, the steady state is checked only
+        after `steady_state_after` (e.g. the time at which the obstacle acceleration profile ends).
+        """
+        steps = 0
+        for _ in self._run(car_controller, obstacle_acceleration, simulation_time, time_step, stop_on_collision, steady_state_tolerance, steady_state_after):
+            steps += 1
+        return steps
 
-        self._obstacle_speeds.append(max(0.0, self.current_obstacle_speed + self.current_obstacle_acceleration * time_step))
-        self._obstacle_positions.append(self.current_obstacle_position + sum(self._obstacle_speeds[-2:]) / 2 * time_step)
-        self._obstacle_accelerations.append(self.current_obstacle_acceleration)
+    def stream(self,
+               car_controller: CarController,
+               obstacle_acceleration: Union[float, Callable[[float], float]],
+               simulation_time: float,
+               time_step: float = 0.05,
+               stop_on_collision: bool = False,
+               steady_state_tolerance: Optional[float] = None,
+               steady_state_after: float = 0.0) -> Iterator[Dict[str, float]]:
+        """
+        Runs the simulation just like `simulate()` but yields the steps of the history (in the same form as
+        `__iter__()`) as soon as they are final, so that they can be processed while the simulation runs.
+        """
+        for _ in self._run(car_controller, obstacle_acceleration, simulation_time, time_step, stop_on_collision, steady_state_tolerance, steady_state_after):
+            yield self._row(self._length - 1)
+        yield self._row(self._length - 1)
 
-    def simulate(self, car_controller: CarController, obstacle_acceleration: Union[float, Callable[[float], float]], simulation_time: float, time_step: float = 0.05):
-        """ Runs the simulation for a given number of steps using the given controller. """
+    def _run(self,
+             car_controller: CarController,
+             obstacle_acceleration: Union[float, Callable[[float], float]],
+             simulation_time: float,
+             time_step: float,
+             stop_on_collision: bool,
+             steady_state_tolerance: Optional[float],
+             steady_state_after: float) -> Iterator[None]:
+        """ Runs the simulation, yielding right before every step (when the accelerations of the last state are set). """
         # turn a constant value into a constant function
         if not callable(obstacle_acceleration):
             obstacle_acceleration_value = obstacle_acceleration
             obstacle_acceleration = lambda t: obstacle_acceleration_value
 
+        # preallocate the history for all the steps
+        steps = int(simulation_time / time_step)
+        self.reserve(steps)
+
         # rune the simulation
-        for i in range(int(simulation_time / time_step)):
+        for i in range(steps):
+            if stop_on_collision and self._collision_time is not None:
+                return
+
             self.current_car_acceleration = car_controller(
-                car_speed=self.current_car_speed,
-                obstacle_distance=self.current_obstacle_position - self.current_car_position,
-                obstacle_relative_speed=self.current_obstacle_speed - self.current_car_speed
+                car_speed=self._car_speed,
+                obstacle_distance=self._obstacle_position - self._car_position,
+                obstacle_relative_speed=self._obstacle_speed - self._car_speed
             )
-            self.current_obstacle_acceleration = obstacle_acceleration(self.current_simulation_time)
+            self.current_obstacle_acceleration = obstacle_acceleration(self._simulation_time)
+
+            if steady_state_tolerance is not None and self._simulation_time >= steady_state_after and self.steady_state(steady_state_tolerance):
+                return
+
+            yield
             self.step(time_step)
 
+    def steady_state(self, tolerance: float) -> bool:
+        """
+        If the relative speed of the car and obstacle and their accelerations are within the given tolerance
+        (braking while standing still does not count as acceleration).
+        """
+        return (
+            (abs(self._car_acceleration) <= tolerance or (self._car_speed == 0.0 and self._car_acceleration < 0.0)) and
+            (abs(self._obstacle_acceleration) <= tolerance or (self._obstacle_speed == 0.0 and self._obstacle_acceleration < 0.0)) and
+            abs(self._obstacle_speed - self._car_speed) <= tolerance
+        )
+
     def plot(self, title: str = '', accelerations_limits: Tuple[float, float] = (-30, 30), speed_limits: Tuple[float, float] = (-1, 40)):
         """ Displays the history of the simulation in a form of three plots (position, speed, acceleration). """
         import matplotlib.pyplot as plt
 
+        history = self.history
         fig, axs = plt.subplots(nrows=3)
 
         axs[0].set_ylabel(r'position $\left[m\right]$')
-        axs[0].plot(self._simulation_times, self._car_positions, label='car')
-        axs[0].plot(self._simulation_times, self._obstacle_positions, label='obstacle')
+        axs[0].plot(history[TIME], history[CAR_POSITION], label='car')
+        axs[0].plot(history[TIME], history[OBSTACLE_POSITION], label='obstacle')
 
         axs[1].set_ylabel(r'speed $\left[\frac{m}{s}\right]$')
-        axs[1].plot(self._simulation_times, self._car_speeds, label='car')
-        axs[1].plot(self._simulation_times, self._obstacle_speeds, label='obstacle')
+        axs[1].plot(history[TIME], history[CAR_SPEED], label='car')
+        axs[1].plot(history[TIME], history[OBSTACLE_SPEED], label='obstacle')
         axs[1].set_ylim(speed_limits)
 
         axs[2].set_ylabel(r'acceleration $\left[\frac{m}{s^2}\right]$')
-        axs[2].step(self._simulation_times, self._car_accelerations, where='post', label='car')
-        axs[2].step(self._simulation_times, self._obstacle_accelerations, where='post', label='obstacle')
+        axs[2].step(history[TIME], history[CAR_ACCELERATION], where='post', label='car')
+        axs[2].step(history[TIME], history[OBSTACLE_ACCELERATION], where='post', label='obstacle')
         axs[2].set_ylim(accelerations_limits)
 
         axs[0].set_xticks([])
@@ -83,58 +209,287 @@ class CarSimulation:
 
         plt.show()
 
+    @property
+    def history(self) -> np.ndarray:
+        """ View (not a copy) of the simulation history - one row per each of the `HISTORY_COLUMNS`. """
+        return self._history[:, :self._length]
+
     @property
     def collision(self) -> bool:
         """ If at any point in this simulation the car and obstacle collided. """
-        return any(op - cp <= 0 for cp, op in zip(self._car_positions, self._obstacle_positions))
+        return self._collision_time is not None
+
+    @property
+    def collision_time(self) -> Optional[float]:
+        """ Time of the first collision of the car and obstacle (None if they did not collide). """
+        return self._collision_time
+
+    @property
+    def min_gap(self) -> float:
+        """ Minimal distance between the car and obstacle seen in this simulation. """
+        return self._min_gap
+
+    @property
+    def time_to_collision(self) -> float:
+        """ Time after which the car would hit the obstacle if both kept their current speeds. """
+        gap = self._obstacle_position - self._car_position
+        closing_speed = self._car_speed - self._obstacle_speed
+        if gap <= 0:
+            return 0.0
+        return gap / closing_speed if closing_speed > 0 else math.inf
 
     @property
     def current_car_position(self) -> float:
-        return self._car_positions[-1]
+        return self._car_position
 
     @property
     def current_car_speed(self) -> float:
-        return self._car_speeds[-1]
+        return self._car_speed
 
     @property
     def current_car_acceleration(self) -> float:
-        return self._car_accelerations[-1]
+        return self._car_acceleration
 
     @current_car_acceleration.setter
     def current_car_acceleration(self, value: float):
-        self._car_accelerations[-1] = value
+        self._car_acceleration = value
+        self._history[CAR_ACCELERATION, self._length - 1] = value
 
     @property
     def current_obstacle_position(self) -> float:
-        return self._obstacle_positions[-1]
+        return self._obstacle_position
 
     @property
     def current_obstacle_speed(self) -> float:
-        return self._obstacle_speeds[-1]
+        return self._obstacle_speed
 
     @property
     def current_obstacle_acceleration(self) -> float:
-        return self._obstacle_accelerations[-1]
+        return self._obstacle_acceleration
 
     @current_obstacle_acceleration.setter
     def current_obstacle_acceleration(self, value: float):
-        self._obstacle_accelerations[-1] = value
+        self._obstacle_acceleration = value
+        self._history[OBSTACLE_ACCELERATION, self._length - 1] = value
 
     @property
     def current_simulation_time(self):
-        return self._simulation_times[-1]
+        return self._simulation_time
+
+    def __len__(self) -> int:
+        return self._length
 
     def __iter__(self):
         """ Iterator over the simulation history. """
-        for i in range(len(self._simulation_times)):
-            yield {
-                'time': self._simulation_times[i],
-                'car_position': self._car_positions[i],
-                'car_speed': self._car_speeds[i],
-                'car_acceleration': self._car_accelerations[i],
-                'obstacle_position': self._obstacle_positions[i],
-                'obstacle_speed': self._obstacle_speeds[i],
-                'obstacle_acceleration': self._obstacle_accelerations[i],
-                'relative_distance': self._obstacle_positions[i] - self._car_positions[i],
-                'relative_speed': self._obstacle_speeds[i] - self._car_speeds[i]
-            }
+        for i in range(self._length):
+            yield self._row(i)
+
+    def _row(self, i: int) -> Dict[str, float]:
+        """ The i-th step of the simulation history. """
+        step = dict(zip(HISTORY_COLUMNS, self._history[:, i].tolist()))
+        step['relative_distance'] = step['obstacle_position'] - step['car_position']
+        step['relative_speed'] = step['obstacle_speed'] - step['car_speed']
+        return step
+
+
+class PulseAcceleration:
+    """
+    Obstacle acceleration profile in which the obstacle accelerates with a constant acceleration for a period of time.
+    All the parameters can be arrays - then the profile describes a separate pulse for each scenario.
+    """
+
+    def __init__(self,
+                 start: Union[float, np.ndarray],
+                 duration: Union[float, np.ndarray],
+                 acceleration: Union[float, np.ndarray]):
+        self._start = np.asarray(start, dtype=float)
+        self._end = self._start + np.asarray(duration, dtype=float)
+        self._acceleration = np.asarray(acceleration, dtype=float)
+
+    @classmethod
+    def speed_change(cls,
+                     start: Union[float, np.ndarray],
+                     initial_speed: Union[float, np.ndarray],
+                     target_speed: Union[float, np.ndarray],
+                     acceleration: Union[float, np.ndarray]) -> 'PulseAcceleration':
+        """ Profile in which the obstacle changes its speed to the target one with the given (absolute) acceleration. """
+        change = np.asarray(target_speed, dtype=float) - np.asarray(initial_speed, dtype=float)
+        return cls(start, np.abs(change) / acceleration, np.copysign(acceleration, change))
+
+    def __call__(self, t: float) -> np.ndarray:
+        return np.where((self._start <= t) & (t < self._end), self._acceleration, 0.0)
+
+    @property
+    def end(self) -> np.ndarray:
+        """ Time at which the pulse ends (after which the acceleration is always 0). """
+        return self._end
+
+
+class BatchCarSimulation:
+    """
+    Simulates many independent scenarios in lockstep. The state of all the scenarios is kept in arrays
+    so that the controller is evaluated only once per step (through its batch evaluation path).
+    Only the current state of the scenarios and the collision state are kept, not the whole history.
+    """
+
+    def __init__(self,
+                 initial_car_position: Union[float, np.ndarray] = 0.0,
+                 initial_car_speed: Union[float, np.ndarray] = 0.0,
+                 initial_obstacle_position: Union[float, np.ndarray] = 10.0,
+                 initial_obstacle_speed: Union[float, np.ndarray] = 1.0):
+        """ Initializes the simulation, the number of scenarios is given by the broadcast shape of the arguments. """
+        state = np.broadcast_arrays(*(
+            np.array(value, dtype=float, ndmin=1)
+            for value in (initial_car_position, initial_car_speed, initial_obstacle_position, initial_obstacle_speed)
+        ))
+        self._car_position, self._car_speed, self._obstacle_position, self._obstacle_speed = (s.copy() for s in state)
+        self._car_acceleration = np.zeros_like(self._car_position)
+        self._obstacle_acceleration = np.zeros_like(self._car_position)
+
+        self._simulation_time = 0.0
+        self._steps = np.zeros(self._car_position.shape, dtype=int)
+        self._total_jerk = np.zeros_like(self._car_position)
+        self._min_gap = self._obstacle_position - self._car_position
+        self._collision_time = np.where(self._min_gap <= 0, 0.0, np.nan)
+
+    def __len__(self) -> int:
+        return len(self._car_position)
+
+    def step(self, time_step: float = 0.1):
+        """ Performs one step of the simulation of all the scenarios. """
+        self._simulation_time += time_step
+        self._advance(slice(None), time_step)
+
+    def _advance(self, index: Union[slice, np.ndarray], time_step: float):
+        """ Performs one step of the simulation of the selected scenarios. """
+        car_speed = self._car_speed[index]
+        next_car_speed = np.maximum(0.0, car_speed + self._car_acceleration[index] * time_step)
+        self._car_position[index] += (car_speed + next_car_speed) / 2 * time_step
+        self._car_speed[index] = next_car_speed
+
+        obstacle_speed = self._obstacle_speed[index]
+        next_obstacle_speed = np.maximum(0.0, obstacle_speed + self._obstacle_acceleration[index] * time_step)
+        self._obstacle_position[index] += (obstacle_speed + next_obstacle_speed) / 2 * time_step
+        self._obstacle_speed[index] = next_obstacle_speed
+
+        gap = self._obstacle_position[index] - self._car_position[index]
+        collision_time = self._collision_time[index]
+        self._collision_time[index] = np.where((gap <= 0) & np.isnan(collision_time), self._simulation_time, collision_time)
+        self._min_gap[index] = np.minimum(self._min_gap[index], gap)
+        self._steps[index] += 1
+
+    def simulate(self,
+                 car_controller: CarController,
+                 obstacle_acceleration: Union[float, np.ndarray, Callable[[float], np.ndarray]],
+                 simulation_time: float,
+                 time_step: float = 0.05,
+                 stop_on_collision: bool = False,
+                 steady_state_tolerance: Optional[float] = None,
+                 steady_state_after: Union[float, np.ndarray] = 0.0):
+        """
+        Runs the simulation of all the scenarios using the given controller. The obstacle acceleration can
+        be given per scenario, either as constant values or as a function of time (e.g. `PulseAcceleration`).
+        Scenarios can be terminated early (see `CarSimulation.simulate()`, `steady_state_after` can be given
+        per scenario, e.g. `PulseAcceleration.end`), then only the remaining ones are stepped and the whole
+        simulation stops once all of them are terminated.
+        """
+        steady_state_after = np.broadcast_to(steady_state_after, self._car_position.shape)
+        running = np.ones(self._car_position.shape, dtype=bool)
+
+        for i in range(int(simulation_time / time_step)):
+            if stop_on_collision:
+                running &= np.isnan(self._collision_time)
+
+            # only the running scenarios are evaluated (as long as all of them run a slice avoids copying)
+            active = slice(None) if running.all() else np.flatnonzero(running)
+
+            car_speed, obstacle_speed = self._car_speed[active], self._obstacle_speed[active]
+            car_acceleration = car_controller.evaluate_batch(
+                car_speed,
+                self._obstacle_position[active] - self._car_position[active],
+                obstacle_speed - car_speed
+            )
+            if i > 0:
+                self._total_jerk[active] += np.abs(car_acceleration - self._car_acceleration[active])
+            self._car_acceleration[active] = car_acceleration
+            acceleration = obstacle_acceleration(self._simulation_time) if callable(obstacle_acceleration) else obstacle_acceleration
+            self._obstacle_acceleration[active] = np.broadcast_to(acceleration, self._car_position.shape)[active]
+
+            if steady_state_tolerance is not None:
+                running &= ~(self.steady_state(steady_state_tolerance) & (self._simulation_time >= steady_state_after))
+                active = slice(None) if running.all() else np.flatnonzero(running)
+
+            if not running.any():
+                return
+            self._simulation_time += time_step
+            self._advance(active, time_step)
+
+    def steady_state(self, tolerance: float) -> np.ndarray:
+        """ Mask of the scenarios that are in a steady state (see `CarSimulation.steady_state()`). """
+        return (
+            ((np.abs(self._car_acceleration) <= tolerance) | ((self._car_speed == 0.0) & (self._car_acceleration < 0.0))) &
+            ((np.abs(self._obstacle_acceleration) <= tolerance) | ((self._obstacle_speed == 0.0) & (self._obstacle_acceleration < 0.0))) &
+            (np.abs(self._obstacle_speed - self._car_speed) <= tolerance)
+        )
+
+    @property
+    def collision(self) -> np.ndarray:
+        """ Mask of the scenarios in which at any point the car and obstacle collided. """
+        return ~np.isnan(self._collision_time)
+
+    @property
+    def collision_time(self) -> np.ndarray:
+        """ Time of the first collision in each scenario (NaN if there was none). """
+        return self._collision_time
+
+    @property
+    def min_gap(self) -> np.ndarray:
+        """ Minimal distance between the car and obstacle seen in each scenario. """
+        return self._min_gap
+
+    @property
+    def time_to_collision(self) -> np.ndarray:
+        """ Time after which the car would hit the obstacle in each scenario if both kept their current speeds. """
+        gap = self._obstacle_position - self._car_position
+        closing_speed = self._car_speed - self._obstacle_speed
+        with np.errstate(divide='ignore', invalid='ignore'):
+            time = np.where(closing_speed > 0, gap / closing_speed, np.inf)
+        return np.where(gap <= 0, 0.0, time)
+
+    @property
+    def total_jerk(self) -> np.ndarray:
+        """ Total variation of the car acceleration (integral of the absolute jerk) in each scenario. """
+        return self._total_jerk
+
+    @property
+    def steps(self) -> np.ndarray:
+        """ Number of steps simulated in each scenario. """
+        return self._steps
+
+    @property
+    def current_car_position(self) -> np.ndarray:
+        return self._car_position
+
+    @property
+    def current_car_speed(self) -> np.ndarray:
+        return self._car_speed
+
+    @property
+    def current_car_acceleration(self) -> np.ndarray:
+        return self._car_acceleration
+
+    @property
+    def current_obstacle_position(self) -> np.ndarray:
+        return self._obstacle_position
+
+    @property
+    def current_obstacle_speed(self) -> np.ndarray:
+        return self._obstacle_speed
+
+    @property
+    def current_obstacle_acceleration(self) -> np.ndarray:
+        return self._obstacle_acceleration
+
+    @property
+    def current_simulation_time(self) -> float:
+        return self._simulation_time
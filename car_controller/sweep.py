@@ -0,0 +1,141 @@
+import itertools
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import NamedTuple, Optional, Iterable, Iterator, List, Tuple, Dict, Sequence
+
+import numpy as np
+
+from car_controller.controller import CarController, DEFAULT_MEMBERSHIPS
+from car_controller.simulation import BatchCarSimulation, PulseAcceleration
+
+
+class Scenario(NamedTuple):
+    """
+    Initial conditions of a simulated scenario. The obstacle starts at `obstacle_speed` and at `acceleration_start`
+    changes it to `obstacle_target_speed` (if given) with the given absolute acceleration.
+    """
+    car_speed: float
+    obstacle_position: float
+    obstacle_speed: float
+    obstacle_target_speed: Optional[float] = None
+    obstacle_acceleration: float = 0.0
+    acceleration_start: float = 2.0
+
+
+class SweepResult(NamedTuple):
+    """ Outcome of a simulated scenario. """
+    index: int
+    scenario: Scenario
+    collision: bool
+    final_gap: float
+    final_speed: float
+
+
+def scenario_grid(car_speeds: Sequence[float],
+                  obstacle_positions: Sequence[float],
+                  obstacle_speeds: Sequence[float],
+                  obstacle_target_speeds: Sequence[Optional[float]] = (None,),
+                  obstacle_accelerations: Sequence[float] = (0.0,),
+                  acceleration_start: float = 2.0) -> List[Scenario]:
+    """ Creates scenarios for all the combinations of the given values. """
+    return [
+        Scenario(*values, acceleration_start=acceleration_start)
+        for values in itertools.product(car_speeds, obstacle_positions, obstacle_speeds, obstacle_target_speeds, obstacle_accelerations)
+    ]
+
+
+def create_batch(scenarios: Sequence[Scenario]) -> Tuple[BatchCarSimulation, PulseAcceleration]:
+    """ Creates a batch simulation of the given scenarios together with the obstacle acceleration profile. """
+    car_speed, obstacle_position, obstacle_speed, target_speed, acceleration, start = (
+        np.array(values, dtype=float) for values in zip(*(
+            s._replace(obstacle_target_speed=s.obstacle_speed if s.obstacle_target_speed is None else s.obstacle_target_speed)
+            for s in scenarios
+        ))
+    )
+
+    simulation = BatchCarSimulation(
+        initial_car_speed=car_speed,
+        initial_obstacle_position=obstacle_position,
+        initial_obstacle_speed=obstacle_speed
+    )
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profile = PulseAcceleration.speed_change(start, obstacle_speed, target_speed, acceleration)
+    return simulation, profile
+
+
+def simulate_scenarios(car_controller: CarController,
+                       scenarios: Sequence[Tuple[int, Scenario]],
+                       simulation_time: float,
+                       time_step: float = 0.05) -> List[SweepResult]:
+    """ Simulates the given (indexed) scenarios at once, in a single batch simulation. """
+    indices, scenarios = zip(*scenarios)
+    simulation, profile = create_batch(scenarios)
+    simulation.simulate(car_controller, profile, simulation_time, time_step)
+
+    final_gap = simulation.current_obstacle_position - simulation.current_car_position
+    return [
+        SweepResult(index, scenario, collision, gap, speed)
+        for index, scenario, collision, gap, speed in zip(
+            indices, scenarios, simulation.collision.tolist(), final_gap.tolist(), simulation.current_car_speed.tolist()
+        )
+    ]
+
+
+# controller of a worker process, it is created once per worker (not per task)
+_worker_controller: Optional[CarController] = None
+
+
+def _create_controller(membership_points: Dict, lut_path: Optional[str], cached: bool) -> CarController:
+    """ Creates (or loads from the cache) the controller, switched into the lookup-table mode if a table is given. """
+    if cached:
+        from car_controller.cache import ControllerCache
+        car_controller = ControllerCache().load(membership_points)
+    else:
+        car_controller = CarController(membership_points)
+    if lut_path is not None:
+        car_controller.load_lut(lut_path)
+    return car_controller
+
+
+def _initialize_worker(membership_points: Dict, lut_path: Optional[str], cached: bool):
+    """ Creates the controller used by all the tasks run in this worker process. """
+    global _worker_controller
+    _worker_controller = _create_controller(membership_points, lut_path, cached)
+
+
+def _run_chunk(chunk: Sequence[Tuple[int, Scenario]], simulation_time: float, time_step: float) -> List[SweepResult]:
+    """ Task run in a worker process. """
+    return simulate_scenarios(_worker_controller, chunk, simulation_time, time_step)
+
+
+def run_sweep(scenarios: Iterable[Scenario],
+              membership_points: Optional[Dict] = None,
+              simulation_time: float = 20.0,
+              time_step: float = 0.05,
+              workers: Optional[int] = None,
+              chunk_size: int = 256,
+              ordered: bool = True,
+              lut_path: Optional[str] = None,
+              cached: bool = False) -> Iterator[SweepResult]:
+    """
+    Simulates all the given scenarios and yields their results as soon as they are available.
+    The scenarios are split into chunks (each simulated as one batch) that are sharded across a pool of `workers`
+    processes (all available cores by default, with 0 everything runs in this process). With `ordered` the results
+    are yielded in the order of the scenarios, otherwise in the order in which the chunks finish.
+    With `lut_path` the controllers evaluate the lookup table from the file, tables saved with
+    `LookupTable.save_mapped()` are memory-mapped so all the workers share a single copy. With `cached`
+    the controllers are loaded from the on-disk cache of compiled controllers (see `ControllerCache`).
+    """
+    membership_points = membership_points or DEFAULT_MEMBERSHIPS
+    indexed = enumerate(scenarios)
+    chunks = iter(lambda: list(itertools.islice(indexed, chunk_size)), [])
+
+    if workers == 0:
+        car_controller = _create_controller(membership_points, lut_path, cached)
+        for chunk in chunks:
+            yield from simulate_scenarios(car_controller, chunk, simulation_time, time_step)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialize_worker, initargs=(membership_points, lut_path, cached)) as executor:
+        futures = [executor.submit(_run_chunk, chunk, simulation_time, time_step) for chunk in chunks]
+        for future in (futures if ordered else as_completed(futures)):
+            yield from future.result()
@@ -1,4 +1,63 @@
-""" Module that implements a generic fuzzy logic system. """
-from .membership import Membership, PiecewiseMembership, TriangularMembership, TrapezoidalMembership
-from .expressions import Expression, Term, Rule, NotExpression, AndExpression, OrExpression
-from .system import System
+"""
+Module that implements a generic fuzzy logic system.
+Submodules are imported lazily, on the first access to any of their names, so importing the package is cheap.
+"""
+import importlib
+
+# typing is not imported just for this (type checkers treat the constant as if it was)
+TYPE_CHECKING = False
+
+# public names and the submodules that define them
+_EXPORTS = {
+    'Membership': 'membership',
+    'PiecewiseMembership': 'membership',
+    'TriangularMembership': 'membership',
+    'TrapezoidalMembership': 'membership',
+    'Expression': 'expressions',
+    'Term': 'expressions',
+    'Rule': 'expressions',
+    'NotExpression': 'expressions',
+    'AndExpression': 'expressions',
+    'OrExpression': 'expressions',
+    'System': 'system',
+    'Program': 'compiler',
+    'Profile': 'profiling',
+    'Defuzzifier': 'defuzzification',
+    'WeightedCentroid': 'defuzzification',
+    'Centroid': 'defuzzification',
+    'Bisector': 'defuzzification',
+    'MeanOfMaxima': 'defuzzification',
+    'Operators': 'operators',
+    'ZadehOperators': 'operators',
+    'ProductOperators': 'operators',
+    'LukasiewiczOperators': 'operators',
+    'HamacherOperators': 'operators',
+}
+_SUBMODULES = {'membership', 'expressions', 'system', 'compiler', 'profiling', 'sparse', 'defuzzification', 'operators', 'interning'}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .membership import Membership, PiecewiseMembership, TriangularMembership, TrapezoidalMembership
+    from .expressions import Expression, Term, Rule, NotExpression, AndExpression, OrExpression
+    from .system import System
+    from .compiler import Program
+    from .profiling import Profile
+    from .defuzzification import Defuzzifier, WeightedCentroid, Centroid, Bisector, MeanOfMaxima
+    from .operators import Operators, ZadehOperators, ProductOperators, LukasiewiczOperators, HamacherOperators
+
+
+def __getattr__(name: str):
+    """ Imports the submodule that defines the given name (once, the name is then cached in this module). """
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | _SUBMODULES)
@@ -0,0 +1,326 @@
+import functools
+import itertools
+import marshal
+import time
+from typing import Dict, List, NamedTuple, Tuple, Mapping, Callable, Hashable, Optional, TYPE_CHECKING
+
+import numpy as np
+
+from fuzzy_logic import Rule, Expression, Term, NotExpression, AndExpression, OrExpression, PiecewiseMembership, Membership
+from fuzzy_logic.defuzzification import Defuzzifier, WeightedCentroid
+from fuzzy_logic.operators import Operators, ZadehOperators
+
+if TYPE_CHECKING:
+    from fuzzy_logic.profiling import Profile
+
+
+class Instruction(NamedTuple):
+    """ Single operation of a program, its result is stored in the slot with the same index as the instruction. """
+    op: str
+    args: Tuple[int, ...] = ()
+    term: Term = None
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, fallback: float) -> np.ndarray:
+    """ Element-wise ratio of the arrays that is the fallback where the denominator is not positive. """
+    return np.divide(numerator, denominator, out=np.full(np.shape(denominator), fallback), where=denominator > 0)
+
+
+def _membership_key(membership: Membership) -> Hashable:
+    """ Key under which memberships are considered identical - piecewise memberships are compared by their points. """
+    if isinstance(membership, PiecewiseMembership):
+        return membership.points
+    return id(membership)
+
+
+def _instruction_key(instruction: Instruction) -> Hashable:
+    """ Key under which instructions are considered identical. """
+    if instruction.op == 'term':
+        return 'term', instruction.term.variable, _membership_key(instruction.term.membership)
+    return instruction[:2]
+
+
+class Program:
+    """
+    Flat evaluation program compiled from grouped rules.
+    Expression trees are flattened into a topologically ordered list of instructions, each of them
+    storing its result in a separate slot, that is then turned into a straight-line python function.
+    Structurally identical sub-expressions (across all rules and variables) share a single slot.
+    Conjunctions (and disjunctions) of any number of operands are a single n-ary instruction, which is generated
+    by the given family of operators (Zadeh by default) as a single reduction.
+    Centers and masses of the consequents are baked into the generated code as constants, so the weighted centroid
+    (the default defuzzifier) is inlined, other defuzzifiers are called with the strengths of the rules of each variable.
+    Rules of single variables can be replaced (see `update()`) without flattening the other rules again.
+    If a profile is given, the generated code is instrumented to record the result and duration of each
+    instruction into it (the uninstrumented program is not affected at all).
+    """
+
+    def __init__(self,
+                 rules: Dict[str, List[Rule]],
+                 profile: Optional['Profile'] = None,
+                 defuzzifier: Optional[Defuzzifier] = None,
+                 operators: Optional[Operators] = None):
+        self._defuzzifier = defuzzifier or WeightedCentroid()
+        self._operators = operators or ZadehOperators()
+        self._profile = profile
+        self._compile(rules)
+        self._build()
+
+    def __getstate__(self) -> Dict:
+        """ Programs are pickled with their compiled bytecode, so that unpickling does not need to generate it again. """
+        if self._code is None:
+            self._build()
+        state = self.__dict__.copy()
+        del state['_evaluate'], state['_evaluate_batch']
+        state['_code'] = marshal.dumps(self._code)
+        return state
+
+    def __setstate__(self, state: Dict):
+        self.__dict__.update(state)
+        self._code = marshal.loads(self._code)
+        self._link()
+
+    def __call__(self, inputs: Mapping[str, float]) -> Dict[str, float]:
+        """ Evaluates the program for the given inputs. """
+        return self._evaluate(inputs)
+
+    def batch(self, inputs: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """ Evaluates the program element-wise for the given arrays of inputs. """
+        return self._evaluate_batch(inputs)
+
+    def update(self, rules: Mapping[str, List[Rule]]):
+        """
+        Replaces the rules of the given variables (an empty list removes the variable, a new one is added in the order
+        of the names). Rules that are already part of this program (the same objects) keep their instructions,
+        only the new ones are flattened.
+        Instructions that are no longer used are left out and the code is generated again on the next evaluation,
+        so a series of updates is compiled once.
+        """
+        for variable, variable_rules in rules.items():
+            known = {
+                id(rule): (output, size)
+                for rule, output, size in zip(self._rules.get(variable, ()), self._outputs.get(variable, ()), self._sizes.get(variable, ()))
+            }
+            outputs, sizes = [], []
+            for rule in variable_rules:
+                if id(rule) in known:
+                    output, size = known.pop(id(rule))
+                else:
+                    nodes = self._nodes
+                    output = (self._flatten(rule.antecedent), rule.consequent)
+                    size = self._nodes - nodes
+                outputs.append(output)
+                sizes.append(size)
+            self._nodes -= sum(size for _, size in known.values())
+
+            if variable_rules:
+                self._rules[variable], self._outputs[variable], self._sizes[variable] = list(variable_rules), outputs, sizes
+            else:
+                for table in (self._rules, self._outputs, self._sizes):
+                    table.pop(variable, None)
+
+        # variables are kept in the order of their names (as grouped by `group_rules()`), also when they are added
+        self._rules, self._outputs, self._sizes = (dict(sorted(table.items())) for table in (self._rules, self._outputs, self._sizes))
+        self._consequents()
+        self._invalidate()
+
+    def slot(self, expression: Expression) -> int:
+        """ Slot of the result of an expression that is part of this program (structurally). """
+        return self._slots[_instruction_key(self._instruction(expression, self.slot))]
+
+    @property
+    def profile(self) -> Optional['Profile']:
+        """ Profile into which this program records its evaluations (None if it is not instrumented). """
+        return self._profile
+
+    @property
+    def defuzzifier(self) -> Defuzzifier:
+        return self._defuzzifier
+
+    @property
+    def operators(self) -> Operators:
+        return self._operators
+
+    @property
+    def instructions(self) -> List[Instruction]:
+        """ Instructions of this program (including the ones left out after an update, until it is compiled again). """
+        return self._instructions
+
+    @property
+    def centers(self) -> Dict[str, np.ndarray]:
+        """ Centers of the consequents memberships of each variable (in the order of its rules). """
+        return self._centers
+
+    @property
+    def masses(self) -> Dict[str, np.ndarray]:
+        """ Masses of the consequents memberships of each variable (in the order of its rules). """
+        return self._masses
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """ Statistics of the compilation - number of expression nodes, emitted instructions and eliminated nodes. """
+        instructions = sum(self._live())
+        return {
+            'nodes': self._nodes,
+            'instructions': instructions,
+            'eliminated': self._nodes - instructions
+        }
+
+    @property
+    def source(self) -> str:
+        """ Python source code generated for this program. """
+        if self._code is None:
+            self._build()
+        return self._source
+
+    def _compile(self, rules: Mapping[str, List[Rule]]):
+        """ Flattens the rules into a new list of instructions. """
+        self._instructions: List[Instruction] = []
+        self._slots: Dict[Hashable, int] = {}
+        self._nodes = 0
+        self._rules: Dict[str, List[Rule]] = {}
+        self._outputs: Dict[str, List[Tuple[int, Term]]] = {}
+        self._sizes: Dict[str, List[int]] = {}
+        self._roots: List[int] = []
+        self.update(rules)
+        if self._profile is not None:
+            # antecedents of the profiled rules may be flattened into the merged ones, so they get their own slots
+            self._roots = [self._flatten(antecedent) for antecedent in self._profile.antecedents]
+            self._profile.attach(self)
+
+    def _consequents(self):
+        """ Collects the centers and masses of the consequents of each variable. """
+        self._centers = {
+            variable: np.array([consequent.membership.center for _, consequent in outputs])
+            for variable, outputs in self._outputs.items()
+        }
+        self._masses = {
+            variable: np.array([consequent.membership.mass for _, consequent in outputs])
+            for variable, outputs in self._outputs.items()
+        }
+
+    def _live(self) -> List[bool]:
+        """ Whether each instruction is needed by the outputs (or the profiled antecedents). """
+        live = [False] * len(self._instructions)
+        for slot in itertools.chain(self._roots, (slot for outputs in self._outputs.values() for slot, _ in outputs)):
+            live[slot] = True
+        for slot in reversed(range(len(live))):
+            if live[slot]:
+                for arg in self._instructions[slot].args:
+                    live[arg] = True
+        return live
+
+    def _build(self):
+        """ Generates and compiles the code of the needed instructions. """
+        live = self._live()
+        if 2 * sum(live) < len(live):
+            # most of the instructions are left over from removed rules, so they are compiled again from scratch
+            self._compile(self._rules)
+            live = self._live()
+        self._inputs = sorted(set(i.term.variable for i, needed in zip(self._instructions, live) if needed and i.op == 'term'))
+        self._source = self._generate('evaluate', live) + '\n' + self._generate('evaluate_batch', live, batch=True)
+        self._code = compile(self._source, '<fuzzy_logic program>', 'exec')
+        self._link()
+
+    def _invalidate(self):
+        """ Drops the compiled code, it is generated again by the first following evaluation. """
+        self._source = self._code = None
+        self._evaluate, self._evaluate_batch = self._outdated, self._outdated_batch
+
+    def _outdated(self, inputs: Mapping[str, float]) -> Dict[str, float]:
+        self._build()
+        return self._evaluate(inputs)
+
+    def _outdated_batch(self, inputs: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        self._build()
+        return self._evaluate_batch(inputs)
+
+    def _flatten(self, expression: Expression) -> int:
+        """
+        Appends the instructions of the given expression (in post-order) and returns the slot of its result.
+        Instructions are keyed by their structure so that an already emitted instruction is reused.
+        """
+        self._nodes += 1
+        instruction = self._instruction(expression, self._flatten)
+        if instruction.op in ('and', 'or'):
+            # counted as the chain of binary nodes it replaces
+            self._nodes += len(instruction.args) - 2
+        key = _instruction_key(instruction)
+        if key not in self._slots:
+            self._slots[key] = len(self._instructions)
+            self._instructions.append(instruction)
+        return self._slots[key]
+
+    def _link(self):
+        """ Executes the compiled code (with the memberships and operations in its namespace) to get the functions. """
+        namespace = dict(minimum=np.minimum, maximum=np.maximum, ratio=_ratio, fallback=self._defuzzifier.fallback)
+        namespace.update(self._operators.namespace)
+        namespace.update(
+            (f'defuzzify{i}', functools.partial(self._defuzzifier, [consequent.membership for _, consequent in outputs]))
+            for i, outputs in enumerate(self._outputs.values())
+        )
+        if self._profile is not None:
+            namespace.update(clock=time.perf_counter, record=self._profile.record, evaluated=self._profile.evaluated)
+        namespace.update((f'm{slot}', i.term.membership) for slot, i in enumerate(self._instructions) if i.op == 'term')
+        exec(self._code, namespace)
+        self._evaluate: Callable = namespace['evaluate']
+        self._evaluate_batch: Callable = namespace['evaluate_batch']
+
+    def _instruction(self, expression: Expression, operand_slot: Callable[[Expression], int]) -> Instruction:
+        """ Instruction that evaluates the given expression, given a function that provides the slots of its operands. """
+        if isinstance(expression, Term):
+            return Instruction('term', term=expression)
+        if isinstance(expression, NotExpression):
+            return Instruction('not', (operand_slot(expression.operand),))
+        if isinstance(expression, AndExpression):
+            return Instruction('and', tuple(sorted(map(operand_slot, expression.operands))))
+        if isinstance(expression, OrExpression):
+            return Instruction('or', tuple(sorted(map(operand_slot, expression.operands))))
+        raise TypeError(f'Unsupported expression type: {type(expression).__name__}')
+
+    def _generate(self, name: str, live: List[bool], batch: bool = False) -> str:
+        """ Generates the source code of a function that evaluates the needed instructions of this program. """
+        profiled = self._profile is not None
+        lines = [f'def {name}(inputs):']
+        if profiled:
+            lines.append('    start = clock()')
+        lines += [f'    x{i} = inputs[{variable!r}]' for i, variable in enumerate(self._inputs)]
+
+        for slot, instruction in enumerate(self._instructions):
+            if not live[slot]:
+                continue
+            if instruction.op == 'term':
+                expression = f'm{slot}(x{self._inputs.index(instruction.term.variable)})'
+            elif instruction.op == 'not':
+                expression = self._operators.negation_source(f's{instruction.args[0]}', batch)
+            elif instruction.op == 'and':
+                expression = self._operators.conjunction_source([f's{arg}' for arg in instruction.args], batch)
+            else:
+                expression = self._operators.disjunction_source([f's{arg}' for arg in instruction.args], batch)
+            if profiled:
+                lines.append('    t = clock()')
+            lines.append(f'    s{slot} = {expression}')
+            if profiled:
+                lines.append(f'    record({slot}, s{slot}, clock() - t)')
+
+        lines.append('    result = {' if profiled else '    return {')
+        for i, (variable, outputs) in enumerate(self._outputs.items()):
+            if not isinstance(self._defuzzifier, WeightedCentroid):
+                lines.append(f'        {variable!r}: defuzzify{i}(({"".join(f"s{slot}, " for slot, _ in outputs)})),')
+                continue
+
+            weighted_centers, scaled_masses = [], []
+            for (slot, _), center, mass in zip(outputs, self._centers[variable], self._masses[variable]):
+                weighted_centers.append(f'{float(center)!r} * ({float(mass)!r} * s{slot})')
+                scaled_masses.append(f'{float(mass)!r} * s{slot}')
+            numerator, denominator = " + ".join(weighted_centers), " + ".join(scaled_masses)
+            if batch:
+                lines.append(f'        {variable!r}: ratio({numerator}, {denominator}, fallback),')
+            else:
+                lines.append(f'        {variable!r}: ({numerator}) / d if (d := {denominator}) > 0 else fallback,')
+        lines.append('    }')
+        if profiled:
+            lines.append(f'    evaluated({"x0" if self._inputs else "0.0"}, clock() - start)')
+            lines.append('    return result')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,248 @@
+import math
+from abc import ABC, abstractmethod
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from fuzzy_logic import Membership, PiecewiseMembership
+
+# offsets of the nodes of the two point Gauss-Legendre quadrature (relative to the length of an interval),
+# it integrates polynomials up to the third degree exactly, so it is exact for the moments of linear segments
+GAUSS_NODES = (0.5 - 0.5 / math.sqrt(3.0), 0.5 + 0.5 / math.sqrt(3.0))
+
+# relative tolerance under which degrees are considered equal to the maximal one
+MAXIMUM_TOLERANCE = 1e-9
+
+# tolerance (relative to the span of the breakpoints) under which intervals of the maximum are considered points
+# and points of the maximum are considered the same point
+PLATEAU_TOLERANCE = 1e-9
+
+# number of rows defuzzified together (the intermediate arrays of a block should fit the cache)
+BLOCK_SIZE = 1024
+
+
+class Aggregation:
+    """
+    Aggregated output of a variable - the maximum of the memberships of the consequents, each of them clipped
+    by the firing strength of its rule. For piecewise linear memberships it is piecewise linear as well, its
+    breakpoints are the breakpoints of the memberships, the intersections of the memberships (both independent
+    of the strengths, so they are computed once) and the points in which the memberships cross the strengths.
+    Between the breakpoints the output is linear, so it is integrated exactly by a quadrature, without sampling.
+    """
+
+    def __init__(self, memberships: Sequence[Membership]):
+        for membership in memberships:
+            if not isinstance(membership, PiecewiseMembership):
+                raise TypeError(f'Only piecewise linear memberships can be aggregated, got {type(membership).__name__}')
+
+        # identical memberships (of different rules) are clipped by the maximum of their strengths instead
+        unique: Dict[Tuple, int] = {}
+        self._groups = [unique.setdefault(membership.points, len(unique)) for membership in memberships]
+        self._memberships: List[PiecewiseMembership] = [None] * len(unique)
+        for membership, group in zip(memberships, self._groups):
+            self._memberships[group] = membership
+        self._heights = np.array([max(y for _, y in membership.points) for membership in self._memberships])
+
+        breakpoints = set(x for membership in self._memberships for x, _ in membership.points)
+        for i, first in enumerate(self._memberships):
+            for second in self._memberships[i + 1:]:
+                breakpoints.update(self._intersections(first, second))
+        self._breakpoints = np.array(sorted(breakpoints), dtype=float)
+
+        # sloped segments of all the memberships, they can cross any of the strengths
+        segments = [
+            (x1, y1, x2 - x1, y2 - y1)
+            for membership in self._memberships
+            for (x1, y1), (x2, y2) in zip(membership.points, membership.points[1:])
+            if y1 != y2
+        ]
+        self._x, self._y, self._dx, self._dy = np.array(segments, dtype=float).reshape(-1, 4).T
+        self._low, self._high = np.minimum(self._y, self._y + self._dy), np.maximum(self._y, self._y + self._dy)
+
+    def __call__(self, values: np.ndarray, strengths: np.ndarray) -> np.ndarray:
+        """ Degrees of the output at the given points (rows of points for each row of the strengths of the rules). """
+        return self._degrees(values, self.levels(strengths))
+
+    def levels(self, strengths: np.ndarray) -> np.ndarray:
+        """ Levels at which the distinct memberships are clipped, for each row of the strengths of the rules. """
+        if len(self._groups) == len(self._memberships):
+            return strengths
+        levels = np.zeros((len(strengths), len(self._memberships)))
+        for i, group in enumerate(self._groups):
+            np.maximum(levels[:, group], strengths[:, i], out=levels[:, group])
+        return levels
+
+    def height(self, strengths: np.ndarray) -> np.ndarray:
+        """ Maximal degree of the output for each row of the strengths of the rules. """
+        return np.minimum(self.levels(strengths), self._heights).max(axis=1)
+
+    def breakpoints(self, strengths: np.ndarray) -> np.ndarray:
+        """ Sorted breakpoints of the output for each row of the strengths (rows may contain duplicate points). """
+        return self._breakpoints_at(self.levels(strengths))
+
+    def quadrature(self, strengths: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Breakpoints of the output, the lengths of the intervals between them, the quadrature nodes in the intervals
+        (with a last axis of size 2) and the degrees of the output at the nodes.
+        """
+        levels = self.levels(strengths)
+        breakpoints = self._breakpoints_at(levels)
+        lengths = np.diff(breakpoints, axis=1)
+        nodes = breakpoints[:, :-1, None] + lengths[:, :, None] * np.array(GAUSS_NODES)
+        degrees = self._degrees(nodes.reshape(len(levels), -1), levels).reshape(nodes.shape)
+        return breakpoints, lengths, nodes, degrees
+
+    def _degrees(self, values: np.ndarray, levels: np.ndarray) -> np.ndarray:
+        degrees = np.zeros_like(values)
+        for membership, level in zip(self._memberships, levels.T):
+            np.maximum(degrees, np.minimum(membership(values), level[:, None]), out=degrees)
+        return degrees
+
+    def _breakpoints_at(self, levels: np.ndarray) -> np.ndarray:
+        crossings = self._x[:, None] + (levels[:, None, :] - self._y[:, None]) * (self._dx / self._dy)[:, None]
+        inside = (self._low[:, None] < levels[:, None, :]) & (levels[:, None, :] < self._high[:, None])
+        crossings = np.where(inside, crossings, self._breakpoints[0])
+        static = np.broadcast_to(self._breakpoints, (len(levels), len(self._breakpoints)))
+        return np.sort(np.concatenate([static, crossings.reshape(len(levels), -1)], axis=1), axis=1)
+
+    @staticmethod
+    def _intersections(first: PiecewiseMembership, second: PiecewiseMembership):
+        """ Points in which the two memberships cross (in between their breakpoints). """
+        xs = sorted(set(x for x, _ in first.points + second.points))
+        for low, high in zip(xs, xs[1:]):
+            # both are linear in between, the difference is sampled inside so that discontinuities do not matter
+            t1, t2 = low + (high - low) / 3.0, low + 2.0 * (high - low) / 3.0
+            d1, d2 = first(t1) - second(t1), first(t2) - second(t2)
+            if d1 != d2:
+                x = t1 - d1 * (t2 - t1) / (d2 - d1)
+                if low < x < high:
+                    yield x
+
+
+class Defuzzifier(ABC):
+    """
+    Method that turns the firing strengths of the rules of an output variable into a crisp value.
+    Strengths can be given as arrays, then the value is computed element-wise for all of them at once.
+    If no rule fires (or the activated output has no area) the value is the `fallback`.
+    """
+
+    def __init__(self, fallback: float = math.nan):
+        self._fallback = fallback
+        self._aggregations: Dict[Tuple[int, ...], Aggregation] = {}
+
+    def __call__(self,
+                 memberships: Sequence[Membership],
+                 strengths: Sequence[Union[float, np.ndarray]]) -> Union[float, np.ndarray]:
+        """ Crisp value of the output given the memberships of the consequents and the strengths of their rules. """
+        arrays = np.broadcast_arrays(*(np.asarray(strength, dtype=float) for strength in strengths))
+        shape = arrays[0].shape
+        matrix = np.stack([array.ravel() for array in arrays], axis=1)
+
+        values = np.full(len(matrix), self._fallback, dtype=float)
+        active = matrix.max(axis=1, initial=0.0) > 0
+        if active.any():
+            rows = np.flatnonzero(active)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                for start in range(0, len(rows), BLOCK_SIZE):
+                    block = rows[start:start + BLOCK_SIZE]
+                    defined = self.defuzzify(memberships, np.clip(matrix[block], 0.0, 1.0))
+                    values[block] = np.where(np.isnan(defined), self._fallback, defined)
+
+        if not any(isinstance(strength, np.ndarray) for strength in strengths):
+            return float(values[0])
+        return values.reshape(shape)
+
+    @abstractmethod
+    def defuzzify(self, memberships: Sequence[Membership], strengths: np.ndarray) -> np.ndarray:
+        """ Crisp values for the rows of the strengths (each with at least one rule firing). """
+
+    @property
+    def fallback(self) -> float:
+        """ Value of the output when no rule fires. """
+        return self._fallback
+
+    def aggregation(self, memberships: Sequence[Membership]) -> Aggregation:
+        """ Aggregated output of the given memberships (created once per memberships). """
+        key = tuple(map(id, memberships))
+        if key not in self._aggregations:
+            self._aggregations[key] = Aggregation(memberships)
+        return self._aggregations[key]
+
+    def __getstate__(self) -> Dict:
+        # aggregations are keyed by the identities of the memberships, so they cannot outlive this process
+        state = self.__dict__.copy()
+        state['_aggregations'] = {}
+        return state
+
+
+class WeightedCentroid(Defuzzifier):
+    """
+    Average of the centers of the consequents weighted by their masses scaled by the strengths of their rules.
+    It needs just the precomputed centers and masses of the memberships, so it is the fastest method
+    (and the one the compiled programs inline).
+    """
+
+    def defuzzify(self, memberships: Sequence[Membership], strengths: np.ndarray) -> np.ndarray:
+        centers = np.array([membership.center for membership in memberships])
+        masses = np.array([membership.mass for membership in memberships])
+        return (strengths @ (centers * masses)) / (strengths @ masses)
+
+
+class Centroid(Defuzzifier):
+    """ Center of the area under the aggregated output (see `Aggregation`), computed analytically. """
+
+    def defuzzify(self, memberships: Sequence[Membership], strengths: np.ndarray) -> np.ndarray:
+        _, lengths, nodes, degrees = self.aggregation(memberships).quadrature(strengths)
+        areas = lengths * degrees.sum(axis=2) / 2.0
+        moments = lengths * (nodes * degrees).sum(axis=2) / 2.0
+        return moments.sum(axis=1) / areas.sum(axis=1)
+
+
+class Bisector(Defuzzifier):
+    """ Point that splits the area under the aggregated output (see `Aggregation`) into two halves. """
+
+    def defuzzify(self, memberships: Sequence[Membership], strengths: np.ndarray) -> np.ndarray:
+        breakpoints, lengths, nodes, degrees = self.aggregation(memberships).quadrature(strengths)
+        areas = lengths * degrees.sum(axis=2) / 2.0
+        cumulative = np.cumsum(areas, axis=1)
+        half = cumulative[:, -1:] / 2.0
+
+        # the first interval whose end reaches the half has a positive area, the output is linear in it
+        rows = np.arange(len(strengths))
+        i = np.argmax(cumulative >= half, axis=1)
+        remaining = half[:, 0] - (cumulative[rows, i] - areas[rows, i])
+        (t1, t2), (f1, f2) = nodes[rows, i].T, degrees[rows, i].T
+        slope = np.where(t2 > t1, (f2 - f1) / (t2 - t1), 0.0)
+        start = f1 - slope * (t1 - breakpoints[rows, i])
+
+        # solves start * u + slope * u^2 / 2 = remaining (in the form that is stable also for a zero slope)
+        offset = 2.0 * remaining / (start + np.sqrt(np.maximum(start ** 2 + 2.0 * slope * remaining, 0.0)))
+        return breakpoints[rows, i] + np.minimum(offset, lengths[rows, i])
+
+
+class MeanOfMaxima(Defuzzifier):
+    """
+    Mean of the points in which the aggregated output (see `Aggregation`) reaches its maximum - the center
+    of the intervals of the maximum, or the average of its isolated points if it is reached in points only.
+    Intervals and distances shorter than `PLATEAU_TOLERANCE` of the span of the output are treated as points
+    (and as a single point), so that nearly equal strengths (e.g. differing by rounding) give nearly equal values.
+    """
+
+    def defuzzify(self, memberships: Sequence[Membership], strengths: np.ndarray) -> np.ndarray:
+        aggregation = self.aggregation(memberships)
+        breakpoints, lengths, nodes, degrees = aggregation.quadrature(strengths)
+        maximum = aggregation.height(strengths)[:, None]
+        tolerance = MAXIMUM_TOLERANCE * maximum
+        resolution = PLATEAU_TOLERANCE * (breakpoints[:, -1:] - breakpoints[:, :1])
+
+        # intervals in which the output is flat at the maximum (that are not just crossings of nearly equal levels)
+        flat = (np.abs(degrees - maximum[:, :, None]) <= tolerance[:, :, None]).all(axis=2) & (lengths > resolution)
+        measure = (lengths * flat).sum(axis=1)
+        center = (lengths * flat * nodes.mean(axis=2)).sum(axis=1) / measure
+
+        # otherwise the maximum is reached in breakpoints (clusters of nearby points are counted once)
+        reached = np.abs(aggregation(breakpoints, strengths) - maximum) <= tolerance
+        reached[:, 1:] &= ~(reached[:, :-1] & (np.diff(breakpoints, axis=1) <= resolution))
+        points = (breakpoints * reached).sum(axis=1) / reached.sum(axis=1)
+
+        return np.where(measure > 0, center, points)
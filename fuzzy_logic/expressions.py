@@ -1,17 +1,21 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
-from typing import NamedTuple, Set
+from typing import NamedTuple, Set, Tuple, Union
+
+import numpy as np
 
 from fuzzy_logic import Membership
+from fuzzy_logic.interning import Interned
 
 
 class Expression(ABC):
-    """ Base class for fuzzy expression. """
+    """ Base class for fuzzy expression. Expressions are immutable and have no `__dict__` (they declare their slots). """
+    __slots__ = ()
 
     @abstractmethod
-    def __call__(self, **inputs: float) -> float:
-        """ Evaluates the expression for given inputs. """
+    def __call__(self, **inputs: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """ Evaluates the expression for given inputs (element-wise if given arrays). """
 
     def __invert__(self) -> NotExpression:
         """ Overloads `~` operator so that you can express logical negation as `~A`. """
@@ -38,15 +42,19 @@ class Expression(ABC):
         """ Terms used in this expression. """
 
 
-class Term(Expression):
-    """ Represents a fuzzy term defined for a given membership function. """
+class Term(Expression, metaclass=Interned):
+    """
+    Represents a fuzzy term defined for a given membership function.
+    Terms of the same variable and label with the same membership are a single shared instance (see `Interned`).
+    """
+    __slots__ = ('_variable', '_label', '_membership', '__weakref__')
 
     def __init__(self, variable: str, label: str, membership: Membership):
         self._variable = variable
         self._label = label
         self._membership = membership
 
-    def __call__(self, **inputs: float) -> float:
+    def __call__(self, **inputs: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
         return self._membership(inputs[self._variable])
 
     @property
@@ -65,6 +73,13 @@ class Term(Expression):
     def terms(self) -> Set[Term]:
         return {self}
 
+    @property
+    def intern_key(self) -> Tuple[str, str, Membership]:
+        return self._variable, self._label, self._membership
+
+    def __reduce__(self):
+        return type(self), self.intern_key
+
     @property
     def plt_patch(self):
         """ Matplotlib patch in a shape of this var membership function. """
@@ -75,41 +90,93 @@ class Term(Expression):
 
 class UnaryExpression(Expression, ABC):
     """ Base class for all unary expressions. """
+    __slots__ = ('_expr',)
+
     def __init__(self, expr: Expression):
         self._expr = expr
 
+    @property
+    def operand(self) -> Expression:
+        return self._expr
+
     @property
     def terms(self) -> Set[Term]:
         return self._expr.terms
 
 
-class BinaryExpression(Expression, ABC):
-    """ Base class for all binary expressions. """
-    def __init__(self, left: Expression, right: Expression):
-        self._left = left
-        self._right = right
+class NaryExpression(Expression, ABC):
+    """
+    Base class for the associative expressions of any number of operands. Nested expressions of the same type
+    are flattened into their operands, so chains built by repeated `&` (or `|`) are a single node evaluated
+    by a loop instead of a recursion. Repeated operands are kept, the operators of most families are not
+    idempotent (e.g. `A & A` is not `A` for the product t-norm).
+    """
+    __slots__ = ('_operands', '_terms')
+
+    def __init__(self, *operands: Expression):
+        flattened = []
+        for operand in operands:
+            if type(operand) is type(self):
+                flattened.extend(operand.operands)
+            else:
+                flattened.append(operand)
+        self._operands = tuple(flattened)
+        self._terms = None
+
+    @property
+    def operands(self) -> Tuple[Expression, ...]:
+        return self._operands
 
     @property
     def terms(self) -> Set[Term]:
-        return self._left.terms | self._right.terms
+        # computed once, the operands are immutable
+        if self._terms is None:
+            self._terms = frozenset().union(*(operand.terms for operand in self._operands))
+        return self._terms
 
 
 class NotExpression(UnaryExpression):
     """ Represents a logical negation. """
-    def __call__(self, **inputs: float) -> float:
-        return 1 - self._expr(**inputs)
-
+    __slots__ = ()
 
-class AndExpression(BinaryExpression):
-    """ Represents a logical conjunction. """
-    def __call__(self, **inputs: float) -> float:
-        return min(self._left(**inputs), self._right(**inputs))
+    def __call__(self, **inputs: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        return 1 - self._expr(**inputs)
 
 
-class OrExpression(BinaryExpression):
-    """ Represents a logical disjunction. """
-    def __call__(self, **inputs: float) -> float:
-        return max(self._left(**inputs), self._right(**inputs))
+class AndExpression(NaryExpression):
+    """ Represents a logical conjunction. For scalars the remaining operands are not evaluated once one of them is 0. """
+    __slots__ = ()
+
+    def __call__(self, **inputs: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        operands = iter(self._operands)
+        result = next(operands)(**inputs)
+        for operand in operands:
+            if not isinstance(result, np.ndarray) and result <= 0.0:
+                return result
+            value = operand(**inputs)
+            if isinstance(result, np.ndarray) or isinstance(value, np.ndarray):
+                result = np.minimum(result, value)
+            else:
+                result = min(result, value)
+        return result
+
+
+class OrExpression(NaryExpression):
+    """ Represents a logical disjunction. For scalars the remaining operands are not evaluated once one of them is 1. """
+    __slots__ = ()
+
+    def __call__(self, **inputs: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        operands = iter(self._operands)
+        result = next(operands)(**inputs)
+        for operand in operands:
+            if not isinstance(result, np.ndarray) and result >= 1.0:
+                return result
+            value = operand(**inputs)
+            if isinstance(result, np.ndarray) or isinstance(value, np.ndarray):
+                result = np.maximum(result, value)
+            else:
+                result = max(result, value)
+        return result
 
 
 class Rule(NamedTuple):
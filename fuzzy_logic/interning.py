@@ -0,0 +1,39 @@
+from abc import ABCMeta
+from typing import Any, Dict, Tuple
+from weakref import WeakValueDictionary
+
+
+class Interned(ABCMeta):
+    """
+    Metaclass of immutable classes whose equal instances are shared - constructing an instance equal to an existing
+    one (with the same `intern_key`) returns the existing one (the new one is dropped). Each class has its own
+    instances, they are referenced weakly so the unused ones are freed (the classes need a `__weakref__` slot).
+    """
+
+    def __init__(cls, name: str, bases: Tuple[type, ...], namespace: Dict[str, Any], **kwargs):
+        super().__init__(name, bases, namespace, **kwargs)
+        cls._interned = WeakValueDictionary()
+
+    def __call__(cls, *args, **kwargs):
+        return cls.intern(super().__call__(*args, **kwargs))
+
+    def intern(cls, instance: Any) -> Any:
+        """ The shared instance equal to the given one (which becomes the shared one if there is none yet). """
+        return cls._interned.setdefault(instance.intern_key, instance)
+
+
+def slots_state(instance: Any) -> Dict[str, Any]:
+    """ Values of the slots (that are set) of an instance, declared by any of its classes. """
+    return {
+        name: getattr(instance, name)
+        for cls in type(instance).__mro__
+        for name in cls.__dict__.get('__slots__', ())
+        if name != '__weakref__' and hasattr(instance, name)
+    }
+
+
+def restore(cls: Interned, state: Dict[str, Any]) -> Any:
+    """ Unpickles an instance of an interned class (see `slots_state()`), returns the shared equal instance if there is one. """
+    instance = object.__new__(cls)
+    instance.__setstate__(state)
+    return cls.intern(instance)
@@ -1,13 +1,20 @@
+import math
 from abc import ABC, abstractmethod
-from typing import List, Tuple, Optional
+from bisect import bisect_left
+from typing import Any, Dict, List, Tuple, Optional, Union
+
+import numpy as np
+
+from fuzzy_logic.interning import Interned, restore, slots_state
 
 
 class Membership(ABC):
     """ Interface for all membership functions. """
+    __slots__ = ()
 
     @abstractmethod
-    def __call__(self, value: float) -> float:
-        """ Calculates the membership for the given input value. """
+    def __call__(self, value: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        """ Calculates the membership for the given input value (element-wise if given an array). """
 
     @property
     @abstractmethod
@@ -19,33 +26,103 @@ class Membership(ABC):
     def mass(self) -> float:
         """ Mass of the area under this membership function. """
 
+    @property
+    def support(self) -> Tuple[float, float]:
+        """
+        Closed interval outside of which the membership is zero (empty if its low end is above the high one).
+        It may be conservative, by default it is unbounded.
+        """
+        return -math.inf, math.inf
+
     @property
     @abstractmethod
     def plt_patch(self):
         """ Matplotlib patch in a shape of this membership function. """
 
 
-class PiecewiseMembership(Membership):
-    """ Defines membership function as a piecewise linear function. """
+class PiecewiseMembership(Membership, metaclass=Interned):
+    """
+    Defines membership function as a piecewise linear function.
+    The points are immutable so the geometry of the function is calculated once, at construction.
+    Segments are found by bisection of the breakpoints, so the evaluation is O(log n) in the number of points.
+    Memberships (of the same class) with the same points are a single shared instance (see `Interned`).
+    """
+    __slots__ = ('_points', '_x', '_y', '_dx', '_dy', '_xs', '_ys', '_mass', '_center', '_support', '__weakref__')
+
     def __init__(self, points: List[Tuple[float, float]]):
-        self._points = sorted(points)
+        self._points = tuple(sorted((float(x), float(y)) for x, y in points))
+
+        # breakpoints with rises and runs of the segments (that start at them) for the scalar evaluation
+        self._x = tuple(x for x, _ in self._points)
+        self._y = tuple(y for _, y in self._points)
+        self._dx = tuple(x2 - x1 for x1, x2 in zip(self._x, self._x[1:]))
+        self._dy = tuple(y2 - y1 for y1, y2 in zip(self._y, self._y[1:]))
+
+        # contiguous arrays of the breakpoints for the array evaluation
+        self._xs = np.array(self._x, dtype=float)
+        self._ys = np.array(self._y, dtype=float)
+        self._xs.flags.writeable = False
+        self._ys.flags.writeable = False
+
+        masses = [self._segment_mass(i) for i in range(len(self._points) - 1)]
+        centers = [self._segment_center(i) if m else 0.0 for i, m in enumerate(masses)]
+        self._mass = sum(masses)
+        self._center = (
+            sum(c * m for c, m in zip(centers, masses)) / self._mass
+            if self._mass else
+            (self._points[0][0] + self._points[-1][0]) / 2.0
+        )
+
+        # the function is zero outside of the breakpoints and between the neighbouring zero breakpoints
+        positive = [i for i, y in enumerate(self._y) if y > 0]
+        self._support = (
+            (self._x[max(positive[0] - 1, 0)], self._x[min(positive[-1] + 1, len(self._x) - 1)])
+            if positive else
+            (math.inf, -math.inf)
+        )
+
+    def __reduce__(self):
+        return restore, (type(self), slots_state(self))
+
+    def __setstate__(self, state: Dict[str, Any]):
+        for name, value in state.items():
+            setattr(self, name, value)
+        self._xs.flags.writeable = False
+        self._ys.flags.writeable = False
+
+    def __call__(self, value: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        if isinstance(value, np.ndarray):
+            return np.interp(value, self._xs, self._ys, left=0.0, right=0.0)
+
+        # a breakpoint belongs to the segment that ends at it (at a discontinuity the value on the left applies),
+        # so the segment always has a positive run
+        i = bisect_left(self._x, value) - 1
+        if i < 0:
+            return self._y[0] if value == self._x[0] else 0.0
+        if value > self._x[-1]:
+            return 0.0
+        return self._y[i] + self._dy[i] * (value - self._x[i]) / self._dx[i]
+
+    @property
+    def points(self) -> Tuple[Tuple[float, float], ...]:
+        """ Sorted points that define this piecewise linear function. """
+        return self._points
 
-    def __call__(self, value: float) -> float:
-        p = self._points
-        for i in range(len(p) - 1):
-            if p[i][0] <= value <= p[i+1][0]:
-                return p[i][1] + (p[i+1][1] - p[i][1]) * (value - p[i][0]) / (p[i+1][0] - p[i][0])
-        return 0.0
+    @property
+    def intern_key(self) -> Tuple[Tuple[float, float], ...]:
+        return self._points
 
     @property
     def center(self) -> float:
-        centers = list(map(self._segment_center, range(len(self._points) - 1)))
-        masses = list(map(self._segment_mass, range(len(self._points) - 1)))
-        return sum(c * m for c, m in zip(centers, masses)) / sum(masses)
+        return self._center
 
     @property
     def mass(self) -> float:
-        return sum(map(self._segment_mass, range(len(self._points) - 1)))
+        return self._mass
+
+    @property
+    def support(self) -> Tuple[float, float]:
+        return self._support
 
     def _segment_center(self, i: int) -> float:
         """ X coordinate of the center of mass of i-th segment. """
@@ -67,18 +144,37 @@ class PiecewiseMembership(Membership):
     def plt_patch(self):
         from matplotlib.patches import Polygon
         return Polygon(
-            [(self._points[0][0], 0.0)] + self._points + [(self._points[-1][0], 0.0)]
+            [(self._points[0][0], 0.0)] + list(self._points) + [(self._points[-1][0], 0.0)]
         )
 
 
 class TriangularMembership(PiecewiseMembership):
     """ Defines membership function in a shape of a triangle. """
+    __slots__ = ('_min', '_max', '_rise', '_fall', '_fast')
+
     def __init__(self, val_min: float, val_mid: float, val_max: float):
         super().__init__([(val_min, 0.0), (val_mid, 1.0), (val_max, 0.0)])
+        self._min, self._max = val_min, val_max
+        self._rise, self._fall = val_mid - val_min, val_max - val_mid
+        self._fast = self._rise > 0 and self._fall > 0
+
+    def __call__(self, value: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        if not self._fast:
+            return super().__call__(value)
+
+        left = (value - self._min) / self._rise
+        right = (self._max - value) / self._fall
+        if isinstance(value, np.ndarray):
+            return np.clip(np.minimum(left, right), 0.0, None)
+
+        low = left if left < right else right
+        return low if low > 0.0 else 0.0
 
 
 class TrapezoidalMembership(PiecewiseMembership):
     """ Defines membership function in a shape of a trapezoid. """
+    __slots__ = ('_min', '_max', '_rise', '_fall', '_fast')
+
     def __init__(self, val_min: Optional[float], val_mid_low: float, val_mid_high: float, val_max: Optional[float]):
         points = [(val_mid_low, 1.0), (val_mid_high, 1.0)]
         if val_min is not None:
@@ -86,3 +182,22 @@ class TrapezoidalMembership(PiecewiseMembership):
         if val_max is not None:
             points = points + [(val_max, 0.0)]
         super().__init__(points)
+
+        # right trapezoids have a discontinuity so only the ones with both slopes get the fast path
+        self._min, self._max = val_min, val_max
+        self._fast = val_min is not None and val_max is not None and val_min < val_mid_low <= val_mid_high < val_max
+        if self._fast:
+            self._rise, self._fall = val_mid_low - val_min, val_max - val_mid_high
+
+    def __call__(self, value: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+        if not self._fast:
+            return super().__call__(value)
+
+        left = (value - self._min) / self._rise
+        right = (self._max - value) / self._fall
+        if isinstance(value, np.ndarray):
+            return np.clip(np.minimum(left, right), 0.0, 1.0)
+
+        low = left if left < right else right
+        low = low if low < 1.0 else 1.0
+        return low if low > 0.0 else 0.0
@@ -0,0 +1,174 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Mapping, Sequence, Union
+
+import numpy as np
+
+from fuzzy_logic import Expression, NotExpression, AndExpression, OrExpression
+
+Value = Union[float, np.ndarray]
+
+
+class Operators(ABC):
+    """
+    Family of fuzzy logic operators - a t-norm (conjunction), its dual t-conorm (disjunction) and the standard
+    negation. Programs are compiled with the source of the n-ary operations given by the family, so the choice
+    of the family costs nothing at evaluation. Expression trees are evaluated by folding its binary operations (see `evaluate()`).
+    """
+
+    @abstractmethod
+    def conjunction(self, left: Value, right: Value) -> Value:
+        """ T-norm of the given degrees (element-wise for arrays). """
+
+    @abstractmethod
+    def disjunction(self, left: Value, right: Value) -> Value:
+        """ T-conorm of the given degrees (element-wise for arrays). """
+
+    def negation(self, value: Value) -> Value:
+        """ Complement of the given degree (element-wise for arrays). """
+        return 1 - value
+
+    @abstractmethod
+    def conjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        """ Python source of the t-norm of all the given operands at once (of arrays if `batch`). """
+
+    @abstractmethod
+    def disjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        """ Python source of the t-conorm of all the given operands at once (of arrays if `batch`). """
+
+    def negation_source(self, operand: str, batch: bool) -> str:
+        """ Python source of the complement of the operand. """
+        return f'1 - {operand}'
+
+    @property
+    def namespace(self) -> Dict[str, Any]:
+        """ Helpers used by the generated source. """
+        return {}
+
+    def evaluate(self, expression: Expression, inputs: Mapping[str, Value]) -> Value:
+        """
+        Evaluates the expression tree by the operators of this family. Scalars are short-circuited the same way
+        as by the expressions themselves (zero is absorbing for any t-norm, one for any t-conorm).
+        """
+        if isinstance(expression, NotExpression):
+            return self.negation(self.evaluate(expression.operand, inputs))
+        if isinstance(expression, AndExpression):
+            return self._fold(self.conjunction, 0.0, expression.operands, inputs)
+        if isinstance(expression, OrExpression):
+            return self._fold(self.disjunction, 1.0, expression.operands, inputs)
+        return expression(**inputs)
+
+    def _fold(self, operation: Callable[[Value, Value], Value], absorbing: float,
+              operands: Sequence[Expression], inputs: Mapping[str, Value]) -> Value:
+        """ Folds the values of the operands by the binary operation, stops at the absorbing element for scalars. """
+        operands = iter(operands)
+        result = self.evaluate(next(operands), inputs)
+        for operand in operands:
+            if not isinstance(result, np.ndarray) and result == absorbing:
+                return absorbing
+            result = operation(result, self.evaluate(operand, inputs))
+        return result
+
+
+class ZadehOperators(Operators):
+    """ Minimum and maximum (the operators the expressions implement themselves). """
+
+    def conjunction(self, left: Value, right: Value) -> Value:
+        return np.minimum(left, right) if isinstance(left, np.ndarray) or isinstance(right, np.ndarray) else min(left, right)
+
+    def disjunction(self, left: Value, right: Value) -> Value:
+        return np.maximum(left, right) if isinstance(left, np.ndarray) or isinstance(right, np.ndarray) else max(left, right)
+
+    def conjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        return _reduction('min', 'minimum', operands, batch)
+
+    def disjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        return _reduction('max', 'maximum', operands, batch)
+
+    def evaluate(self, expression: Expression, inputs: Mapping[str, Value]) -> Value:
+        return expression(**inputs)
+
+
+class ProductOperators(Operators):
+    """ Algebraic product and probabilistic sum. """
+
+    def conjunction(self, left: Value, right: Value) -> Value:
+        return left * right
+
+    def disjunction(self, left: Value, right: Value) -> Value:
+        return left + right - left * right
+
+    def conjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        return ' * '.join(operands)
+
+    def disjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        return f'1.0 - {" * ".join(f"(1.0 - {operand})" for operand in operands)}'
+
+
+class LukasiewiczOperators(Operators):
+    """ Bounded difference and bounded sum. """
+
+    def conjunction(self, left: Value, right: Value) -> Value:
+        return np.maximum(left + right - 1.0, 0.0) if isinstance(left + right, np.ndarray) else max(left + right - 1.0, 0.0)
+
+    def disjunction(self, left: Value, right: Value) -> Value:
+        return np.minimum(left + right, 1.0) if isinstance(left + right, np.ndarray) else min(left + right, 1.0)
+
+    def conjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        return f'{"maximum" if batch else "max"}({" + ".join(operands)} - {float(len(operands) - 1)!r}, 0.0)'
+
+    def disjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        return f'{"minimum" if batch else "min"}({" + ".join(operands)}, 1.0)'
+
+
+class HamacherOperators(Operators):
+    """
+    Hamacher product `ab / (a + b - ab)` and its dual sum `(a + b - 2ab) / (1 - ab)`. Both are reduced at once
+    through their additive generators - the t-norm of n degrees is `1 / (1 + sum(1 / a - 1))`.
+    """
+
+    def conjunction(self, left: Value, right: Value) -> Value:
+        return _hamacher_conjunction(left, right)
+
+    def disjunction(self, left: Value, right: Value) -> Value:
+        return _hamacher_disjunction(left, right)
+
+    def conjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        if batch:
+            return f'hamacher_conjunction({", ".join(operands)})'
+        generators = ' + '.join(f'(1.0 / {operand} - 1.0)' for operand in operands)
+        return f'(0.0 if min({", ".join(operands)}) <= 0.0 else 1.0 / (1.0 + {generators}))'
+
+    def disjunction_source(self, operands: Sequence[str], batch: bool) -> str:
+        if batch:
+            return f'hamacher_disjunction({", ".join(operands)})'
+        generators = ' + '.join(f'(1.0 / (1.0 - {operand}) - 1.0)' for operand in operands)
+        return f'(1.0 if max({", ".join(operands)}) >= 1.0 else 1.0 - 1.0 / (1.0 + {generators}))'
+
+    @property
+    def namespace(self) -> Dict[str, Any]:
+        return dict(hamacher_conjunction=_hamacher_conjunction, hamacher_disjunction=_hamacher_disjunction)
+
+
+def _reduction(function: str, ufunc: str, operands: Sequence[str], batch: bool) -> str:
+    """ Source of a reduction of the operands by a python function, or a numpy ufunc for arrays. """
+    if not batch:
+        return f'{function}({", ".join(operands)})'
+    if len(operands) == 2:
+        return f'{ufunc}({operands[0]}, {operands[1]})'
+    return f'{ufunc}.reduce(({", ".join(operands)}))'
+
+
+def _hamacher_conjunction(*values: Value) -> Value:
+    """ Hamacher product of all the degrees (zero degrees give infinite generators, so the product is zero). """
+    if not any(isinstance(value, np.ndarray) for value in values):
+        return 0.0 if min(values) <= 0.0 else 1.0 / (1.0 + sum(1.0 / value - 1.0 for value in values))
+    with np.errstate(divide='ignore'):
+        return 1.0 / (1.0 + sum(1.0 / np.asarray(value, dtype=float) - 1.0 for value in values))
+
+
+def _hamacher_disjunction(*values: Value) -> Value:
+    """ Hamacher sum of all the degrees (the dual of the product). """
+    if not any(isinstance(value, np.ndarray) for value in values):
+        return 1.0 if max(values) >= 1.0 else 1.0 - 1.0 / (1.0 + sum(1.0 / (1.0 - value) - 1.0 for value in values))
+    with np.errstate(divide='ignore'):
+        return 1.0 - 1.0 / (1.0 + sum(1.0 / (1.0 - np.asarray(value, dtype=float)) - 1.0 for value in values))
@@ -0,0 +1,182 @@
+import json
+from typing import Dict, List, Sequence, Union, Set, TYPE_CHECKING
+
+import numpy as np
+
+from fuzzy_logic import Expression, Term, Rule, NotExpression, AndExpression, OrExpression
+
+if TYPE_CHECKING:
+    from fuzzy_logic.compiler import Program
+
+
+def describe(expression: Union[Expression, Rule]) -> str:
+    """ Textual representation of an expression or rule, e.g. `(speed.low & ~distance.near) >> acceleration.high`. """
+    if isinstance(expression, Rule):
+        return f'{describe(expression.antecedent)} >> {describe(expression.consequent)}'
+    if isinstance(expression, Term):
+        return f'{expression.variable}.{expression.label}'
+    if isinstance(expression, NotExpression):
+        return f'~{describe(expression.operand)}'
+    if isinstance(expression, AndExpression):
+        return f'({" & ".join(map(describe, expression.operands))})'
+    if isinstance(expression, OrExpression):
+        return f'({" | ".join(map(describe, expression.operands))})'
+    return type(expression).__name__
+
+
+class Profile:
+    """
+    Statistics of the evaluations of an instrumented program (see `System.enable_profiling()`).
+    For each node of the program it records the number of evaluations (of single values, so a batch of N inputs
+    counts N times), their cumulative duration (of the node alone, excluding its operands), the maximal and
+    the histogram of the computed degrees (firing strengths). The statistics of the rules and memberships
+    are derived from the nodes that evaluate them.
+    """
+
+    def __init__(self, rules: Sequence[Rule] = (), bins: int = 10):
+        self._rules = list(rules)
+        self._bins = bins
+        self._program = None
+        self._rule_slots: List[int] = []
+        self.reset()
+
+    def attach(self, program: 'Program'):
+        """ Sizes the statistics to the nodes of the given program (called by the program itself). """
+        self._program = program
+        self._rule_slots = [program.slot(rule.antecedent) for rule in self._rules]
+        self.reset()
+
+    def reset(self):
+        """ Clears all the recorded statistics. """
+        size = len(self._program.instructions) if self._program is not None else 0
+        self._evaluations = 0
+        self._time = 0.0
+        self._counts = [0] * size
+        self._fired = [0] * size
+        self._times = [0.0] * size
+        self._maxima = [0.0] * size
+        self._histograms = [[0] * self._bins for _ in range(size)]
+
+    def record(self, slot: int, value: Union[float, np.ndarray], elapsed: float):
+        """ Records a single evaluation of a node. """
+        self._times[slot] += elapsed
+        if isinstance(value, np.ndarray):
+            self._counts[slot] += value.size
+            self._fired[slot] += int(np.count_nonzero(value > 0))
+            self._maxima[slot] = max(self._maxima[slot], float(np.max(value, initial=0.0)))
+            bins = np.clip(np.nan_to_num(value) * self._bins, 0, self._bins - 1).astype(int)
+            histogram = np.bincount(bins.ravel(), minlength=self._bins)
+            self._histograms[slot] = [a + b for a, b in zip(self._histograms[slot], histogram.tolist())]
+        else:
+            self._counts[slot] += 1
+            if value > 0:
+                self._fired[slot] += 1
+                if value > self._maxima[slot]:
+                    self._maxima[slot] = value
+            self._histograms[slot][min(max(int(value * self._bins), 0), self._bins - 1)] += 1
+
+    def evaluated(self, value: Union[float, np.ndarray], elapsed: float):
+        """ Records a whole evaluation of the program (`value` is any of its inputs, to count the batch size). """
+        self._evaluations += np.size(value)
+        self._time += elapsed
+
+    @property
+    def antecedents(self) -> List[Expression]:
+        """ Antecedents of the profiled rules. """
+        return [rule.antecedent for rule in self._rules]
+
+    @property
+    def bins(self) -> int:
+        """ Number of the bins of the histograms of the degrees. """
+        return self._bins
+
+    @property
+    def evaluations(self) -> int:
+        return self._evaluations
+
+    @property
+    def nodes(self) -> List[Dict]:
+        """ Statistics of each node of the program (in the order of its instructions). """
+        if self._program is None:
+            return []
+        return [
+            dict(
+                slot=slot,
+                op=instruction.op,
+                args=list(instruction.args),
+                term=describe(instruction.term) if instruction.term is not None else None,
+                **self._statistics(slot)
+            )
+            for slot, instruction in enumerate(self._program.instructions)
+        ]
+
+    @property
+    def memberships(self) -> Dict[str, Dict]:
+        """
+        Statistics of the evaluations of the memberships of the input terms (keyed by `variable.label`).
+        Terms of a variable with the same membership (but different labels) share a node, each of them is reported
+        with the statistics of the shared node.
+        """
+        if self._program is None:
+            return {}
+        labels: Dict[int, Set[str]] = {
+            slot: {describe(instruction.term)}
+            for slot, instruction in enumerate(self._program.instructions) if instruction.op == 'term'
+        }
+        for rule in self._rules:
+            for term in rule.antecedent.terms:
+                labels[self._program.slot(term)].add(describe(term))
+        return {
+            label: self._statistics(slot)
+            for slot in sorted(labels) for label in sorted(labels[slot])
+        }
+
+    @property
+    def rules(self) -> List[Dict]:
+        """
+        Statistics of the rules (as given to the system, before they are merged) - of the firing strengths of their
+        antecedents and the cumulative time spent in the nodes of their antecedents (shared nodes count in each rule).
+        """
+        return [
+            dict(rule=describe(rule), **self._statistics(slot), subtree_time=sum(self._times[s] for s in self._subtree(slot)))
+            for rule, slot in zip(self._rules, self._rule_slots)
+        ]
+
+    def never_fired(self) -> List[Rule]:
+        """ Rules whose antecedent was zero in all the recorded evaluations (candidates for pruning). """
+        return [rule for rule, slot in zip(self._rules, self._rule_slots) if self._fired[slot] == 0]
+
+    def to_dict(self) -> Dict:
+        """ All the statistics as plain python objects. """
+        return {
+            'evaluations': self._evaluations,
+            'time': self._time,
+            'bins': self._bins,
+            'nodes': self.nodes,
+            'memberships': self.memberships,
+            'rules': self.rules,
+            'never_fired': [describe(rule) for rule in self.never_fired()],
+        }
+
+    def to_json(self, **kwargs) -> str:
+        """ All the statistics serialized as JSON (keyword arguments are passed to `json.dumps()`). """
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def _statistics(self, slot: int) -> Dict:
+        return {
+            'count': self._counts[slot],
+            'fired': self._fired[slot],
+            'time': self._times[slot],
+            'max': self._maxima[slot],
+            'histogram': list(self._histograms[slot]),
+        }
+
+    def _subtree(self, slot: int) -> Set[int]:
+        """ Slots of the nodes needed to evaluate the given one. """
+        slots, stack = set(), [slot]
+        while stack:
+            current = stack.pop()
+            if current not in slots:
+                slots.add(current)
+                stack.extend(self._program.instructions[current].args)
+        return slots
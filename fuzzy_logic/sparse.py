@@ -0,0 +1,269 @@
+import math
+from bisect import bisect_left, insort
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from fuzzy_logic import Expression, Term, Rule, AndExpression, OrExpression
+from fuzzy_logic.defuzzification import Defuzzifier, WeightedCentroid
+from fuzzy_logic.operators import Operators, ZadehOperators
+
+# closed interval of input values
+Interval = Tuple[float, float]
+UNBOUNDED: Interval = (-math.inf, math.inf)
+EMPTY: Interval = (math.inf, -math.inf)
+
+
+def activation_bounds(expression: Expression) -> Dict[str, Interval]:
+    """
+    Conservative bounds of the inputs for which the expression can be non-zero - outside of the interval of any
+    of the returned variables the expression is zero. Variables which do not constrain the expression are left out.
+    """
+    if isinstance(expression, Term):
+        return {expression.variable: expression.membership.support}
+    if isinstance(expression, AndExpression):
+        bounds = {}
+        for operand in expression.operands:
+            for variable, (low, high) in activation_bounds(operand).items():
+                other_low, other_high = bounds.get(variable, UNBOUNDED)
+                bounds[variable] = (max(low, other_low), min(high, other_high))
+        return bounds
+    if isinstance(expression, OrExpression):
+        operands = iter(expression.operands)
+        bounds = activation_bounds(next(operands))
+        for operand in operands:
+            other = activation_bounds(operand)
+            bounds = {
+                variable: (min(bounds[variable][0], other[variable][0]), max(bounds[variable][1], other[variable][1]))
+                for variable in bounds.keys() & other.keys()
+            }
+        return bounds
+    # negations (and unknown expressions) can be non-zero anywhere
+    return {}
+
+
+def _coverage(interval: Interval, bounds: Interval) -> float:
+    """ Fraction of the bounds covered by the interval. """
+    low, high = max(interval[0], bounds[0]), min(interval[1], bounds[1])
+    if low > high:
+        return 0.0
+    width = bounds[1] - bounds[0]
+    return (high - low) / width if 0 < width < math.inf else 1.0
+
+
+class IntervalIndex:
+    """
+    Index of the intervals of a single variable. The endpoints of the intervals split the line into cells
+    (the open segments between the endpoints and the endpoints themselves), each of them stores a bit mask
+    of the intervals which contain it, so a query is a bisection of the endpoints.
+    """
+
+    def __init__(self, intervals: Sequence[Interval]):
+        self._endpoints = sorted(set(x for interval in intervals for x in interval if math.isfinite(x)))
+        cells = 2 * len(self._endpoints) + 1
+
+        # bits of the intervals are toggled at their first and after their last cell and accumulated
+        toggles = [0] * (cells + 1)
+        for i, interval in enumerate(intervals):
+            if interval[0] > interval[1]:
+                continue
+            first, last = self._cells(interval)
+            toggles[first] ^= 1 << i
+            toggles[last + 1] ^= 1 << i
+
+        self._masks, mask = [], 0
+        for toggle in toggles[:-1]:
+            mask ^= toggle
+            self._masks.append(mask)
+
+    def __call__(self, value: float) -> int:
+        """ Bit mask of the intervals that contain the given value. """
+        i = bisect_left(self._endpoints, value)
+        if i < len(self._endpoints) and self._endpoints[i] == value:
+            return self._masks[2 * i + 1]
+        return self._masks[2 * i]
+
+    def add(self, i: int, interval: Interval):
+        """ Adds an interval under the given bit (which should not be used by any other interval). """
+        low, high = interval
+        if low > high:
+            return
+        for x in (low, high):
+            k = bisect_left(self._endpoints, x)
+            if math.isfinite(x) and (k == len(self._endpoints) or self._endpoints[k] != x):
+                # the new endpoint splits its segment into two segments and the point itself
+                self._endpoints.insert(k, x)
+                self._masks[2 * k:2 * k] = [self._masks[2 * k]] * 2
+        first, last = self._cells(interval)
+        for cell in range(first, last + 1):
+            self._masks[cell] |= 1 << i
+
+    def remove(self, i: int):
+        """ Removes the interval under the given bit (its endpoints are kept). """
+        mask = ~(1 << i)
+        self._masks = [cell & mask for cell in self._masks]
+
+    def _cells(self, interval: Interval) -> Tuple[int, int]:
+        """ First and last cell of an interval whose endpoints are in the index. """
+        low, high = interval
+        first = 0 if low == -math.inf else 2 * bisect_left(self._endpoints, low) + 1
+        last = 2 * len(self._endpoints) if high == math.inf else 2 * bisect_left(self._endpoints, high) + 1
+        return first, last
+
+
+class SparseRules:
+    """
+    Evaluates only the rules that can fire for the given inputs. Antecedents are indexed by the supports of their
+    memberships per input variable, so the cost of an evaluation scales with the number of active rules.
+    Rules are given in groups that are merged (by disjunction) into a single rule, the strength of a group is
+    the disjunction of the strengths of its active rules (the inactive ones are zero, which does not change it).
+    """
+
+    def __init__(self,
+                 groups: Sequence[Tuple[Term, Sequence[Rule]]],
+                 defuzzifier: Optional[Defuzzifier] = None,
+                 operators: Optional[Operators] = None):
+        self._defuzzifier = defuzzifier or WeightedCentroid()
+        self._operators = operators or ZadehOperators()
+        # rules with their groups by their bits (removed rules leave free bits)
+        self._rules: List[Optional[Tuple[Rule, int]]] = [
+            (rule, group) for group, (_, rules) in enumerate(groups) for rule in rules
+        ]
+        self._free: List[int] = []
+        self._consequents = {consequent: group for group, (consequent, _) in enumerate(groups)}
+        self._groups = [
+            (consequent.variable, consequent.membership.center, consequent.membership.mass)
+            for consequent, _ in groups
+        ]
+        self._variables = sorted(set(variable for variable, _, _ in self._groups))
+        self._outputs = {
+            variable: (
+                [group for group, (consequent, _) in enumerate(groups) if consequent.variable == variable],
+                [consequent.membership for consequent, _ in groups if consequent.variable == variable]
+            )
+            for variable in self._variables
+        }
+
+        bounds = [activation_bounds(rule.antecedent) for rule, _ in self._rules]
+        inputs = sorted(set(variable for rule_bounds in bounds for variable in rule_bounds))
+        self._indices = [
+            (variable, IntervalIndex([rule_bounds.get(variable, UNBOUNDED) for rule_bounds in bounds]))
+            for variable in inputs
+        ]
+        self._all = (1 << len(self._rules)) - 1
+
+        # expected fraction of the active rules, assuming uniformly distributed inputs (within the bounds of the rules),
+        # rules with an empty interval (that can never fire) cover nothing
+        ranges = {}
+        for variable in inputs:
+            intervals = [b[variable] for b in bounds if variable in b and b[variable][0] <= b[variable][1]]
+            if intervals:
+                ranges[variable] = (min(low for low, _ in intervals), max(high for _, high in intervals))
+        self._selectivity = sum(
+            math.prod(
+                _coverage(rule_bounds[variable], ranges[variable]) if variable in ranges else 0.0
+                for variable in rule_bounds
+            )
+            for rule_bounds in bounds
+        ) / max(len(bounds), 1)
+
+    def __call__(self, inputs: Mapping[str, float]) -> Dict[str, float]:
+        """ Evaluates the rules for the given inputs (the same way as `evaluate_variable()` does, with the same defuzzifier and operators). """
+        mask = self._all
+        for variable, index in self._indices:
+            mask &= index(inputs[variable])
+
+        strengths = {}
+        zadeh = isinstance(self._operators, ZadehOperators)
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            rule, group = self._rules[bit.bit_length() - 1]
+            strength = self._operators.evaluate(rule.antecedent, inputs)
+            if zadeh:
+                if strength > strengths.get(group, 0.0):
+                    strengths[group] = strength
+            elif group in strengths:
+                strengths[group] = self._operators.disjunction(strengths[group], strength)
+            else:
+                strengths[group] = strength
+
+        if not isinstance(self._defuzzifier, WeightedCentroid):
+            return {
+                variable: self._defuzzifier(memberships, [strengths.get(group, 0.0) for group in variable_groups])
+                for variable, (variable_groups, memberships) in self._outputs.items()
+            }
+
+        numerators = dict.fromkeys(self._variables, 0.0)
+        denominators = dict.fromkeys(self._variables, 0.0)
+        for group in sorted(strengths):
+            variable, center, mass = self._groups[group]
+            scaled_mass = mass * strengths[group]
+            numerators[variable] += center * scaled_mass
+            denominators[variable] += scaled_mass
+        fallback = self._defuzzifier.fallback
+        return {
+            variable: numerators[variable] / denominators[variable] if denominators[variable] > 0 else fallback
+            for variable in self._variables
+        }
+
+    def add(self, rule: Rule):
+        """ Indexes another rule, it is merged with the indexed rules of the same consequent. """
+        consequent = rule.consequent
+        group = self._consequents.get(consequent)
+        if group is None:
+            group = self._consequents[consequent] = len(self._groups)
+            self._groups.append((consequent.variable, consequent.membership.center, consequent.membership.mass))
+            if consequent.variable not in self._outputs:
+                insort(self._variables, consequent.variable)
+                self._outputs = {variable: self._outputs.get(variable, ([], [])) for variable in self._variables}
+            groups, memberships = self._outputs[consequent.variable]
+            groups.append(group)
+            memberships.append(consequent.membership)
+
+        i = self._free.pop() if self._free else len(self._rules)
+        bounds = activation_bounds(rule.antecedent)
+        for variable in sorted(bounds.keys() - set(variable for variable, _ in self._indices)):
+            # the indexed rules do not depend on a new variable (the free bits are not in any interval)
+            self._indices.append((variable, IntervalIndex([UNBOUNDED if entry else EMPTY for entry in self._rules])))
+        for variable, index in self._indices:
+            index.add(i, bounds.get(variable, UNBOUNDED))
+
+        if i == len(self._rules):
+            self._rules.append(None)
+        self._rules[i] = (rule, group)
+        self._all |= 1 << i
+
+    def remove(self, rule: Rule):
+        """ Removes an indexed rule (the same object), raises ValueError if it is not indexed. """
+        for i, entry in enumerate(self._rules):
+            if entry is not None and entry[0] is rule:
+                break
+        else:
+            raise ValueError('The rule is not indexed')
+
+        group = self._rules[i][1]
+        self._rules[i] = None
+        self._free.append(i)
+        self._all &= ~(1 << i)
+        for _, index in self._indices:
+            index.remove(i)
+
+        if not any(entry is not None and entry[1] == group for entry in self._rules):
+            del self._consequents[rule.consequent]
+            groups, memberships = self._outputs[rule.consequent.variable]
+            position = groups.index(group)
+            del groups[position], memberships[position]
+            if not groups:
+                self._variables.remove(rule.consequent.variable)
+                del self._outputs[rule.consequent.variable]
+
+    @property
+    def selectivity(self) -> float:
+        """ Estimated fraction of the rules that can fire for an input (estimated for the rules given initially). """
+        return self._selectivity
+
+    def active(self, inputs: Mapping[str, float]) -> List[Rule]:
+        """ Rules that can fire for the given inputs. """
+        mask = self._all
+        for variable, index in self._indices:
+            mask &= index(inputs[variable])
+        return [entry[0] for i, entry in enumerate(self._rules) if mask >> i & 1]
@@ -1,17 +1,52 @@
-import functools
 import itertools
+import math
 import operator
-from typing import Iterable, Dict, List
+from typing import Iterable, Dict, List, Mapping, Union, Optional, Sequence, Tuple, TYPE_CHECKING
 
-from fuzzy_logic import Rule
+import numpy as np
+
+from fuzzy_logic import Rule, Term, OrExpression
+from fuzzy_logic.compiler import Program
+from fuzzy_logic.defuzzification import Defuzzifier, WeightedCentroid
+from fuzzy_logic.operators import Operators, ZadehOperators
+from fuzzy_logic.sparse import SparseRules
+
+if TYPE_CHECKING:
+    from fuzzy_logic.profiling import Profile
+
+# systems evaluate single inputs sparsely by default if they have at least this many rules
+# and at most this fraction of them is expected to be active for an input
+SPARSE_RULES = 64
+SPARSE_SELECTIVITY = 0.2
+
+
+def merge_groups(rules: Iterable[Rule]) -> List[Tuple[Term, List[Rule]]]:
+    """
+    Groups of rules that are merged into a single rule by `cleanup_rules()`, with their common consequent.
+    Rules are grouped by the identity of their consequent across all the rules (not only adjacent ones),
+    groups are in the order of the first rules of their consequents.
+    """
+    groups: Dict[Term, List[Rule]] = {}
+    for rule in rules:
+        groups.setdefault(rule.consequent, []).append(rule)
+    return list(groups.items())
+
+
+def merge_rules(consequent: Term, rules: Sequence[Rule]) -> Rule:
+    """ Single rule with the given consequent whose antecedent is the disjunction of the antecedents of the rules. """
+    antecedent = OrExpression(*map(operator.attrgetter('antecedent'), rules))
+    if len(antecedent.operands) == 1:
+        antecedent, = antecedent.operands
+    return antecedent >> consequent
 
 
 def cleanup_rules(rules: Iterable[Rule]) -> Iterable[Rule]:
-    """ Cleans up a set of rules by merging rules wih the same consequent. """
-    for consequent, rules in itertools.groupby(rules, key=operator.attrgetter('consequent')):
-        antecedent = map(operator.attrgetter('antecedent'), rules)
-        antecedent = functools.reduce(operator.__or__, antecedent)
-        yield antecedent >> consequent
+    """
+    Cleans up a set of rules by merging rules wih the same consequent. The antecedents of the merged rules
+    are the operands of a single (flat) disjunction.
+    """
+    for consequent, rules in merge_groups(rules):
+        yield merge_rules(consequent, rules)
 
 
 def group_rules(rules: Iterable[Rule]) -> Dict[str, List[Rule]]:
@@ -22,32 +57,194 @@ def group_rules(rules: Iterable[Rule]) -> Dict[str, List[Rule]]:
     return dict(groups)
 
 
-def evaluate_variable(rules: Iterable[Rule], inputs: Dict[str, float]) -> float:
-    """ Evaluates a variable using the given inputs and rules (that all should be for this variable). """
+def evaluate_variable(rules: Iterable[Rule],
+                      inputs: Mapping[str, Union[float, np.ndarray]],
+                      defuzzifier: Optional[Defuzzifier] = None,
+                      operators: Optional[Operators] = None) -> Union[float, np.ndarray]:
+    """
+    Evaluates a variable using the given inputs and rules (that all should be for this variable).
+    If the inputs are arrays the variable is evaluated element-wise for all of them at once.
+    Without a defuzzifier the value is the weighted centroid of the consequents, without operators
+    the antecedents are evaluated by the Zadeh operators.
+    """
+    rules = list(rules)
+    if operators is None:
+        values = [r.antecedent(**inputs) for r in rules]
+    else:
+        values = [operators.evaluate(r.antecedent, inputs) for r in rules]
+    if defuzzifier is not None and not isinstance(defuzzifier, WeightedCentroid):
+        return defuzzifier([r.consequent.membership for r in rules], values)
+
     centers = [r.consequent.membership.center for r in rules]
     masses = [r.consequent.membership.mass for r in rules]
-    values = [r.antecedent(**inputs) for r in rules]
+    fallback = defuzzifier.fallback if defuzzifier is not None else math.nan
 
     scaled_masses = [m * v for m, v in zip(masses, values)]
     weighted_centers = [c * m for c, m in zip(centers, scaled_masses)]
 
-    return sum(weighted_centers) / sum(scaled_masses)
+    numerator, denominator = sum(weighted_centers), sum(scaled_masses)
+    if isinstance(denominator, np.ndarray):
+        return np.divide(numerator, denominator, out=np.full(denominator.shape, fallback), where=denominator > 0)
+    return numerator / denominator if denominator > 0 else fallback
 
 
 class System:
-    """ Represents a fuzzy logic system that consists of rules. """
+    """
+    Represents a fuzzy logic system that consists of rules.
+    By default the rules are compiled into a flat program, with `compiled=False` the expression trees
+    are evaluated directly which is much slower but useful for debugging.
+    Profiling (see `enable_profiling()`) swaps in an instrumented program, so it costs nothing while disabled.
 
-    def __init__(self, *rules: Rule):
-        rules = cleanup_rules(rules)
-        self._rules = group_rules(rules)
+    Rules are indexed by the supports of the memberships in their antecedents. With `sparse` (by default for large
+    rule bases whose rules have narrow supports) single inputs are evaluated by only the rules that can fire
+    for them, batches are always evaluated by all the rules.
+
+    Output variables are defuzzified by the given defuzzifier (see `fuzzy_logic.defuzzification`), by default
+    by the weighted centroid of the consequents. If no rule of a variable fires its value is the fallback
+    of the defuzzifier (NaN by default).
+
+    Antecedents are evaluated by the given family of operators (see `fuzzy_logic.operators`), by default
+    by the Zadeh operators (minimum and maximum). The family is compiled into the program.
+    """
+
+    def __init__(self,
+                 *rules: Rule,
+                 compiled: bool = True,
+                 sparse: Optional[bool] = None,
+                 defuzzifier: Optional[Defuzzifier] = None,
+                 operators: Optional[Operators] = None):
+        self._source_rules = list(rules)
+        self._defuzzifier = defuzzifier or WeightedCentroid()
+        self._operators = operators or ZadehOperators()
+        self._groups = dict(merge_groups(rules))
+        self._rules = group_rules(merge_rules(consequent, group) for consequent, group in self._groups.items())
+        self._compiled = Program(self._rules, defuzzifier=self._defuzzifier, operators=self._operators) if compiled else None
+        self._program = self._compiled
+        # the sparse index is built only once it is needed (see `_sparse_index()`)
+        self._index: Optional[SparseRules] = None
+        self._sparse_enabled = (
+            len(rules) >= SPARSE_RULES and self._sparse_index().selectivity <= SPARSE_SELECTIVITY
+            if sparse is None else
+            sparse
+        )
+        self._sparse = self._sparse_index() if self._sparse_enabled else None
+        self._profile: Optional['Profile'] = None
 
     def __call__(self, **inputs: float) -> Dict[str, float]:
         """ Evaluate this fuzzy logic system for the given inputs. """
+        if self._sparse is not None:
+            return self._sparse(inputs)
+        if self._program is not None:
+            return self._program(inputs)
+        return {
+            variable: evaluate_variable(rules, inputs, self._defuzzifier, self._operators)
+            for variable, rules in self._rules.items()
+        }
+
+    def evaluate_batch(self, inputs: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """ Evaluate this fuzzy logic system for whole arrays of inputs at once. """
+        arrays = np.broadcast_arrays(*(np.asarray(value, dtype=float) for value in inputs.values()))
+        inputs = dict(zip(inputs.keys(), arrays))
+        if self._program is not None:
+            return self._program.batch(inputs)
         return {
-            variable: evaluate_variable(rules, inputs)
+            variable: evaluate_variable(rules, inputs, self._defuzzifier, self._operators)
             for variable, rules in self._rules.items()
         }
 
+    def enable_profiling(self, bins: int = 10) -> 'Profile':
+        """
+        Starts recording the statistics of all the following evaluations of this system (per rule, node and
+        membership, see `Profile`) into a new profile. While profiling the system is always evaluated by
+        an instrumented program (also when it is sparse).
+        """
+        from fuzzy_logic.profiling import Profile
+
+        self._sparse = None
+        self._profile = Profile(self._source_rules, bins)
+        self._program = Program(self._rules, profile=self._profile, defuzzifier=self._defuzzifier, operators=self._operators)
+        return self._profile
+
+    def disable_profiling(self) -> Optional['Profile']:
+        """ Stops profiling and returns the recorded profile. """
+        profile, self._profile = self._profile, None
+        self._program = self._compiled
+        self._sparse = self._sparse_index() if self._sparse_enabled else None
+        return profile
+
+    def add_rule(self, rule: Rule):
+        """
+        Adds a rule to this system. Only the merged rule of its consequent is compiled (the program is generated
+        again by the next evaluation) and the rule is added to the sparse index, the other rules are kept as they are.
+        If profiling is enabled it starts again with a new profile (of all the rules).
+        """
+        self._source_rules.append(rule)
+        self._groups.setdefault(rule.consequent, []).append(rule)
+        if self._index is not None:
+            self._index.add(rule)
+        self._merge(rule.consequent)
+
+    def remove_rule(self, rule: Rule):
+        """ Removes a rule from this system (the same way as `add_rule()` adds it), raises ValueError if it is not in the system. """
+        rule = self._source_rules.pop(self._source_rules.index(rule))
+        group = self._groups[rule.consequent]
+        group.remove(rule)
+        if not group:
+            del self._groups[rule.consequent]
+        if self._index is not None:
+            self._index.remove(rule)
+        self._merge(rule.consequent)
+
+    def _merge(self, consequent: Term):
+        """ Replaces the merged rule of the consequent in the rules of its variable and in the programs. """
+        variable = consequent.variable
+        rules = list(self._rules.get(variable, ()))
+        position = next((i for i, rule in enumerate(rules) if rule.consequent is consequent), len(rules))
+        rules[position:position + 1] = [merge_rules(consequent, self._groups[consequent])] if consequent in self._groups else []
+
+        if rules:
+            self._rules[variable] = rules
+            self._rules = dict(sorted(self._rules.items()))
+        else:
+            del self._rules[variable]
+        if self._compiled is not None:
+            self._compiled.update({variable: rules})
+        if self._profile is not None:
+            self.enable_profiling(self._profile.bins)
+
+    def active_rules(self, **inputs: float) -> List[Rule]:
+        """ Rules that can fire for the given inputs (according to the supports of their memberships). """
+        return self._sparse_index().active(inputs)
+
+    def _sparse_index(self) -> SparseRules:
+        """ Index of the rules by the supports of their memberships (built on the first use, then kept up to date). """
+        if self._index is None:
+            self._index = SparseRules(list(self._groups.items()), self._defuzzifier, self._operators)
+        return self._index
+
+    @property
+    def defuzzifier(self) -> Defuzzifier:
+        return self._defuzzifier
+
+    @property
+    def operators(self) -> Operators:
+        return self._operators
+
+    @property
+    def sparse(self) -> bool:
+        """ Whether single inputs are evaluated by only the rules that can fire for them. """
+        return self._sparse is not None
+
+    @property
+    def profile(self) -> Optional['Profile']:
+        """ Profile recording the evaluations (None if profiling is disabled). """
+        return self._profile
+
+    @property
+    def program(self) -> Optional[Program]:
+        """ Compiled program of this system (None if the system is not compiled). """
+        return self._program
+
     def plot(self):
         """ Plot the membership graphs of this system. """
         import matplotlib
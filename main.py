@@ -1,17 +1,26 @@
 """ CLI entrypoint for the application. """
 import argparse
-import csv
-import json
 import sys
 
-from car_controller import CarController, CarSimulation
+# modules needed only by some of the commands are imported by the functions that use them, to keep the startup fast
+# (typing is not imported just for this, type checkers treat the constant as if it was)
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from car_controller import CarController, CarSimulation
+
+# size of the buffer used when writing the simulation results
+OUTPUT_BUFFER_SIZE = 1 << 20
 
 
 def parse_arguments():
     """ Parses provided command line arguments. """
     parser = argparse.ArgumentParser(description='Fuzzy logic driven car acceleration controller')
     parser.add_argument('-m', '--memberships', metavar='FILE', type=argparse.FileType('r'), help='optional JSON file with the definitions of the memberships')
-    parser.add_argument('-o', '--output', metavar='FILE', type=argparse.FileType('w'), help='write the simulation logs to a file')
+    parser.add_argument('-o', '--output', metavar='FILE', help='write the simulation logs to a file (CSV, or columnar binary NPZ if the name ends with .npz)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not print every step of the simulation')
+    parser.add_argument('-l', '--lut', metavar='N', type=int, help='evaluate the controller by a lookup table with N samples per input')
+    parser.add_argument('-lf', '--lut-file', metavar='FILE', help='evaluate the controller by a lookup table from a file (mapped if saved by LookupTable.save_mapped)')
+    parser.add_argument('-nc', '--no-cache', action='store_true', help='do not use the on-disk cache of compiled controllers')
     parser.add_argument('-ps', '--plot-simulation', action='store_true', help='[requires matplotlib] show a plot of the simulation results')
     parser.add_argument('-pm', '--plot-membership', action='store_true', help='[requires matplotlib] show a plot of the membership functions')
 
@@ -40,17 +49,61 @@ def parse_arguments():
     parser_acceleration.add_argument('-oa', '--obstacle-acceleration', required=True, type=float, help='acceleration (absolute) of the obstacle')
     parser_acceleration.add_argument('-op', '--obstacle-position', required=True, type=float, help='initial position of the obstacle')
 
+    parser_sweep = scenario_subparsers.add_parser('sweep', help='simulates all combinations of the given scenario parameters (in parallel) and writes a table of the results')
+    parser_sweep.add_argument('-st', '--simulation-time', default=20.0, type=float, help='duration of each simulation')
+    parser_sweep.add_argument('-ts', '--time-step', default=0.05, type=float, help='time step of the simulations')
+    parser_sweep.add_argument('-cs', '--car-speeds', required=True, nargs='+', type=float, help='initial speeds of the car')
+    parser_sweep.add_argument('-op', '--obstacle-positions', required=True, nargs='+', type=float, help='initial positions of the obstacle')
+    parser_sweep.add_argument('-os', '--obstacle-speeds', required=True, nargs='+', type=float, help='initial speeds of the obstacle')
+    parser_sweep.add_argument('-ot', '--obstacle-target-speeds', nargs='+', type=float, help='target speeds of the obstacle (by default it keeps its speed)')
+    parser_sweep.add_argument('-oa', '--obstacle-accelerations', default=[0.0], nargs='+', type=float, help='accelerations (absolute) of the obstacle')
+    parser_sweep.add_argument('-w', '--workers', type=int, help='number of worker processes (all cores by default, 0 runs in the main process)')
+    parser_sweep.add_argument('-c', '--chunk-size', default=256, type=int, help='number of scenarios simulated together by a worker')
+    parser_sweep.add_argument('-u', '--unordered', action='store_true', help='write the results as soon as they are ready instead of in the order of the scenarios')
+
+    parser_batch = scenario_subparsers.add_parser('batch', help='evaluates the controller for every row of a CSV/NPY file (streamed in chunks) and writes the accelerations (CSV, or NPY if the output name ends with .npy)')
+    parser_batch.add_argument('-i', '--input', default='-', metavar='FILE', help='CSV (with a header) or NPY file with the columns car_speed, obstacle_distance, obstacle_relative_speed (standard input by default)')
+    parser_batch.add_argument('-c', '--chunk-size', default=65536, type=int, help='number of rows evaluated together')
+
+    parser_serve = scenario_subparsers.add_parser('serve', help='serves the controller over line-delimited JSON (TCP or a Unix socket), concurrent requests are evaluated in batches')
+    parser_serve.add_argument('-H', '--host', default='127.0.0.1', help='address to listen on')
+    parser_serve.add_argument('-pt', '--port', default=8765, type=int, help='TCP port to listen on')
+    parser_serve.add_argument('-us', '--unix-socket', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser_serve.add_argument('-bw', '--batch-window', default=2.0, type=float, help='maximal time [ms] a request waits for other requests to form a batch')
+    parser_serve.add_argument('-mb', '--max-batch', default=1024, type=int, help='maximal number of requests evaluated together')
+
     return parser.parse_args()
 
 
-def create_controller(args: argparse.Namespace):
-    """ Configures the car controller based on the arguments. """
+def load_memberships(args: argparse.Namespace) -> dict:
+    """ Definitions of the memberships given by the arguments (the default ones if no file is given). """
+    from car_controller.controller import DEFAULT_MEMBERSHIPS
+
     if args.memberships:
-        return CarController(membership_points=json.load(args.memberships))
-    return CarController()
+        import json
+        return json.load(args.memberships)
+    return DEFAULT_MEMBERSHIPS
+
 
+def create_controller(args: argparse.Namespace, membership_points: dict = None):
+    """ Configures the car controller based on the arguments, compiled controllers are cached on the disk. """
+    membership_points = membership_points or load_memberships(args)
 
-def run_manually(car_controller: CarController):
+    if args.no_cache:
+        from car_controller import CarController
+        controller = CarController(membership_points=membership_points)
+        if args.lut is not None:
+            controller.compile_lut(args.lut)
+    else:
+        from car_controller.cache import ControllerCache
+        controller = ControllerCache().load(membership_points, lut_resolution=args.lut)
+
+    if args.lut_file:
+        controller.load_lut(args.lut_file)
+    return controller
+
+
+def run_manually(car_controller: 'CarController'):
     """ Runs the controller in a manual mode in which the user can directly experiment with it. """
     while True:
         try:
@@ -73,10 +126,124 @@ def run_manually(car_controller: CarController):
             print('An error occurred:', e)
 
 
+def write_steps(steps, path: str = None, quiet: bool = False):
+    """ Prints the given steps of a simulation and writes them to a CSV file, one by one. """
+    import csv
+
+    output = open(path, 'w', newline='', buffering=OUTPUT_BUFFER_SIZE) if path else None
+    writer = None
+    try:
+        for step in steps:
+            if output is not None:
+                if writer is None:
+                    writer = csv.DictWriter(output, fieldnames=list(step.keys()))
+                    writer.writeheader()
+                writer.writerow(step)
+            if not quiet:
+                print(''.join(f'{header}={value:.3f}  ' for header, value in step.items()))
+    finally:
+        if output is not None:
+            output.close()
+
+
+def write_columns(simulation: 'CarSimulation', path: str):
+    """ Writes the history of a simulation to a binary file with a separate array per column. """
+    import numpy as np
+    from car_controller.simulation import HISTORY_COLUMNS, CAR_POSITION, CAR_SPEED, OBSTACLE_POSITION, OBSTACLE_SPEED
+
+    history = simulation.history
+    columns = dict(zip(HISTORY_COLUMNS, history))
+    columns['relative_distance'] = history[OBSTACLE_POSITION] - history[CAR_POSITION]
+    columns['relative_speed'] = history[OBSTACLE_SPEED] - history[CAR_SPEED]
+    with open(path, 'wb', buffering=OUTPUT_BUFFER_SIZE) as output:
+        np.savez(output, **columns)
+
+
+def run_parameter_sweep(args: argparse.Namespace):
+    """
+    Simulates all combinations of the scenario parameters and writes a CSV table of the results. A lookup table
+    requested by its resolution is compiled (or loaded from the cache) once and shared by the workers through a file.
+    """
+    import csv
+    import os
+    import tempfile
+    from car_controller.sweep import scenario_grid, run_sweep
+
+    membership_points = load_memberships(args)
+    scenarios = scenario_grid(
+        car_speeds=args.car_speeds,
+        obstacle_positions=args.obstacle_positions,
+        obstacle_speeds=args.obstacle_speeds,
+        obstacle_target_speeds=args.obstacle_target_speeds or [None],
+        obstacle_accelerations=args.obstacle_accelerations
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        lut_path = args.lut_file
+        if lut_path is None and args.lut is not None:
+            lut_path = os.path.join(directory, 'surface.flut')
+            create_controller(args, membership_points).lut.save_mapped(lut_path)
+
+        results = run_sweep(
+            scenarios,
+            membership_points=membership_points,
+            simulation_time=args.simulation_time,
+            time_step=args.time_step,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            ordered=not args.unordered,
+            lut_path=lut_path,
+            cached=not args.no_cache
+        )
+
+        output = open(args.output, 'w', newline='', buffering=OUTPUT_BUFFER_SIZE) if args.output else sys.stdout
+        try:
+            writer = csv.writer(output)
+            writer.writerow(['index', *scenarios[0]._fields, 'collision', 'final_gap', 'final_speed'])
+            for result in results:
+                writer.writerow([result.index, *result.scenario, int(result.collision), result.final_gap, result.final_speed])
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+
+def run_bulk_inference(car_controller: 'CarController', args: argparse.Namespace):
+    """ Evaluates the controller for all the rows of the input file and reports the throughput. """
+    from car_controller.bulk import run_bulk
+
+    report = run_bulk(car_controller, args.input, args.output, args.chunk_size)
+    print(f'Evaluated {report.rows} rows in {report.chunks} chunks in {report.seconds:.3f} s ({report.throughput:,.0f} rows/s)', file=sys.stderr)
+
+
+def run_server(car_controller: 'CarController', args: argparse.Namespace):
+    """ Serves the controller until interrupted. """
+    import asyncio
+    from car_controller.server import serve
+
+    address = args.unix_socket or f'{args.host}:{args.port}'
+    print(f'Serving on {address}', file=sys.stderr)
+    try:
+        asyncio.run(serve(
+            car_controller,
+            host=args.host,
+            port=args.port,
+            path=args.unix_socket,
+            batch_window=args.batch_window / 1000.0,
+            max_batch=args.max_batch
+        ))
+    except KeyboardInterrupt:
+        print('Terminated', file=sys.stderr)
+
+
 def main():
     """ Main entrypoint. """
     args = parse_arguments()
 
+    # sweeps create their controllers in the worker processes
+    if args.scenario == 'sweep':
+        run_parameter_sweep(args)
+        sys.exit()
+
     # setup controller
     controller = create_controller(args)
 
@@ -85,7 +252,16 @@ def main():
         run_manually(controller)
         sys.exit()
 
+    if args.scenario == 'batch':
+        run_bulk_inference(controller, args)
+        sys.exit()
+
+    if args.scenario == 'serve':
+        run_server(controller, args)
+        sys.exit()
+
     # setup a simulation scenario
+    from car_controller import CarSimulation
     if args.scenario == 'stationary':
         simulation = CarSimulation(
             initial_car_position=0.0,
@@ -120,12 +296,25 @@ def main():
             0.0
         )
 
-    # run the simulation
-    simulation.simulate(
-        car_controller=controller,
-        obstacle_acceleration=obstacle_acceleration,
-        simulation_time=simulation_time
-    )
+    # run the simulation, the steps are printed and written to CSV as soon as they are produced
+    binary_output = args.output is not None and args.output.endswith('.npz')
+    if args.quiet and (args.output is None or binary_output):
+        simulation.simulate(
+            car_controller=controller,
+            obstacle_acceleration=obstacle_acceleration,
+            simulation_time=simulation_time
+        )
+    else:
+        steps = simulation.stream(
+            car_controller=controller,
+            obstacle_acceleration=obstacle_acceleration,
+            simulation_time=simulation_time
+        )
+        write_steps(steps, None if binary_output else args.output, quiet=args.quiet)
+
+    # save the simulation results to a binary file
+    if binary_output:
+        write_columns(simulation, args.output)
 
     # plotting (if requested)
     if args.plot_membership:
@@ -133,22 +322,6 @@ def main():
     if args.plot_simulation:
         simulation.plot()
 
-    # get the simulation history
-    data = list(simulation)
-    headers = list(data[0].keys())
-
-    # print the simulation results
-    for step in data:
-        for header in headers:
-            print(f'{header}={step[header]:.3f}  ', end='')
-        print()
-
-    # save the simulation results to file
-    if args.output:
-        writer = csv.DictWriter(args.output, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(data)
-
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,56 @@
+""" Tests of the benchmark harness. """
+import pytest
+
+from benchmarks import BENCHMARKS, Benchmark, measure, compare, MemoryBenchmark, measure_memory, compare_memory
+from benchmarks.cases import rule_base
+
+
+def test_measure():
+    """ Tests that the statistics of a measurement are consistent. """
+    result = measure(Benchmark('sum', lambda: (lambda: sum(range(100))), repeat=10), min_sample_time=0.001)
+
+    assert result.name == 'sum'
+    assert result.samples == 10
+    assert result.number >= 1
+    assert result.min <= result.p50 <= result.p90 <= result.p99
+    assert result.ops_per_sec == pytest.approx(1.0 / result.p50)
+    assert set(result.to_dict()) >= {'ops_per_sec', 'p50', 'p99'}
+
+
+def test_compare():
+    """ Tests that only drops of the throughput beyond the tolerance are reported. """
+    result = measure(Benchmark('sum', lambda: (lambda: sum(range(100))), repeat=3), min_sample_time=0.001)
+    baseline = {'sum': {'min': result.min}}
+
+    assert compare([result], baseline, tolerance=0.1) == {}
+    assert compare([result], {'sum': {'min': result.min / 2}}, tolerance=0.1) == {'sum': pytest.approx(-0.5)}
+    assert compare([result], {'sum': {'min': result.min / 2}}, tolerance=0.6) == {}
+    assert compare([result], {}, tolerance=0.1) == {}
+
+
+def test_cases_set_up():
+    """ Tests that all the benchmarked operations can be set up and run. """
+    for benchmark in BENCHMARKS:
+        if 'simulation' not in benchmark.name:
+            benchmark.setup()()
+
+
+def test_measure_memory():
+    """ Tests that the memory retained by a structure is measured and scaled to its nodes. """
+    result = measure_memory(MemoryBenchmark('list', lambda: ([bytearray(1000) for _ in range(100)], 100)))
+
+    assert result.name == 'list'
+    assert 100_000 <= result.bytes < 200_000
+    assert result.bytes_per_100k_nodes == pytest.approx(result.bytes * 1000)
+
+
+def test_compare_memory():
+    """ Tests that only growths of the memory beyond the tolerance are reported. """
+    result = measure_memory(MemoryBenchmark('rules', lambda: rule_base(600)))
+    baseline = {'rules': {'bytes_per_100k_nodes': result.bytes_per_100k_nodes}}
+
+    assert result.nodes == 600
+    assert compare_memory([result], baseline, tolerance=0.1) == {}
+    assert compare_memory([result], {'rules': {'bytes_per_100k_nodes': result.bytes_per_100k_nodes / 2}}, tolerance=0.1) == {'rules': pytest.approx(1.0)}
+    assert compare_memory([result], {}, tolerance=0.1) == {}
+
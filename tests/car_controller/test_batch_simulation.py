@@ -0,0 +1,84 @@
+""" Tests of the simulation of many scenarios at once. """
+import itertools
+
+import numpy as np
+import pytest
+
+from car_controller import CarController, CarSimulation, BatchCarSimulation, PulseAcceleration
+
+
+def test_batch_matches_simulation():
+    """ Tests that every scenario of a batch simulation matches a separate simulation of it. """
+    car_speeds = np.array([0.0, 7.0, 14.0, 28.0])
+    obstacle_speeds = np.array([0.0, 14.0, 7.0, 28.0])
+    obstacle_positions = np.array([35.0, 50.0, 35.0, 100.0])
+    profile = PulseAcceleration(start=2.0, duration=np.array([1.0, 0.0, 2.0, 1.0]), acceleration=np.array([5.0, 0.0, 3.0, -10.0]))
+
+    batch = BatchCarSimulation(
+        initial_car_speed=car_speeds,
+        initial_obstacle_speed=obstacle_speeds,
+        initial_obstacle_position=obstacle_positions
+    )
+    batch.simulate(CarController(), profile, simulation_time=10.0)
+
+    for i in range(len(batch)):
+        simulation = CarSimulation(
+            initial_car_speed=car_speeds[i],
+            initial_obstacle_speed=obstacle_speeds[i],
+            initial_obstacle_position=obstacle_positions[i]
+        )
+        simulation.simulate(CarController(), lambda t: float(profile(t)[i]), simulation_time=10.0)
+
+        assert batch.collision[i] == simulation.collision
+        assert batch.current_car_position[i] == pytest.approx(simulation.current_car_position)
+        assert batch.current_car_speed[i] == pytest.approx(simulation.current_car_speed)
+        assert batch.current_obstacle_position[i] == pytest.approx(simulation.current_obstacle_position)
+    assert batch.current_simulation_time == pytest.approx(simulation.current_simulation_time)
+
+
+def test_batch_collision():
+    """ Tests that the collision mask marks only the scenarios in which the car hit the obstacle. """
+    batch = BatchCarSimulation(initial_car_speed=[28.0, 0.0], initial_obstacle_position=[5.0, 5.0], initial_obstacle_speed=0.0)
+    batch.simulate(CarController(), 0.0, simulation_time=5.0)
+
+    assert batch.collision.tolist() == [True, False]
+
+
+def test_batch_obstacle_speed_change():
+    """ Tests all the scenarios of the obstacle speed change test at once. """
+    speeds = list(itertools.permutations([7.0, 14.0, 21.0, 28.0], 2))
+    scenarios = np.array([(i, t, a) for (i, t), a in itertools.product(speeds, [2.5, 5.0, 10.0, 15.0])])
+    initial_speed, target_speed, acceleration = scenarios.T
+
+    batch = BatchCarSimulation(
+        initial_car_speed=initial_speed,
+        initial_obstacle_speed=initial_speed,
+        initial_obstacle_position=35.0
+    )
+    batch.simulate(CarController(), PulseAcceleration.speed_change(2.0, initial_speed, target_speed, acceleration), simulation_time=20.0)
+
+    assert not batch.collision.any()
+    assert batch.current_obstacle_position - batch.current_car_position == pytest.approx(35.0, abs=1.0)
+
+
+def test_batch_early_termination():
+    """ Tests that terminated scenarios are not stepped further while the others finish the simulation. """
+    car_speeds = np.array([28.0, 14.0, 14.0])
+    obstacle_positions = np.array([5.0, 35.0, 35.0])
+    obstacle_speeds = np.array([0.0, 14.0, 0.0])
+
+    batch = BatchCarSimulation(initial_car_speed=car_speeds, initial_obstacle_position=obstacle_positions, initial_obstacle_speed=obstacle_speeds)
+    batch.simulate(CarController(), 0.0, simulation_time=20.0, stop_on_collision=True, steady_state_tolerance=0.01)
+
+    for i in range(len(batch)):
+        simulation = CarSimulation(initial_car_speed=car_speeds[i], initial_obstacle_position=obstacle_positions[i], initial_obstacle_speed=obstacle_speeds[i])
+        steps = simulation.simulate(CarController(), 0.0, simulation_time=20.0, stop_on_collision=True, steady_state_tolerance=0.01)
+
+        assert batch.steps[i] == steps
+        assert batch.collision[i] == simulation.collision
+        assert batch.min_gap[i] == pytest.approx(simulation.min_gap)
+        assert batch.current_car_position[i] == pytest.approx(simulation.current_car_position)
+
+    assert batch.collision.tolist() == [True, False, False]
+    assert batch.steps[0] < batch.steps[2] < 400
+    assert batch.steps[1] == 0
@@ -0,0 +1,74 @@
+""" Tests of the bulk evaluation of input files. """
+import io
+
+import numpy as np
+import pytest
+
+from car_controller import CarController, run_bulk
+from car_controller.bulk import read_csv_chunks, read_npy_chunks, write_npy_chunks
+
+
+@pytest.fixture(scope='module')
+def inputs():
+    rng = np.random.default_rng(0)
+    return np.column_stack([rng.uniform(0, 40, 1000), rng.uniform(0, 150, 1000), rng.uniform(-20, 20, 1000)])
+
+
+@pytest.fixture(scope='module')
+def controller():
+    return CarController()
+
+
+def test_bulk_csv(tmp_path, inputs, controller):
+    """ Tests that all the rows of a CSV file are evaluated in chunks (with the columns in any order). """
+    input_path, output_path = tmp_path / 'inputs.csv', tmp_path / 'outputs.csv'
+    with open(input_path, 'w') as file:
+        file.write('obstacle_relative_speed,time,car_speed,obstacle_distance\n')
+        for i, (car_speed, distance, relative_speed) in enumerate(inputs):
+            file.write(f'{float(relative_speed)!r},{i},{float(car_speed)!r},{float(distance)!r}\n')
+
+    report = run_bulk(controller, str(input_path), str(output_path), chunk_size=128)
+    assert report.rows == len(inputs)
+    assert report.chunks == 8
+    assert report.throughput > 0
+
+    outputs = np.loadtxt(output_path, skiprows=1)
+    assert np.allclose(outputs, controller.evaluate_batch(*inputs.T), rtol=0, atol=1e-12)
+
+
+def test_bulk_npy(tmp_path, inputs, controller):
+    """ Tests the evaluation of NPY files - with a column per input and with named fields. """
+    structured = np.zeros(len(inputs), dtype=[('car_speed', '<f4'), ('obstacle_distance', '<f8'), ('obstacle_relative_speed', '<f8')])
+    for i, name in enumerate(structured.dtype.names):
+        structured[name] = inputs[:, i]
+
+    for array in [inputs, structured]:
+        np.save(tmp_path / 'inputs.npy', array)
+        report = run_bulk(controller, str(tmp_path / 'inputs.npy'), str(tmp_path / 'outputs.npy'), chunk_size=300)
+        assert report.rows == len(inputs) and report.chunks == 4
+
+        outputs = np.load(tmp_path / 'outputs.npy')
+        expected = controller.evaluate_batch(*(np.asarray(array[name], dtype=float) for name in structured.dtype.names)) \
+            if array.dtype.names else controller.evaluate_batch(*inputs.T)
+        assert outputs.shape == (len(inputs),)
+        assert np.array_equal(outputs, expected)
+
+
+def test_bulk_empty():
+    """ Tests files without any rows. """
+    assert list(read_csv_chunks(io.StringIO(''))) == []
+    assert list(read_csv_chunks(io.StringIO('car_speed,obstacle_distance,obstacle_relative_speed\n'))) == []
+
+    output = io.BytesIO()
+    assert write_npy_chunks([], output) == (0, 0)
+    assert np.load(io.BytesIO(output.getvalue())).shape == (0,)
+
+
+def test_bulk_invalid(tmp_path):
+    """ Tests that inputs without the needed columns are rejected. """
+    with pytest.raises(ValueError):
+        list(read_csv_chunks(io.StringIO('car_speed,obstacle_distance\n1,2\n')))
+
+    np.save(tmp_path / 'inputs.npy', np.zeros((10, 2)))
+    with pytest.raises(ValueError):
+        list(read_npy_chunks(str(tmp_path / 'inputs.npy')))
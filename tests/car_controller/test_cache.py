@@ -0,0 +1,98 @@
+""" Tests of the persistent cache of compiled controllers. """
+import copy
+import os
+
+import pytest
+
+from car_controller import ControllerCache, cache as cache_module
+from car_controller.controller import DEFAULT_MEMBERSHIPS
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ControllerCache(str(tmp_path / 'cache'))
+
+
+def test_cache_round_trip(cache):
+    """ Tests that a cached controller is loaded from the cache and behaves the same as the created one. """
+    created = cache.load()
+    key = cache.key()
+    loaded = cache.get(key)
+
+    assert loaded is not None and loaded is not created
+    assert cache.size > 0
+    for inputs in [(10.0, 20.0, -5.0), (20.0, 40.0, 0.0), (30.0, 100.0, 10.0)]:
+        assert loaded(*inputs) == created(*inputs)
+    assert loaded.system.program.source == created.system.program.source
+
+
+def test_cache_keys(cache):
+    """ Tests that the keys depend on the memberships and the lookup table parameters. """
+    membership_points = copy.deepcopy(DEFAULT_MEMBERSHIPS)
+    membership_points['car_speed']['low'][1] = (11.0, 1.0)
+
+    keys = {cache.key(), cache.key(membership_points), cache.key(lut_resolution=17), cache.key(lut_resolution=33)}
+    assert len(keys) == 4
+    assert cache.key(copy.deepcopy(DEFAULT_MEMBERSHIPS)) == cache.key()
+
+
+def test_cache_keys_sources(cache, monkeypatch):
+    """ Tests that the keys depend on the sources of the modules the controllers are defined by. """
+    key = cache.key()
+    monkeypatch.setattr(cache_module, 'source_digest', lambda: b'changed')
+
+    assert cache.key() != key
+
+
+def test_cache_lut(cache):
+    """ Tests that lookup tables are stored with the controller. """
+    created = cache.load(lut_resolution=9)
+    loaded = cache.get(cache.key(lut_resolution=9))
+
+    assert loaded.lut is not None
+    assert loaded.lut.values.shape == (9, 9, 9)
+    assert loaded(15.0, 30.0, -2.0) == created(15.0, 30.0, -2.0)
+
+
+def test_cache_corrupted_entry(cache):
+    """ Tests that unreadable entries are dropped. """
+    cache.load()
+    key = cache.key()
+    with open(os.path.join(cache.directory, key + '.controller'), 'wb') as file:
+        file.write(b'garbage')
+
+    assert cache.get(key) is None
+    assert cache.size == 0
+    assert cache.load() is not None
+
+
+def test_cache_unwritable(tmp_path):
+    """ Tests that a cache directory that cannot be created does not prevent creating the controller. """
+    (tmp_path / 'file').write_bytes(b'')
+    cache = ControllerCache(str(tmp_path / 'file' / 'cache'))
+
+    with pytest.raises(OSError):
+        cache.put(cache.key(), None)
+    controller = cache.load(lut_resolution=5)
+    assert controller.lut is not None
+    assert cache.get(cache.key(lut_resolution=5)) is None
+    assert cache.size == 0
+
+
+def test_cache_eviction(tmp_path):
+    """ Tests that the least recently used entries are evicted once the cache exceeds its size. """
+    cache = ControllerCache(str(tmp_path), max_size=1 << 30)
+    cache.load(lut_resolution=3)
+    entry_size = cache.size
+
+    cache = ControllerCache(str(tmp_path), max_size=int(2.5 * entry_size))
+    cache.load(lut_resolution=4)
+    os.utime(os.path.join(str(tmp_path), cache.key(lut_resolution=3) + '.controller'), (0, 0))
+    cache.load(lut_resolution=5)
+
+    assert cache.get(cache.key(lut_resolution=3)) is None
+    assert cache.get(cache.key(lut_resolution=4)) is not None
+    assert cache.get(cache.key(lut_resolution=5)) is not None
+
+    cache.clear()
+    assert cache.size == 0
@@ -0,0 +1,45 @@
+""" Tests of the rules of the car controller. """
+import numpy as np
+import pytest
+
+import fuzzy_logic as fl
+from car_controller import CarController
+from car_controller.controller import DEFAULT_MEMBERSHIPS
+
+
+def membership(variable: str, label: str) -> fl.PiecewiseMembership:
+    return fl.PiecewiseMembership(DEFAULT_MEMBERSHIPS[variable][label])
+
+
+def test_controller_merged_rules():
+    """
+    Tests that each consequent of the controller is counted once, with the disjunction (maximum) of the strengths
+    of all its rules (also of the rules that are not adjacent), by the weighted centroid of the consequents.
+    """
+    controller = CarController()
+    rng = np.random.default_rng(0)
+    bounds = controller.bounds
+    for car_speed, distance, relative_speed in zip(*(rng.uniform(low, high, 200) for low, high in bounds)):
+        near = membership('obstacle_distance', 'near')(distance)
+        approaching = membership('obstacle_relative_speed', 'approaching')(relative_speed)
+        strengths = {
+            'break': max(approaching, near),
+            'maintain': max(membership('obstacle_relative_speed', 'constant')(relative_speed), membership('obstacle_distance', 'target')(distance)),
+            'accelerate': max(membership('obstacle_relative_speed', 'moving_away')(relative_speed), membership('obstacle_distance', 'far')(distance)),
+            'break_hard': min(near, approaching),
+        }
+        consequents = {label: membership('car_acceleration', label) for label in strengths}
+        numerator = sum(consequents[label].center * consequents[label].mass * strength for label, strength in strengths.items())
+        denominator = sum(consequents[label].mass * strength for label, strength in strengths.items())
+
+        assert controller(car_speed, distance, relative_speed) == pytest.approx(numerator / denominator)
+
+
+def test_controller_values():
+    """ Tests the accelerations of the controller in a few typical situations. """
+    controller = CarController()
+
+    assert controller(20.0, 10.0, -5.0) == pytest.approx(-9.791666666666668)
+    assert controller(15.0, 40.0, 0.0) == pytest.approx(5.0)
+    assert controller(25.0, 80.0, 3.0) == pytest.approx(6.7164179104477615)
+    assert controller(10.0, 25.0, -2.0) == pytest.approx(-7.882882882882882)
@@ -0,0 +1,30 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+
+def test_controller_import_is_lazy():
+    """ Tests that importing the controller imports neither the parallel sweeps nor matplotlib. """
+    output = subprocess.run([sys.executable, '-c', (
+        'import json, sys\n'
+        'from car_controller import CarController\n'
+        'CarController()(car_speed=10.0, obstacle_distance=30.0, obstacle_relative_speed=0.0)\n'
+        'print(json.dumps(sorted(sys.modules)))\n'
+    )], cwd=Path(__file__).parents[2], check=True, capture_output=True, text=True).stdout
+
+    modules = set(json.loads(output))
+    assert 'car_controller.controller' in modules
+    assert not modules & {'car_controller.sweep', 'car_controller.optimizer', 'car_controller.server', 'car_controller.bulk', 'concurrent.futures.process', 'matplotlib'}
+
+
+def test_entrypoint_import_is_lazy():
+    """ Tests that the CLI entrypoint imports the controller (and numpy) only once a command needs it. """
+    output = subprocess.run([sys.executable, '-c', (
+        'import json, sys\n'
+        'import main\n'
+        'print(json.dumps(sorted(sys.modules)))\n'
+    )], cwd=Path(__file__).parents[2], check=True, capture_output=True, text=True).stdout
+
+    modules = set(json.loads(output))
+    assert not modules & {'car_controller.controller', 'car_controller.simulation', 'fuzzy_logic', 'numpy'}
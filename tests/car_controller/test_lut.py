@@ -0,0 +1,131 @@
+""" Tests of the lookup-table mode of the car controller. """
+import math
+import pickle
+
+import numpy as np
+import pytest
+
+from car_controller import CarController, LookupTable, CarSimulation
+from car_controller.controller import INPUTS
+
+
+def test_lookup_table_interpolation():
+    """ Tests that a table sampled from a multilinear function reproduces it exactly (also outside of the grid). """
+    function = lambda x, y, z: 2.0 * x - y + 0.5 * z + 1.0
+    table = LookupTable.sample(function, [(0.0, 1.0), (-2.0, 2.0), (0.0, 10.0)], resolution=5)
+    rng = np.random.default_rng(0)
+    x, y, z = rng.uniform(0.0, 1.0, 100), rng.uniform(-2.0, 2.0, 100), rng.uniform(0.0, 10.0, 100)
+
+    assert table.evaluate_batch(x, y, z) == pytest.approx(function(x, y, z))
+    assert [table(*p) for p in zip(x, y, z)] == pytest.approx(function(x, y, z))
+    assert table(2.0, 0.0, 0.0) == pytest.approx(function(1.0, 0.0, 0.0))
+
+
+def test_lookup_table_error_bound():
+    """ Tests that the compiled lookup table stays within the requested error bound from the exact system. """
+    controller = CarController()
+    exact = CarController()
+
+    table = controller.compile_lut(resolution=17, max_error=0.5)
+
+    assert controller.lut is table
+    rng = np.random.default_rng(0)
+    points = [rng.uniform(low, high, 10000) for low, high in controller.bounds]
+    assert np.max(np.abs(controller.evaluate_batch(*points) - exact.evaluate_batch(*points))) <= 0.5
+    assert controller(14.0, 30.0, -5.0) == pytest.approx(exact(14.0, 30.0, -5.0), abs=0.5)
+
+
+def test_lookup_table_clamping():
+    """ Tests that the compiled lookup table clamps the inputs outside of the universes (where the system is undefined). """
+    controller = CarController()
+    exact = CarController()
+    controller.compile_lut(resolution=9)
+
+    highs = {name: high for name, (_, high) in zip(INPUTS, controller.bounds)}
+    outside = {name: high + 10.0 for name, high in highs.items()}
+    assert np.isnan(exact.evaluate_batch(**{name: np.array([value]) for name, value in outside.items()})[0])
+    assert controller(**outside) == controller(**highs)
+
+
+def test_lookup_table_nan():
+    """ Tests that the lookup table gives NaN for NaN inputs (like the exact system) on both evaluation paths. """
+    table = LookupTable.sample(lambda x, y: x + y, [(0.0, 1.0), (0.0, 1.0)], resolution=3)
+    assert np.isnan(table(math.nan, 0.5))
+    assert table.evaluate_batch(np.array([0.5, math.nan, 0.25]), 0.5) == pytest.approx([1.0, math.nan, 0.75], nan_ok=True)
+
+    controller = CarController()
+    controller.compile_lut(resolution=9)
+    assert math.isnan(controller(car_speed=math.nan, obstacle_distance=30.0, obstacle_relative_speed=0.0))
+    accelerations = controller.evaluate_batch(
+        car_speed=np.array([10.0, 10.0]),
+        obstacle_distance=np.array([30.0, math.nan]),
+        obstacle_relative_speed=np.array([0.0, 0.0])
+    )
+    assert np.isfinite(accelerations[0]) and np.isnan(accelerations[1])
+
+
+def test_lookup_table_unreachable_error_bound():
+    """ Tests that an error bound that would need a too dense grid is reported. """
+    with pytest.raises(ValueError):
+        CarController().compile_lut(resolution=9, max_error=1e-6)
+
+
+def test_lookup_table_save_load(tmp_path):
+    """ Tests that the lookup table can be saved and loaded back. """
+    controller = CarController()
+    table = controller.compile_lut(resolution=9)
+    table.save(tmp_path / 'surface.lut')
+
+    loaded = CarController()
+    loaded.load_lut(tmp_path / 'surface.lut')
+
+    assert loaded.lut.bounds == table.bounds
+    assert np.array_equal(loaded.lut.values, table.values)
+    assert loaded(14.0, 30.0, -5.0) == controller(14.0, 30.0, -5.0)
+
+
+def test_lookup_table_mapped(tmp_path):
+    """ Tests that a table saved in the mapped format is memory-mapped read-only when loaded. """
+    controller = CarController()
+    table = controller.compile_lut(resolution=(5, 9, 7))
+    table.save_mapped(tmp_path / 'surface.flut')
+
+    mapped = LookupTable.load_mapped(tmp_path / 'surface.flut')
+    assert mapped.bounds == table.bounds
+    assert np.array_equal(mapped.values, table.values)
+    assert not mapped.values.flags.writeable
+    assert isinstance(mapped.values.base, np.memmap)
+
+    loaded = CarController()
+    loaded.load_lut(tmp_path / 'surface.flut')
+    assert loaded(14.0, 30.0, -5.0) == controller(14.0, 30.0, -5.0)
+    assert np.array_equal(loaded.evaluate_batch([14.0, 20.0], 30.0, -5.0), controller.evaluate_batch([14.0, 20.0], 30.0, -5.0))
+
+    # pickled mapped tables refer to their file instead of copying the samples
+    unpickled = pickle.loads(pickle.dumps(mapped))
+    assert len(pickle.dumps(mapped)) < table.values.nbytes
+    assert np.array_equal(unpickled.values, table.values)
+
+
+def test_lookup_table_mapped_invalid(tmp_path):
+    """ Tests that files of other formats are not mapped. """
+    CarController().compile_lut(resolution=5).save(tmp_path / 'surface.lut')
+    with pytest.raises(ValueError):
+        LookupTable.load_mapped(tmp_path / 'surface.lut')
+
+
+@pytest.mark.parametrize('car_speed', [7.0, 28.0])
+@pytest.mark.parametrize('obstacle_position', [35.0, 150.0])
+def test_lookup_table_obstacle_static(car_speed, obstacle_position):
+    """ Tests the situation when the obstacle stands still with the controller in the lookup-table mode. """
+    car_controller = CarController()
+    car_controller.compile_lut(resolution=17, max_error=0.5)
+    simulation = CarSimulation(
+        initial_car_speed=car_speed,
+        initial_obstacle_speed=0.0,
+        initial_obstacle_position=obstacle_position
+    )
+
+    simulation.simulate(car_controller, 0.0, simulation_time=20.0)
+
+    assert not simulation.collision
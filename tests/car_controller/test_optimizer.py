@@ -0,0 +1,73 @@
+""" Tests of the membership tuning. """
+import numpy as np
+import pytest
+
+from car_controller import CarController, scenario_grid
+from car_controller.controller import DEFAULT_MEMBERSHIPS
+from car_controller.optimizer import MembershipEncoding, MembershipOptimizer, evaluate_cost
+
+
+@pytest.fixture
+def scenarios():
+    return scenario_grid(
+        car_speeds=[14.0, 28.0],
+        obstacle_positions=[60.0],
+        obstacle_speeds=[0.0, 14.0],
+        obstacle_target_speeds=[None, 28.0],
+        obstacle_accelerations=[5.0]
+    )
+
+
+def test_encoding_round_trip():
+    """ Tests that decoding the encoded memberships gives the same memberships. """
+    encoding = MembershipEncoding(DEFAULT_MEMBERSHIPS)
+    vector = encoding.encode(DEFAULT_MEMBERSHIPS)
+
+    assert encoding.size == len(vector) == 44
+    decoded = encoding.decode(vector)
+    assert decoded == {v: {k: list(p) for k, p in m.items()} for v, m in DEFAULT_MEMBERSHIPS.items()}
+    CarController(decoded)
+
+
+def test_encoding_clips_and_sorts():
+    """ Tests that decoded breakpoints stay in the universe of their variable and in order. """
+    encoding = MembershipEncoding(DEFAULT_MEMBERSHIPS)
+    vector = encoding.encode(DEFAULT_MEMBERSHIPS)
+    vector[:3] = [20.0, 5.0, 100.0]
+
+    decoded = encoding.decode(vector)
+    assert decoded['car_speed']['low'] == [(5.0, 1.0), (20.0, 1.0), (40.0, 0.0)]
+
+
+def test_cost(scenarios):
+    """ Tests that collisions dominate the cost. """
+    cost = evaluate_cost(DEFAULT_MEMBERSHIPS, scenarios, simulation_time=10.0)
+    assert 0.0 < cost < 1000.0
+
+    reckless = scenario_grid(car_speeds=[40.0], obstacle_positions=[1.0], obstacle_speeds=[0.0])
+    assert evaluate_cost(DEFAULT_MEMBERSHIPS, reckless, simulation_time=10.0) == 1000.0
+
+
+def test_cache(scenarios):
+    """ Tests that candidates with identical breakpoints are simulated only once. """
+    optimizer = MembershipOptimizer(scenarios, simulation_time=5.0)
+    candidates = np.zeros((3, optimizer.encoding.size))
+    candidates[2, 0] = 1e-6
+
+    costs = optimizer.evaluate(candidates)
+    assert optimizer.evaluations == 1
+    assert optimizer.cache_hits == 2
+    assert costs[0] == costs[1] == costs[2] == evaluate_cost(DEFAULT_MEMBERSHIPS, scenarios, simulation_time=5.0)
+
+
+@pytest.mark.parametrize('method', ['random_search', 'cma_es'])
+def test_optimization_improves(scenarios, method):
+    """ Tests that the search does not get worse than the initial memberships. """
+    optimizer = MembershipOptimizer(scenarios, simulation_time=5.0)
+    initial = optimizer.evaluate(np.zeros(optimizer.encoding.size))[0]
+
+    result = getattr(optimizer, method)(4, population=6, seed=0)
+    assert len(result.history) == 4
+    assert result.history == sorted(result.history, reverse=True)
+    assert result.cost <= initial
+    assert evaluate_cost(result.membership_points, scenarios, simulation_time=5.0) == pytest.approx(result.cost, abs=1e-2)
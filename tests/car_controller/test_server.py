@@ -0,0 +1,203 @@
+""" Tests of the controller service. """
+import asyncio
+import json
+import math
+import sys
+
+import pytest
+
+from car_controller import CarController, ControllerServer
+
+INPUTS = [(10.0, 20.0, -5.0), (20.0, 40.0, 0.0), (30.0, 100.0, 10.0), (5.0, 15.0, -2.0)]
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, lines):
+    """ Sends the given request lines (pipelined) and reads a response per line. """
+    for line in lines:
+        writer.write((line if isinstance(line, str) else json.dumps(line)).encode() + b'\n')
+    await writer.drain()
+    return [json.loads(await reader.readline()) for _ in lines]
+
+
+def requests(client: int, count: int):
+    return [
+        dict(id=f'{client}-{i}', car_speed=speed, obstacle_distance=distance, obstacle_relative_speed=relative_speed)
+        for i, (speed, distance, relative_speed) in enumerate(INPUTS[j % len(INPUTS)] for j in range(client, client + count))
+    ]
+
+
+def run_clients(server: ControllerServer, connect, clients: int = 8, count: int = 16):
+    """ Runs the given number of concurrent clients against the server, returns their responses and the metrics. """
+    async def client(i):
+        reader, writer = await connect()
+        try:
+            return await request(reader, writer, requests(i, count))
+        finally:
+            writer.close()
+
+    async def run():
+        responses = await asyncio.gather(*(client(i) for i in range(clients)))
+        reader, writer = await connect()
+        metrics, = await request(reader, writer, [{'command': 'metrics'}])
+        writer.close()
+        return responses, metrics
+
+    return run()
+
+
+def check_responses(controller: CarController, responses, clients: int, count: int):
+    for i, client_responses in enumerate(responses):
+        expected = requests(i, count)
+        assert [response['id'] for response in client_responses] == [r['id'] for r in expected]
+        for response, r in zip(client_responses, expected):
+            acceleration = controller(r['car_speed'], r['obstacle_distance'], r['obstacle_relative_speed'])
+            assert math.isclose(response['car_acceleration'], acceleration, rel_tol=1e-12, abs_tol=1e-12)
+
+
+def test_server_batches():
+    """ Tests that concurrent requests are answered in order and evaluated in batches. """
+    controller = CarController()
+    clients, count = 8, 16
+
+    async def run():
+        server = ControllerServer(controller, batch_window=0.01)
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            return await run_clients(server, lambda: asyncio.open_connection('127.0.0.1', port), clients, count)
+        finally:
+            listener.close()
+            await server.close()
+
+    responses, metrics = asyncio.run(run())
+    check_responses(controller, responses, clients, count)
+
+    assert metrics['requests'] == clients * count
+    assert metrics['batches'] < clients * count
+    assert metrics['batch_size_max'] > 1
+    assert 0 <= metrics['latency_p50'] <= metrics['latency_p99']
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason='Unix sockets are not available')
+def test_server_unix_socket(tmp_path):
+    """ Tests serving over a Unix socket. """
+    controller = CarController()
+    path = str(tmp_path / 'controller.sock')
+
+    async def run():
+        server = ControllerServer(controller, batch_window=0.001, max_batch=4)
+        listener = await server.start(path=path)
+        try:
+            return await run_clients(server, lambda: asyncio.open_unix_connection(path), 4, 8)
+        finally:
+            listener.close()
+            await server.close()
+
+    responses, metrics = asyncio.run(run())
+    check_responses(controller, responses, 4, 8)
+    assert metrics['requests'] == 32
+    assert metrics['batch_size_max'] <= 4
+
+
+def test_server_errors():
+    """ Tests that invalid requests are answered by errors without closing the connection. """
+    async def run():
+        server = ControllerServer(CarController())
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            responses = await request(reader, writer, [
+                'not json',
+                [1, 2],
+                {'id': 1, 'car_speed': 10.0},
+                {'id': 2, 'car_speed': 'fast', 'obstacle_distance': 20.0, 'obstacle_relative_speed': 0.0},
+                {'id': 3, 'car_speed': 10.0, 'obstacle_distance': 20.0, 'obstacle_relative_speed': 0.0},
+            ])
+            writer.close()
+            return responses
+        finally:
+            listener.close()
+            await server.close()
+
+    responses = asyncio.run(run())
+    assert all('error' in response for response in responses[:4])
+    assert [response.get('id') for response in responses] == [None, None, 1, 2, 3]
+    assert isinstance(responses[4]['car_acceleration'], float)
+
+
+class FailingController:
+    """ Controller whose evaluation always fails. """
+
+    def evaluate_batch(self, *inputs):
+        raise RuntimeError('broken controller')
+
+
+def test_server_evaluation_errors():
+    """ Tests that failed evaluations are answered by errors without closing the connection. """
+    async def run():
+        server = ControllerServer(FailingController())
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            responses = await request(reader, writer, [
+                {'id': 1, 'car_speed': 10.0, 'obstacle_distance': 20.0, 'obstacle_relative_speed': 0.0},
+                {'id': 2, 'command': 'metrics'},
+            ])
+            writer.close()
+            return responses
+        finally:
+            listener.close()
+            await server.close()
+
+    responses = asyncio.run(run())
+    assert responses[0] == {'id': 1, 'error': 'evaluation failed: broken controller'}
+    assert responses[1]['id'] == 2 and 'error' not in responses[1]
+
+
+def test_server_long_line():
+    """ Tests that a request line over the limit of the stream is answered by an error and the connection is closed. """
+    async def run():
+        server = ControllerServer(CarController())
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            response, = await request(reader, writer, [' ' * (1 << 17) + '{}'])
+            closed = await reader.readline()
+            writer.close()
+            return response, closed
+        finally:
+            listener.close()
+            await server.close()
+
+    response, closed = asyncio.run(run())
+    assert 'line too long' in response['error']
+    assert closed == b''
+
+
+def test_server_nan_lookup_table():
+    """ Tests that a NaN input to a controller in the lookup-table mode does not fail the other requests of its batch. """
+    controller = CarController()
+    controller.compile_lut(resolution=9)
+
+    async def run():
+        server = ControllerServer(controller, batch_window=0.05)
+        listener = await server.start()
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            responses = await request(reader, writer, [
+                '{"id": 1, "car_speed": NaN, "obstacle_distance": 20.0, "obstacle_relative_speed": 0.0}',
+                {'id': 2, 'car_speed': 10.0, 'obstacle_distance': 20.0, 'obstacle_relative_speed': 0.0},
+            ])
+            writer.close()
+            return responses
+        finally:
+            listener.close()
+            await server.close()
+
+    responses = asyncio.run(run())
+    assert responses[0] == {'id': 1, 'car_acceleration': None}
+    assert responses[1]['car_acceleration'] == pytest.approx(controller(10.0, 20.0, 0.0))
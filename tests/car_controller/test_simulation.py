@@ -0,0 +1,86 @@
+""" Tests of the simulation itself (independent of the controller). """
+import numpy as np
+import pytest
+
+from car_controller import CarSimulation
+from car_controller.simulation import HISTORY_COLUMNS, CAR_SPEED, CAR_ACCELERATION
+
+
+class ConstantController:
+    """ Controller that always requests the same acceleration. """
+    def __init__(self, acceleration: float):
+        self.acceleration = acceleration
+
+    def __call__(self, car_speed: float, obstacle_distance: float, obstacle_relative_speed: float) -> float:
+        return self.acceleration
+
+
+def test_history_growth():
+    """ Tests that the history grows beyond its initial capacity and is exposed without copying. """
+    simulation = CarSimulation(initial_car_speed=1.0, capacity=2)
+    for _ in range(10):
+        simulation.current_car_acceleration = 1.0
+        simulation.step(0.5)
+
+    history = simulation.history
+    assert len(simulation) == 11
+    assert history.shape == (len(HISTORY_COLUMNS), 11)
+    assert np.shares_memory(history, simulation.history)
+    assert history[CAR_SPEED].tolist() == pytest.approx([1.0 + 0.5 * i for i in range(11)])
+    assert simulation.current_car_speed == pytest.approx(6.0)
+
+
+def test_history_iteration():
+    """ Tests that iterating over a simulation yields every step with the acceleration applied from it. """
+    simulation = CarSimulation(initial_car_position=0.0, initial_obstacle_position=10.0, initial_obstacle_speed=0.0)
+    simulation.simulate(ConstantController(2.0), obstacle_acceleration=0.0, simulation_time=1.0, time_step=0.25)
+
+    steps = list(simulation)
+    assert len(steps) == 5
+    assert set(steps[0]) == set(HISTORY_COLUMNS) | {'relative_distance', 'relative_speed'}
+    assert [s['time'] for s in steps] == pytest.approx([0.0, 0.25, 0.5, 0.75, 1.0])
+    assert [s['car_acceleration'] for s in steps] == [2.0, 2.0, 2.0, 2.0, 2.0]
+    assert steps[-1]['car_position'] == pytest.approx(1.0)
+    assert steps[-1]['relative_distance'] == pytest.approx(9.0)
+    assert simulation.history[CAR_ACCELERATION, -1] == simulation.current_car_acceleration
+
+
+def test_collision_tracking():
+    """ Tests that the collision state is tracked during the simulation. """
+    simulation = CarSimulation(initial_car_speed=10.0, initial_obstacle_position=10.0, initial_obstacle_speed=0.0)
+
+    assert not simulation.collision
+    assert simulation.time_to_collision == pytest.approx(1.0)
+
+    steps = simulation.simulate(ConstantController(0.0), obstacle_acceleration=0.0, simulation_time=2.0, time_step=0.25, stop_on_collision=True)
+
+    assert steps == 4
+    assert simulation.collision
+    assert simulation.collision_time == pytest.approx(1.0)
+    assert simulation.min_gap == pytest.approx(0.0)
+    assert simulation.time_to_collision == 0.0
+    assert len(simulation) == 5
+
+
+def test_steady_state_termination():
+    """ Tests that the simulation stops once the car and obstacle move at the same speed. """
+    simulation = CarSimulation(initial_car_speed=5.0, initial_obstacle_position=50.0, initial_obstacle_speed=10.0)
+
+    steps = simulation.simulate(
+        lambda car_speed, obstacle_distance, obstacle_relative_speed: min(obstacle_relative_speed, 1.0),
+        obstacle_acceleration=0.0, simulation_time=100.0, time_step=0.1, steady_state_tolerance=0.01
+    )
+
+    assert steps < 1000
+    assert simulation.current_car_speed == pytest.approx(10.0, abs=0.01)
+    assert simulation.time_to_collision == float('inf')
+
+
+def test_stream():
+    """ Tests that streaming a simulation yields the same steps as iterating over it afterwards. """
+    simulation = CarSimulation(initial_car_speed=10.0, initial_obstacle_position=10.0, initial_obstacle_speed=0.0)
+
+    streamed = list(simulation.stream(ConstantController(-1.0), obstacle_acceleration=0.0, simulation_time=2.0, time_step=0.25))
+
+    assert streamed == list(simulation)
+    assert len(streamed) == 9
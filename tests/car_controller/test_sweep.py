@@ -0,0 +1,85 @@
+""" Tests of the parallel parameter sweeps. """
+import pytest
+
+from car_controller import CarController, CarSimulation, Scenario, scenario_grid, run_sweep
+
+
+@pytest.fixture
+def scenarios():
+    return scenario_grid(
+        car_speeds=[7.0, 28.0],
+        obstacle_positions=[5.0, 35.0],
+        obstacle_speeds=[0.0, 14.0],
+        obstacle_target_speeds=[None, 28.0],
+        obstacle_accelerations=[5.0]
+    )
+
+
+def test_scenario_grid(scenarios):
+    """ Tests that the grid contains all combinations of the parameters. """
+    assert len(scenarios) == 16
+    assert len(set(scenarios)) == 16
+    assert scenarios[0] == Scenario(7.0, 5.0, 0.0, None, 5.0, 2.0)
+
+
+def test_sweep_matches_simulation(scenarios):
+    """ Tests that the results of a sweep match the separate simulations of the scenarios. """
+    results = list(run_sweep(scenarios, simulation_time=10.0, workers=0, chunk_size=5))
+
+    assert [r.index for r in results] == list(range(len(scenarios)))
+    for result, scenario in zip(results, scenarios):
+        target_speed = scenario.obstacle_speed if scenario.obstacle_target_speed is None else scenario.obstacle_target_speed
+        acceleration = scenario.obstacle_acceleration if target_speed > scenario.obstacle_speed else -scenario.obstacle_acceleration
+        duration = abs(target_speed - scenario.obstacle_speed) / scenario.obstacle_acceleration
+
+        simulation = CarSimulation(
+            initial_car_speed=scenario.car_speed,
+            initial_obstacle_position=scenario.obstacle_position,
+            initial_obstacle_speed=scenario.obstacle_speed
+        )
+        simulation.simulate(CarController(), lambda t: acceleration if 2.0 <= t < 2.0 + duration else 0.0, simulation_time=10.0)
+
+        assert result.scenario == scenario
+        assert result.collision == simulation.collision
+        assert result.final_gap == pytest.approx(simulation.current_obstacle_position - simulation.current_car_position)
+        assert result.final_speed == pytest.approx(simulation.current_car_speed)
+
+
+@pytest.mark.parametrize('ordered', [True, False])
+def test_sweep_workers(scenarios, ordered):
+    """ Tests that sharding the sweep across worker processes gives the same results. """
+    expected = list(run_sweep(scenarios, simulation_time=5.0, workers=0))
+
+    results = list(run_sweep(scenarios, simulation_time=5.0, workers=2, chunk_size=3, ordered=ordered))
+
+    if not ordered:
+        results = sorted(results)
+    assert results == expected
+
+
+def test_sweep_lookup_table(scenarios, tmp_path):
+    """ Tests that the controllers of a sweep can evaluate a lookup table from a file. """
+    controller = CarController()
+    controller.compile_lut(resolution=9).save_mapped(tmp_path / 'surface.flut')
+
+    constant = [s for s in scenarios if s.obstacle_target_speed is None]
+    results = list(run_sweep(constant, simulation_time=5.0, workers=0, lut_path=tmp_path / 'surface.flut'))
+    for result, scenario in zip(results, constant):
+        simulation = CarSimulation(
+            initial_car_speed=scenario.car_speed,
+            initial_obstacle_position=scenario.obstacle_position,
+            initial_obstacle_speed=scenario.obstacle_speed
+        )
+        simulation.simulate(controller, 0.0, 5.0)
+        assert result.final_speed == pytest.approx(simulation.current_car_speed)
+
+
+def test_sweep_cached(scenarios, tmp_path, monkeypatch):
+    """ Tests that the controllers of a sweep can be loaded from the cache of compiled controllers. """
+    from car_controller import cache
+
+    monkeypatch.setattr(cache, 'DEFAULT_DIRECTORY', str(tmp_path))
+    expected = list(run_sweep(scenarios, simulation_time=5.0, workers=0))
+
+    assert list(run_sweep(scenarios, simulation_time=5.0, workers=0, cached=True)) == expected
+    assert cache.ControllerCache().size > 0
@@ -0,0 +1,113 @@
+import pickle
+
+import numpy as np
+import pytest
+
+import fuzzy_logic as fl
+from fuzzy_logic.system import group_rules
+
+
+@pytest.fixture
+def rules():
+    """ Rules with nested expressions for two output variables. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TrapezoidalMembership(None, 0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_y = fl.Term('x', 'Y', fl.TrapezoidalMembership(1, 2, 3, 4))
+    term_z = fl.Term('z', 'Z', fl.TriangularMembership(-1, 0, 1))
+
+    return [
+        (term_a & term_b) >> term_x,
+        ((term_a | ~term_b) & ~(term_a & term_b)) >> term_y,
+        ~term_a >> term_z,
+        term_b >> term_z
+    ]
+
+
+def test_program_instructions(rules):
+    """ Tests that the expression trees are flattened in a topological order. """
+    program = fl.Program(group_rules(rules))
+
+    for slot, instruction in enumerate(program.instructions):
+        assert all(arg < slot for arg in instruction.args)
+        assert (instruction.term is not None) == (instruction.op == 'term')
+
+
+@pytest.mark.parametrize('a', [0.3, 1.0, 1.7])
+@pytest.mark.parametrize('b', [0.0, 0.5, 1.2])
+def test_program_matches_interpreter(rules, a, b):
+    """ Tests that the compiled system gives the same results as the directly evaluated expression trees. """
+    compiled = fl.System(*rules)
+    interpreted = fl.System(*rules, compiled=False)
+
+    assert compiled.program is not None
+    assert interpreted.program is None
+    assert compiled(a=a, b=b) == pytest.approx(interpreted(a=a, b=b))
+
+
+def test_program_batch(rules):
+    """ Tests that the batch version of a compiled system gives the same results as the interpreter. """
+    compiled = fl.System(*rules)
+    interpreted = fl.System(*rules, compiled=False)
+    inputs = dict(a=np.linspace(0.1, 1.9, 7), b=np.linspace(0.0, 1.5, 7))
+
+    compiled_result = compiled.evaluate_batch(inputs)
+    interpreted_result = interpreted.evaluate_batch(inputs)
+
+    assert compiled_result.keys() == interpreted_result.keys()
+    for variable in compiled_result:
+        assert compiled_result[variable] == pytest.approx(interpreted_result[variable])
+
+
+def test_program_common_subexpressions():
+    """ Tests that structurally identical terms and sub-expressions are evaluated only once. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_a_copy = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TriangularMembership(0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_y = fl.Term('y', 'Y', fl.TriangularMembership(0, 1, 2))
+
+    program = fl.Program(group_rules([
+        (term_a & term_b) >> term_x,
+        ~(term_b & term_a_copy) >> term_y,
+        term_a_copy >> term_y
+    ]))
+
+    assert [i.op for i in program.instructions].count('term') == 2
+    assert [i.op for i in program.instructions].count('and') == 1
+    assert program.stats == {'nodes': 8, 'instructions': 4, 'eliminated': 4}
+
+
+def test_program_pickle(rules):
+    """ Tests that an unpickled program evaluates the same as the original one. """
+    program = fl.Program(group_rules(rules))
+    unpickled = pickle.loads(pickle.dumps(program))
+
+    inputs = dict(a=0.3, b=1.2)
+    assert unpickled(inputs) == program(inputs)
+    assert unpickled.source == program.source
+
+
+def test_program_update(rules):
+    """ Tests that updated rules are compiled on their own and that the program matches a fresh one. """
+    program = fl.Program(group_rules(rules[:3]))
+    instructions = list(program.instructions)
+    source = program.source
+
+    program.update(group_rules(rules[2:]))
+    assert program.instructions == instructions  # the new rule reuses the term b
+
+    expected = fl.Program(group_rules(rules))
+    inputs = dict(a=0.3, b=1.2)
+    assert program(inputs) == expected(inputs)
+    assert program.source != source
+    assert program.stats == expected.stats
+
+    # instructions of removed rules are left out, the program is compiled again once most of them are unused
+    program.update({'z': rules[3:]})
+    assert program.stats['instructions'] == len(program.instructions) - 1
+    assert program(inputs) == fl.Program(group_rules(rules[:2] + rules[3:]))(inputs)
+    assert len(program.instructions) == len(instructions)
+    program.update({'x': []})
+    assert program(inputs) == fl.Program(group_rules(rules[3:]))(inputs)
+    assert len(program.instructions) == 1
@@ -0,0 +1,167 @@
+import math
+import pickle
+import random
+
+import numpy as np
+import pytest
+
+import fuzzy_logic as fl
+from fuzzy_logic.defuzzification import Aggregation
+
+# consequent memberships with overlaps, plateaus, a discontinuity and a non-normal shape
+MEMBERSHIPS = [
+    fl.TriangularMembership(-5, -2, 0),
+    fl.TrapezoidalMembership(-3, -1, 1, 3),
+    fl.TriangularMembership(0, 2, 5),
+    fl.TrapezoidalMembership(None, 4, 6, 8),
+    fl.PiecewiseMembership([(1, 0.2), (2, 0.8), (4, 0.3), (6, 0)]),
+]
+GRID = np.linspace(-6, 9, 1500001)
+
+
+@pytest.fixture(scope='module')
+def strengths():
+    rng = np.random.default_rng(0)
+    strengths = rng.uniform(0, 1, (12, len(MEMBERSHIPS)))
+    strengths[rng.uniform(size=strengths.shape) < 0.4] = 0.0
+    strengths[0] = [1, 0, 0, 0, 0]
+    strengths[1] = [0, 0, 0, 1, 0]
+    strengths[2] = [0, 0.3, 0.3, 0, 0]
+    return strengths
+
+
+def sampled(strengths):
+    """ Aggregated output sampled on the grid. """
+    return np.max([np.minimum(membership(GRID), strength) for membership, strength in zip(MEMBERSHIPS, strengths)], axis=0)
+
+
+def test_aggregation():
+    """ Tests that the aggregated output is linear between its breakpoints. """
+    rng = np.random.default_rng(1)
+    strengths = rng.uniform(0, 1, (5, len(MEMBERSHIPS)))
+    aggregation = Aggregation(MEMBERSHIPS)
+    breakpoints = aggregation.breakpoints(strengths)
+
+    for row, points in zip(strengths, breakpoints):
+        for low, high in zip(points, points[1:]):
+            if high - low > 1e-9:
+                t = np.linspace(low, high, 7)[1:-1]
+                degrees = aggregation(t[None, :], row[None, :])[0]
+                assert np.allclose(np.diff(degrees, 2), 0.0, atol=1e-12)
+
+
+def test_aggregation_types():
+    """ Tests that only piecewise linear memberships can be aggregated. """
+    class Step(fl.Membership):
+        def __call__(self, value):
+            return np.where(value > 0, 1.0, 0.0)
+
+        center = mass = plt_patch = None
+
+    with pytest.raises(TypeError):
+        Aggregation([Step()])
+
+
+def test_centroid(strengths):
+    """ Tests the analytic centroid against a numerical integration of the sampled output. """
+    values = fl.Centroid()(MEMBERSHIPS, list(strengths.T))
+    for row, value in zip(strengths, values):
+        output = sampled(row)
+        assert value == pytest.approx(np.trapezoid(output * GRID, GRID) / np.trapezoid(output, GRID), abs=1e-4)
+
+    assert fl.Centroid()(MEMBERSHIPS[:1], [1.0]) == pytest.approx(MEMBERSHIPS[0].center)
+    assert fl.Centroid()([fl.TriangularMembership(0, 1, 2)], [0.5]) == pytest.approx(1.0)
+
+
+def test_bisector(strengths):
+    """ Tests that the bisector splits the sampled output into halves. """
+    values = fl.Bisector()(MEMBERSHIPS, list(strengths.T))
+    for row, value in zip(strengths, values):
+        output = sampled(row)
+        areas = np.concatenate([[0.0], np.cumsum((output[1:] + output[:-1]) / 2.0 * np.diff(GRID))])
+        assert value == pytest.approx(np.interp(areas[-1] / 2.0, areas, GRID), abs=1e-4)
+
+    assert fl.Bisector()([fl.TriangularMembership(0, 1, 4)], [1.0]) == pytest.approx(4 - math.sqrt(6))
+
+
+def test_mean_of_maxima(strengths):
+    """ Tests the mean of the points of the maximal degree of the sampled output. """
+    values = fl.MeanOfMaxima()(MEMBERSHIPS, list(strengths.T))
+    for row, value in zip(strengths, values):
+        output = sampled(row)
+        assert value == pytest.approx(GRID[output >= output.max() - 1e-9].mean(), abs=1e-4)
+
+    # maxima in isolated points only
+    assert fl.MeanOfMaxima()([fl.TriangularMembership(0, 1, 2), fl.TriangularMembership(2, 4, 6)], [1.0, 1.0]) == pytest.approx(2.5)
+
+
+def test_mean_of_maxima_near_ties():
+    """ Tests that nearly equal strengths give nearly the same mean of maxima as equal ones. """
+    memberships = [fl.TriangularMembership(0, 5, 10), fl.TriangularMembership(10, 15, 20), fl.TriangularMembership(20, 25, 30)]
+
+    for strength in [1.0, 1.0 - 1e-16, 1.0 - 1e-12, 1.0 - 1e-10]:
+        assert fl.MeanOfMaxima()(memberships, [1.0, strength, 1.0]) == pytest.approx(15.0, abs=1e-6)
+        assert fl.MeanOfMaxima()(memberships, [strength, 1.0, 1.0]) == pytest.approx(20.0 if strength < 1.0 - 1e-9 else 15.0, abs=1e-6)
+    assert fl.MeanOfMaxima()(memberships, [1.0, 0.5, 1.0 - 1e-16]) == pytest.approx(15.0, abs=1e-6)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_mean_of_maxima_sparse_matches_dense(seed):
+    """ Tests that the sparse and dense evaluations agree with the mean of maxima also for non-idempotent operators. """
+    rng = random.Random(seed)
+    consequents = [fl.Term('x', f'X{i}', fl.TriangularMembership(10 * i, 10 * i + 5, 10 * i + 10)) for i in range(3)]
+
+    def term():
+        variable, low = rng.choice('ab'), rng.randint(0, 10)
+        return fl.Term(variable, f'{variable}{low}', fl.TriangularMembership(low, low + 1, low + 2))
+
+    rules = [
+        rng.choice([term() & term(), term() | term(), term() & ~term(), term()]) >> rng.choice(consequents)
+        for _ in range(100)
+    ]
+    options = dict(operators=fl.ProductOperators(), defuzzifier=fl.MeanOfMaxima())
+    dense, sparse = fl.System(*rules, sparse=False, **options), fl.System(*rules, sparse=True, **options)
+
+    for _ in range(200):
+        # inputs in the peaks of the terms give strengths of exactly one (or differing from it by rounding)
+        inputs = {variable: rng.choice([rng.uniform(-1, 13), rng.randint(0, 12)]) for variable in 'ab'}
+        assert sparse(**inputs)['x'] == pytest.approx(dense(**inputs)['x'], abs=1e-6, nan_ok=True)
+
+
+@pytest.mark.parametrize('defuzzifier', [fl.WeightedCentroid(), fl.Centroid(), fl.Bisector(), fl.MeanOfMaxima()])
+def test_fallback(defuzzifier):
+    """ Tests that the value is the fallback when no rule fires. """
+    assert math.isnan(defuzzifier(MEMBERSHIPS, [0.0] * len(MEMBERSHIPS)))
+
+    fallback = type(defuzzifier)(fallback=-1.0)
+    values = fallback(MEMBERSHIPS, [np.array([0.0, 0.5])] * len(MEMBERSHIPS))
+    assert values[0] == -1.0 and values[1] != -1.0
+
+
+@pytest.mark.parametrize('defuzzifier', [None, fl.WeightedCentroid(fallback=0.0), fl.Centroid(), fl.Bisector(), fl.MeanOfMaxima()])
+def test_system_defuzzifier(defuzzifier):
+    """ Tests that all the evaluation paths of a system defuzzify the same way. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TrapezoidalMembership(None, 0, 1, 2))
+    rules = [
+        (term_a & term_b) >> fl.Term('x', 'X', MEMBERSHIPS[0]),
+        (term_a & ~term_b) >> fl.Term('x', 'Y', MEMBERSHIPS[4]),
+        term_b >> fl.Term('x', 'Z', MEMBERSHIPS[3]),
+    ]
+    systems = [
+        fl.System(*rules, defuzzifier=defuzzifier),
+        fl.System(*rules, defuzzifier=defuzzifier, compiled=False),
+        fl.System(*rules, defuzzifier=defuzzifier, sparse=True),
+        pickle.loads(pickle.dumps(fl.System(*rules, defuzzifier=defuzzifier))),
+    ]
+    fallback = defuzzifier.fallback if defuzzifier is not None else math.nan
+
+    a, b = np.meshgrid(np.linspace(-1, 3, 9), np.linspace(-1, 3, 7))
+    expected = [systems[1](a=va, b=vb)['x'] for va, vb in zip(a.ravel(), b.ravel())]
+    for system in systems:
+        batch = system.evaluate_batch({'a': a, 'b': b})['x']
+        assert batch.ravel() == pytest.approx(expected, nan_ok=True)
+        assert [system(a=va, b=vb)['x'] for va, vb in zip(a.ravel(), b.ravel())] == pytest.approx(expected, nan_ok=True)
+
+    # no rule fires for a and b beyond their memberships
+    assert systems[0](a=-1.0, b=3.0)['x'] == pytest.approx(fallback, nan_ok=True)
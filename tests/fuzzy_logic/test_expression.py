@@ -1,4 +1,6 @@
 """ Unit tests of the expression system. """
+import pickle
+
 import pytest as pytest
 
 import fuzzy_logic as fl
@@ -62,11 +64,38 @@ def test_complex(a, b):
     val_b = term_b(a=a, b=b)
 
     assert isinstance(exp, fl.OrExpression)
-    assert isinstance(exp._left, fl.AndExpression)
-    assert isinstance(exp._right, fl.NotExpression)
+    left, right = exp.operands
+    assert isinstance(left, fl.AndExpression)
+    assert isinstance(right, fl.NotExpression)
     assert val_exp == max(min(val_a, val_b), 1 - val_a)
 
 
+def test_flattening():
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TriangularMembership(0, 1, 2))
+    term_c = fl.Term('c', 'C', fl.TriangularMembership(0, 1, 2))
+
+    conjunction = term_a & term_b
+    exp = (conjunction & term_c) & (term_b | term_c)
+
+    assert exp.operands[:3] == (term_a, term_b, term_c)
+    assert isinstance(exp.operands[3], fl.OrExpression)
+    assert conjunction.operands == (term_a, term_b)
+    assert (term_a | term_b | term_a | (term_b | term_a)).operands == (term_a, term_b, term_a, term_b, term_a)
+    assert (term_a | ~term_a).operands[0] is term_a
+    assert exp.terms == {term_a, term_b, term_c}
+
+
+def test_long_chain():
+    terms = [fl.Term('a', f'A{i}', fl.TriangularMembership(i, i + 1, i + 2)) for i in range(5000)]
+
+    exp = fl.OrExpression(*terms)
+
+    assert len(exp.operands) == 5000
+    assert exp(a=2500.5) == 0.5
+    assert len(exp.terms) == 5000
+
+
 def test_implication():
     term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
     term_b = fl.Term('b', 'B', fl.TriangularMembership(0, 1, 2))
@@ -75,3 +104,27 @@ def test_implication():
 
     assert isinstance(impl, fl.Rule)
     assert impl == (term_a, term_b)
+
+
+def test_slots():
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TriangularMembership(0, 1, 2))
+
+    for exp in [term_a, ~term_a, term_a & term_b, term_a | term_b]:
+        assert not hasattr(exp, '__dict__')
+        with pytest.raises(AttributeError):
+            exp.other = None
+
+
+def test_term_interning():
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+
+    assert fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2)) is term_a
+    assert fl.Term('a', 'A', fl.TriangularMembership(0, 1, 3)) is not term_a
+    assert fl.Term('a', 'B', fl.TriangularMembership(0, 1, 2)) is not term_a
+    assert pickle.loads(pickle.dumps(term_a)) is term_a
+
+    exp = pickle.loads(pickle.dumps((term_a & ~term_a) | term_a))
+    assert exp.operands[1] is term_a
+    assert exp.operands[0].operands[0] is term_a
+    assert exp(a=0.5) == 0.5
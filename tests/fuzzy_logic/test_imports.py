@@ -0,0 +1,50 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+def run_isolated(code: str) -> dict:
+    """ Runs the code in a fresh interpreter and returns the JSON it prints. """
+    output = subprocess.run([sys.executable, '-c', code], cwd=Path(__file__).parents[2], check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def test_import_is_lazy():
+    """ Tests that importing the package does not import its submodules (nor their dependencies). """
+    result = run_isolated(
+        'import json, sys\n'
+        'import fuzzy_logic\n'
+        'print(json.dumps({"modules": sorted(sys.modules)}))\n'
+    )
+
+    modules = set(result['modules'])
+    assert not any(m.startswith('fuzzy_logic.') for m in modules)
+    assert 'numpy' not in modules
+    assert 'matplotlib' not in modules
+
+
+def test_names_are_loaded_on_access():
+    """ Tests that the public names are importable and that using the system does not import matplotlib. """
+    result = run_isolated(
+        'import json, sys\n'
+        'import fuzzy_logic as fl\n'
+        'term = fl.Term("a", "A", fl.TriangularMembership(0, 1, 2))\n'
+        'system = fl.System(term >> fl.Term("x", "X", fl.TriangularMembership(0, 1, 2)))\n'
+        'print(json.dumps({"value": system(a=0.5)["x"], "modules": sorted(sys.modules)}))\n'
+    )
+
+    assert result['value'] == pytest.approx(1.0)
+    assert 'fuzzy_logic.system' in result['modules']
+    assert 'matplotlib' not in result['modules']
+
+
+def test_unknown_name():
+    """ Tests that unknown names raise the usual error. """
+    import fuzzy_logic
+
+    with pytest.raises(AttributeError):
+        fuzzy_logic.Unknown
+    assert {'System', 'Term', 'compiler'} <= set(dir(fuzzy_logic))
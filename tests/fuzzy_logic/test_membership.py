@@ -1,3 +1,7 @@
+import gc
+import pickle
+
+import numpy as np
 import pytest
 
 import fuzzy_logic as fl
@@ -136,3 +140,105 @@ def test_trapezoidal_rectangle():
 
     for x, y in expected:
         assert membership(x) == y
+
+
+@pytest.mark.parametrize(argnames='points', argvalues=PIECEWISE_SHAPES, ids=PIECEWISE_IDS)
+def test_piecewise_array(points):
+    """ Tests that evaluating a piecewise membership function on an array matches the scalar evaluation. """
+    membership = fl.PiecewiseMembership(points)
+    values = np.linspace(-1.0, 8.0, 37)
+
+    result = membership(values)
+
+    assert isinstance(result, np.ndarray)
+    assert result == pytest.approx([membership(float(v)) for v in values])
+
+
+def test_piecewise_immutable():
+    """ Tests that the piecewise membership function does not depend on the (mutable) list it was created from. """
+    points = [(2.0, 0.0), (0.0, 0.0), (1.0, 1.0)]
+    membership = fl.PiecewiseMembership(points)
+    points.append((3.0, 1.0))
+
+    assert membership.points == ((0.0, 0.0), (1.0, 1.0), (2.0, 0.0))
+    assert membership.mass == pytest.approx(1.0)
+    assert membership.center == pytest.approx(1.0)
+    with pytest.raises(AttributeError):
+        membership.points = ()
+
+
+def test_piecewise_zero_mass():
+    """ Tests that a membership function without any area has a defined center. """
+    membership = fl.PiecewiseMembership([(1.0, 0.0), (3.0, 0.0)])
+
+    assert membership.mass == 0.0
+    assert membership.center == 2.0
+
+
+def test_piecewise_many_points():
+    """ Tests a piecewise membership function with many breakpoints against np.interp. """
+    xs = np.linspace(-50.0, 50.0, 301)
+    ys = (np.sin(xs) + 1.0) / 2.0
+    membership = fl.PiecewiseMembership(list(zip(xs, ys)))
+    values = np.random.default_rng(0).uniform(-60.0, 60.0, 1000)
+    expected = np.interp(values, xs, ys, left=0.0, right=0.0)
+
+    assert membership(values) == pytest.approx(expected)
+    assert [membership(float(v)) for v in values] == pytest.approx(expected)
+    assert membership(50.0) == ys[-1]
+    assert membership(50.1) == 0.0
+
+
+@pytest.mark.parametrize('membership', [
+    fl.TriangularMembership(0.0, 2.0, 3.0),
+    fl.TriangularMembership(0.0, 0.0, 3.0),
+    fl.TrapezoidalMembership(0.0, 2.0, 3.0, 4.0),
+    fl.TrapezoidalMembership(0.0, 2.0, 2.0, 4.0),
+    fl.TrapezoidalMembership(None, 2.0, 3.0, 4.0),
+], ids=['triangle', 'right triangle', 'trapezoid', 'trapezoid - triangle', 'right trapezoid'])
+def test_shapes_match_piecewise(membership):
+    """ Tests that the fast paths of the triangular and trapezoidal memberships match the generic implementation. """
+    piecewise = fl.PiecewiseMembership(membership.points)
+    values = np.linspace(-1.0, 5.0, 121)
+
+    assert membership(values) == pytest.approx(piecewise(values))
+    assert [membership(float(v)) for v in values] == pytest.approx([piecewise(float(v)) for v in values])
+
+
+def test_interning():
+    """ Tests that memberships of the same class with the same points are a single shared instance without a `__dict__`. """
+    triangular = fl.TriangularMembership(0, 1, 2)
+
+    assert fl.TriangularMembership(0.0, 1.0, 2.0) is triangular
+    assert fl.TriangularMembership(0, 1, 3) is not triangular
+    assert fl.PiecewiseMembership([(2, 0), (0, 0), (1, 1)]) is fl.PiecewiseMembership(triangular.points)
+    assert fl.PiecewiseMembership(triangular.points) is not triangular
+    assert fl.TrapezoidalMembership(None, 0, 1, 2) is fl.TrapezoidalMembership(None, 0, 1, 2)
+    assert not hasattr(triangular, '__dict__')
+    assert not hasattr(fl.TrapezoidalMembership(None, 0, 1, 2), '__dict__')
+
+
+def test_pickle_interned():
+    """ Tests that unpickled memberships are the shared instances and stay immutable. """
+    membership = fl.TrapezoidalMembership(0.0, 2.0, 3.0, 4.0)
+    assert pickle.loads(pickle.dumps(membership)) is membership
+
+    state = pickle.dumps(fl.PiecewiseMembership([(0.0, 0.0), (1.0, 1.0), (7.0, 0.0)]))
+    gc.collect()
+    unpickled = pickle.loads(state)
+    assert unpickled(np.array([0.5, 4.0])) == pytest.approx([0.5, 0.5])
+    assert unpickled is fl.PiecewiseMembership([(0.0, 0.0), (1.0, 1.0), (7.0, 0.0)])
+    with pytest.raises(ValueError):
+        unpickled._xs[0] = 1.0
+
+
+def test_piecewise_discontinuity():
+    """ Tests that at a duplicated breakpoint the value of the segment on the left applies. """
+    membership = fl.PiecewiseMembership([(0, 0), (1, 0), (1, 1), (2, 1), (3, 0)])
+
+    assert membership(1.0) == 0.0
+    assert membership(1.0 + 1e-9) == 1.0
+    assert membership(0.0) == 0.0
+    assert membership(2.0) == 1.0
+    assert membership(3.0) == 0.0
+    assert fl.PiecewiseMembership([(0, 0), (0, 1), (1, 1)])(0.0) == 0.0
@@ -0,0 +1,152 @@
+import functools
+import itertools
+
+import numpy as np
+import pytest
+
+import fuzzy_logic as fl
+from fuzzy_logic.system import cleanup_rules, group_rules
+
+FAMILIES = [fl.ZadehOperators(), fl.ProductOperators(), fl.LukasiewiczOperators(), fl.HamacherOperators()]
+DEGREES = [0.0, 0.2, 0.5, 0.7, 1.0]
+
+
+@pytest.mark.parametrize('operators', FAMILIES, ids=lambda o: type(o).__name__)
+def test_operators_properties(operators):
+    """ Tests the boundary conditions, commutativity and duality of the operators. """
+    for a, b in itertools.product(DEGREES, repeat=2):
+        assert operators.conjunction(a, 1.0) == pytest.approx(a)
+        assert operators.disjunction(a, 0.0) == pytest.approx(a)
+        assert operators.conjunction(a, 0.0) == pytest.approx(0.0)
+        assert operators.disjunction(a, 1.0) == pytest.approx(1.0)
+        assert operators.conjunction(a, b) == pytest.approx(operators.conjunction(b, a))
+        assert operators.conjunction(a, b) <= min(a, b) + 1e-12
+        assert operators.disjunction(a, b) == pytest.approx(1.0 - operators.conjunction(1.0 - a, 1.0 - b))
+
+
+def test_operators_values():
+    """ Tests the values of the operators of each family. """
+    expected = {
+        fl.ZadehOperators: (0.2, 0.5),
+        fl.ProductOperators: (0.1, 0.6),
+        fl.LukasiewiczOperators: (0.0, 0.7),
+        fl.HamacherOperators: (0.1 / 0.6, 0.5 / 0.9),
+    }
+    for operators in FAMILIES:
+        conjunction, disjunction = expected[type(operators)]
+        assert operators.conjunction(0.5, 0.2) == pytest.approx(conjunction)
+        assert operators.disjunction(0.5, 0.2) == pytest.approx(disjunction)
+
+
+@pytest.mark.parametrize('operators', FAMILIES, ids=lambda o: type(o).__name__)
+@pytest.mark.parametrize('count', [2, 3, 6])
+def test_operators_source(operators, count):
+    """ Tests that the fused n-ary operations equal the folded binary ones, for scalars and arrays. """
+    rng = np.random.default_rng(count)
+    values = rng.uniform(0, 1, (count, 50))
+    values[:, :5] = rng.choice([0.0, 1.0], (count, 5))
+    names = [f's{i}' for i in range(count)]
+    namespace = dict(zip(names, values), minimum=np.minimum, maximum=np.maximum, **operators.namespace)
+
+    for source, operation in [
+        (operators.conjunction_source, operators.conjunction),
+        (operators.disjunction_source, operators.disjunction),
+    ]:
+        expected = functools.reduce(operation, values)
+        assert eval(source(names, batch=True), namespace) == pytest.approx(expected)
+        for column, value in enumerate(expected):
+            scalars = dict(namespace, **{name: float(v) for name, v in zip(names, values[:, column])})
+            assert eval(source(names, batch=False), scalars) == pytest.approx(value)
+
+
+@pytest.mark.parametrize('operators', FAMILIES, ids=lambda o: type(o).__name__)
+def test_system_operators(operators):
+    """ Tests that all the evaluation paths of a system use the same operators. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TrapezoidalMembership(None, 0, 1, 2))
+    term_c = fl.Term('c', 'C', fl.TriangularMembership(0.5, 1, 3))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_y = fl.Term('x', 'Y', fl.TrapezoidalMembership(1, 2, 3, 4))
+    rules = [
+        (term_a & term_b & term_c) >> term_x,
+        (term_a | ~term_b | term_c) >> term_y,
+        (term_a & ~term_c) >> term_y,
+    ]
+    systems = [
+        fl.System(*rules, operators=operators),
+        fl.System(*rules, operators=operators, sparse=True),
+        fl.System(*rules, operators=operators, compiled=False),
+    ]
+
+    grid = [np.linspace(-0.5, 2.5, 5)] * 3
+    a, b, c = np.meshgrid(*grid)
+    results = [system.evaluate_batch(dict(a=a, b=b, c=c))['x'].ravel() for system in systems]
+    for result in results[1:]:
+        assert result == pytest.approx(results[0], nan_ok=True)
+    for i, (va, vb, vc) in enumerate(zip(a.ravel(), b.ravel(), c.ravel())):
+        for system in systems:
+            assert system(a=va, b=vb, c=vc)['x'] == pytest.approx(results[0][i], nan_ok=True)
+
+    if not isinstance(operators, fl.ZadehOperators):
+        assert not np.allclose(results[0], fl.System(*rules).evaluate_batch(dict(a=a, b=b, c=c))['x'].ravel(), equal_nan=True)
+
+
+@pytest.mark.parametrize('operators', FAMILIES, ids=lambda o: type(o).__name__)
+def test_repeated_operands(operators):
+    """ Tests that repeated operands are not merged (the operators of most families are not idempotent). """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    copy_a = fl.Term('a', 'A2', fl.TriangularMembership(0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_y = fl.Term('x', 'Y', fl.TrapezoidalMembership(1, 2, 3, 4))
+
+    assert operators.evaluate(term_a & term_a, dict(a=0.5)) == pytest.approx(operators.conjunction(0.5, 0.5))
+    assert operators.evaluate(term_a | term_a, dict(a=0.5)) == pytest.approx(operators.disjunction(0.5, 0.5))
+
+    a = np.linspace(-0.5, 2.5, 13)
+    for compiled, sparse in [(True, False), (True, True), (False, False)]:
+        repeated = fl.System((term_a & term_a) >> term_x, ~term_a >> term_y, ~term_a >> term_y, operators=operators, compiled=compiled, sparse=sparse)
+        distinct = fl.System((term_a & copy_a) >> term_x, (~term_a | ~copy_a) >> term_y, operators=operators, compiled=compiled, sparse=sparse)
+        assert repeated.evaluate_batch(dict(a=a))['x'] == pytest.approx(distinct.evaluate_batch(dict(a=a))['x'], nan_ok=True)
+        for value in a:
+            assert repeated(a=value)['x'] == pytest.approx(distinct(a=value)['x'], nan_ok=True)
+
+
+def test_program_fused_chains():
+    """ Tests that chains of conjunctions and disjunctions are compiled into single n-ary instructions. """
+    terms = [fl.Term('a', f'A{i}', fl.TriangularMembership(i, i + 1, i + 2)) for i in range(4)]
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+
+    program = fl.Program(group_rules([
+        (terms[0] & terms[1] & (terms[2] & terms[3])) >> term_x,
+        ((terms[0] | terms[1]) & (terms[2] | terms[3])) >> term_x,
+    ]))
+
+    assert [(i.op, len(i.args)) for i in program.instructions if i.op != 'term'] == [('and', 4), ('or', 2), ('or', 2), ('and', 2)]
+    assert program.stats == {'nodes': 14, 'instructions': 8, 'eliminated': 6}
+    assert program.slot(terms[0] & (terms[1] & terms[2]) & terms[3]) == program.slot(terms[0] & terms[1] & (terms[2] & terms[3]))
+
+
+def test_program_long_chain():
+    """ Tests that a long chain of rules merged into a single disjunction compiles into a single instruction. """
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    rules = [fl.Term('a', f'A{i}', fl.TriangularMembership(i, i + 1, i + 2)) >> term_x for i in range(2000)]
+
+    program = fl.Program(group_rules(cleanup_rules(rules)))
+
+    assert [i.op for i in program.instructions].count('or') == 1
+    assert program(dict(a=10.5))['x'] == pytest.approx(1.0)
+
+
+def test_profiled_chains():
+    """ Tests that the antecedents of profiled rules flattened into the merged rules get their own slots. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TriangularMembership(0, 1, 2))
+    term_c = fl.Term('c', 'C', fl.TriangularMembership(0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    system = fl.System((term_a | term_b) >> term_x, term_c >> term_x)
+
+    assert [len(i.args) for i in system.program.instructions if i.op == 'or'] == [3]
+    profile = system.enable_profiling()
+    system(a=0.5, b=0.2, c=0.0)
+    assert [len(i.args) for i in system.program.instructions if i.op == 'or'] == [3, 2]
+    assert [rule['count'] for rule in profile.rules] == [1, 1]
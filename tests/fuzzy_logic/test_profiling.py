@@ -0,0 +1,94 @@
+import json
+
+import numpy as np
+import pytest
+
+import fuzzy_logic as fl
+
+
+@pytest.fixture
+def system():
+    """ System with a rule that never fires for inputs in [0, 2]. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('a', 'B', fl.TriangularMembership(1, 2, 3))
+    term_c = fl.Term('a', 'C', fl.TriangularMembership(5, 6, 7))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_y = fl.Term('x', 'Y', fl.TriangularMembership(1, 2, 3))
+
+    return fl.System(
+        term_a >> term_x,
+        (term_b | term_c) >> term_y,
+        (term_c & ~term_a) >> term_y,
+    )
+
+
+def test_profiling_disabled(system):
+    """ Tests that without profiling the system is evaluated by the uninstrumented program. """
+    program = system.program
+    assert system.profile is None
+    assert 'record' not in program.source
+
+    profile = system.enable_profiling()
+    assert system.profile is profile
+    assert system.program is not program
+    assert 'record' in system.program.source
+
+    assert system.disable_profiling() is profile
+    assert system.program is program
+
+
+def test_profile(system):
+    """ Tests the statistics recorded for scalar and batch evaluations. """
+    expected = system(a=0.5)
+    profile = system.enable_profiling(bins=4)
+    assert system(a=0.5) == expected
+    system(a=1.5)
+    system.evaluate_batch({'a': np.array([0.25, 1.0, 2.0])})
+
+    assert profile.evaluations == 5
+    memberships = profile.memberships
+    assert memberships['a.A']['count'] == 5
+    assert memberships['a.A']['fired'] == 4
+    assert memberships['a.A']['max'] == 1.0
+    assert memberships['a.A']['histogram'] == [1, 1, 2, 1]
+    assert memberships['a.C']['fired'] == 0
+    assert all(node['time'] >= 0.0 for node in profile.nodes)
+
+    rules = profile.rules
+    assert [r['rule'] for r in rules] == ['a.A >> x.X', '(a.B | a.C) >> x.Y', '(a.C & ~a.A) >> x.Y']
+    assert rules[1]['fired'] == 2
+    assert rules[2]['subtree_time'] >= rules[2]['time']
+    assert [fl.profiling.describe(r) for r in profile.never_fired()] == ['(a.C & ~a.A) >> x.Y']
+
+    profile.reset()
+    assert profile.evaluations == 0
+    assert len(profile.never_fired()) == 3
+
+
+def test_profile_export(system):
+    """ Tests that the profile can be exported as JSON. """
+    profile = system.enable_profiling()
+    system(a=1.2)
+
+    data = json.loads(profile.to_json())
+    assert data['evaluations'] == 1
+    assert data['never_fired'] == ['(a.C & ~a.A) >> x.Y']
+    assert len(data['nodes']) == len(system.program.instructions)
+    assert data['nodes'][0]['term'] == 'a.A'
+
+
+def test_profile_shared_memberships():
+    """ Tests that terms with the same membership but different labels are all reported. """
+    term_a1 = fl.Term('a', 'A1', fl.TriangularMembership(0, 1, 2))
+    term_a2 = fl.Term('a', 'A2', fl.TriangularMembership(0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_y = fl.Term('x', 'Y', fl.TriangularMembership(1, 2, 3))
+    system = fl.System(term_a1 >> term_x, ~term_a2 >> term_y)
+
+    profile = system.enable_profiling()
+    system(a=0.5)
+
+    memberships = profile.memberships
+    assert set(memberships) == {'a.A1', 'a.A2'}
+    assert memberships['a.A1'] == memberships['a.A2']
+    assert memberships['a.A2']['count'] == 1
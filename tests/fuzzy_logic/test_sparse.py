@@ -0,0 +1,129 @@
+import math
+import random
+from unittest.mock import Mock
+
+import pytest
+
+import fuzzy_logic as fl
+from fuzzy_logic.sparse import IntervalIndex, activation_bounds
+
+
+def test_membership_support():
+    """ Tests the intervals outside of which the memberships are zero. """
+    assert fl.TriangularMembership(1, 2, 3).support == (1, 3)
+    assert fl.TrapezoidalMembership(None, 0, 1, 2).support == (0, 2)
+    assert fl.PiecewiseMembership([(0, 0), (1, 0), (2, 1), (3, 0), (4, 0)]).support == (1, 3)
+    assert fl.PiecewiseMembership([(0, 0), (1, 0)]).support == (math.inf, -math.inf)
+
+
+def test_interval_index():
+    """ Tests that the index returns exactly the intervals that contain the queried value. """
+    intervals = [(0.0, 2.0), (1.0, 3.0), (-math.inf, 1.0), (2.0, math.inf), (5.0, 4.0)]
+    index = IntervalIndex(intervals)
+
+    for value in [-1.0, 0.0, 0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 10.0]:
+        expected = sum(1 << i for i, (low, high) in enumerate(intervals) if low <= value <= high)
+        assert index(value) == expected
+
+
+def test_activation_bounds():
+    """ Tests the bounds of the inputs for which expressions can fire. """
+    a1 = fl.Term('a', 'A1', fl.TriangularMembership(0, 1, 2))
+    a2 = fl.Term('a', 'A2', fl.TriangularMembership(1, 2, 3))
+    b = fl.Term('b', 'B', fl.TriangularMembership(5, 6, 7))
+
+    assert activation_bounds(a1 & a2) == {'a': (1, 2)}
+    assert activation_bounds(a1 & b) == {'a': (0, 2), 'b': (5, 7)}
+    assert activation_bounds(a1 | a2) == {'a': (0, 3)}
+    assert activation_bounds(a1 | b) == {}
+    assert activation_bounds(~a1 & b) == {'b': (5, 7)}
+
+
+def test_short_circuit():
+    """ Tests that the right operand is not evaluated when the left one decides the result. """
+    zero = fl.Term('a', 'Z', fl.TriangularMembership(5, 6, 7))
+    one = fl.Term('a', 'O', fl.TrapezoidalMembership(None, 0, 1, 2))
+    right = Mock(spec=fl.Expression)
+
+    assert fl.AndExpression(zero, right)(a=0.5) == 0.0
+    assert fl.OrExpression(one, right)(a=0.5) == 1.0
+    right.assert_not_called()
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_sparse_system_matches_dense(seed):
+    """ Tests that the sparse evaluation gives exactly the same results as the evaluation of all the rules. """
+    rng = random.Random(seed)
+    consequents = [fl.Term('x', f'X{i}', fl.TriangularMembership(i, i + 1, i + 2)) for i in range(4)]
+
+    def term():
+        variable, low = rng.choice('ab'), rng.uniform(0, 10)
+        return fl.Term(variable, f'{variable}{low}', fl.TriangularMembership(low, low + 1, low + 2))
+
+    rules = [
+        rng.choice([term() & term(), term() | term(), term() & ~term(), term()]) >> rng.choice(consequents)
+        for _ in range(100)
+    ]
+    dense, sparse = fl.System(*rules, sparse=False), fl.System(*rules, sparse=True)
+
+    for _ in range(200):
+        inputs = dict(a=rng.uniform(-1, 13), b=rng.uniform(-1, 13))
+        assert set(sparse.active_rules(**inputs)) >= set(r for r in rules if r.antecedent(**inputs) > 0)
+        expected, actual = dense(**inputs), sparse(**inputs)
+        assert actual.keys() == expected.keys()
+        for variable, value in expected.items():
+            assert actual[variable] == value or math.isnan(actual[variable]) and math.isnan(value)
+
+
+def test_sparse_by_default():
+    """ Tests that only large systems with narrow rules are sparse by default. """
+    consequent = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+
+    def rules(count, width):
+        return [
+            fl.Term('a', f'A{i}', fl.TriangularMembership(i, i + width / 2, i + width)) >> consequent
+            for i in range(count)
+        ]
+
+    assert fl.System(*rules(100, 2)).sparse
+    assert not fl.System(*rules(100, 50)).sparse
+    assert not fl.System(*rules(10, 2)).sparse
+    assert not fl.System(*rules(100, 2), sparse=False).sparse
+
+
+def test_interval_index_updates():
+    """ Tests that intervals added to and removed from an index are found the same as by a new index. """
+    rng = random.Random(0)
+    intervals = {i: (rng.uniform(0, 10), rng.uniform(0, 10)) for i in range(8)}
+    intervals[8] = (-math.inf, 3.0)
+    index = IntervalIndex([intervals[i] for i in range(4)])
+    for i in range(4, 9):
+        index.add(i, intervals[i])
+    for i in (1, 5):
+        index.remove(i)
+        del intervals[i]
+    index.add(1, (2.0, 2.0))
+    intervals[1] = (2.0, 2.0)
+
+    for value in [rng.uniform(-1, 11) for _ in range(200)] + [low for low, _ in intervals.values()] + [2.0]:
+        assert index(value) == sum(1 << i for i, (low, high) in intervals.items() if low <= value <= high)
+
+
+def test_never_active_rules():
+    """ Tests that systems with rules whose antecedents can never be non-zero are built and evaluated. """
+    term_a = fl.Term('x', 'a', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('x', 'b', fl.TriangularMembership(5, 6, 7))
+    term_z = fl.Term('y', 'z', fl.PiecewiseMembership([(0, 0), (1, 0)]))
+    term_o = fl.Term('o', 'O', fl.TriangularMembership(0, 1, 2))
+    term_p = fl.Term('o', 'P', fl.TriangularMembership(1, 2, 3))
+    rules = [(term_a & term_b) >> term_o, term_z >> term_o, ~term_a >> term_p]
+
+    dense = fl.System(*rules, sparse=False)
+    sparse = fl.System(*rules, sparse=True)
+    assert sparse.sparse and not dense.sparse
+    for x in [0.5, 1.0, 6.0]:
+        assert sparse(x=x, y=0.5) == pytest.approx(dense(x=x, y=0.5), nan_ok=True)
+        assert set(sparse.active_rules(x=x, y=0.5)) == {rules[2]}
+
+    isolated = fl.System((term_a & term_b) >> term_o, term_z >> term_p, sparse=True)
+    assert isolated.active_rules(x=1.0, y=0.5) == []
@@ -1,3 +1,6 @@
+import numpy as np
+import pytest
+
 import fuzzy_logic as fl
 from fuzzy_logic.system import cleanup_rules, group_rules
 
@@ -17,8 +20,7 @@ def test_cleanup_rules():
     assert isinstance(rules[0], fl.Rule)
     assert isinstance(rules[1], fl.Rule)
     assert isinstance(rules[0].antecedent, fl.OrExpression)
-    assert rules[0].antecedent._left == term_a
-    assert rules[0].antecedent._right == term_b
+    assert rules[0].antecedent.operands == (term_a, term_b)
     assert rules[0].consequent == term_b
     assert rules[1].antecedent == term_a
     assert rules[1].consequent == term_a
@@ -38,3 +40,116 @@ def test_group_rules():
     assert len(groups) == 2
     assert len(groups['a']) == 1
     assert len(groups['b']) == 2
+
+
+def test_evaluate_batch():
+    """ Tests that the batch evaluation of a system matches the evaluation of every input separately. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TrapezoidalMembership(None, 0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_y = fl.Term('x', 'Y', fl.TrapezoidalMembership(1, 2, 3, 4))
+
+    system = fl.System(
+        (term_a & term_b) >> term_x,
+        (term_a | ~term_b) >> term_y
+    )
+
+    a, b = np.meshgrid(np.linspace(0.1, 1.9, 13), np.linspace(0.0, 1.9, 11))
+    result = system.evaluate_batch({'a': a, 'b': b})
+
+    assert result['x'].shape == a.shape
+    assert result['x'].ravel() == pytest.approx([
+        system(a=va, b=vb)['x'] for va, vb in zip(a.ravel(), b.ravel())
+    ])
+
+
+def test_cleanup_rules_not_adjacent():
+    """ Tests that rules with the same consequent are merged also when they are not adjacent. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TriangularMembership(0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_y = fl.Term('x', 'Y', fl.TriangularMembership(1, 2, 3))
+
+    rules = list(cleanup_rules([term_a >> term_x, term_b >> term_y, term_b >> term_x]))
+
+    assert [rule.consequent for rule in rules] == [term_x, term_y]
+    assert rules[0].antecedent.operands == (term_a, term_b)
+    assert len(fl.System(term_a >> term_x, term_b >> term_y, term_b >> term_x).program.centers['x']) == 2
+
+
+@pytest.mark.parametrize('options', [
+    dict(),
+    dict(sparse=True),
+    dict(compiled=False),
+    dict(defuzzifier=fl.Centroid(), operators=fl.ProductOperators()),
+    dict(defuzzifier=fl.Centroid(), operators=fl.ProductOperators(), sparse=True),
+], ids=['compiled', 'sparse', 'interpreted', 'centroid', 'sparse-centroid'])
+def test_add_remove_rule(options):
+    """ Tests that a system edited by adding and removing rules evaluates the same as a new system of its rules. """
+    rng = np.random.default_rng(0)
+    terms = [fl.Term(variable, f'{variable}{i}', fl.TriangularMembership(i, i + 1, i + 2)) for variable in 'ab' for i in range(4)]
+    consequents = [fl.Term(variable, f'{variable}{i}', fl.TriangularMembership(i, i + 1, i + 2)) for variable in 'xy' for i in range(3)]
+
+    def rule():
+        first, second = rng.choice(terms, 2, replace=False)
+        return rng.choice([first & second, first | ~second, first]) >> consequents[rng.integers(len(consequents))]
+
+    rules = [rule() for _ in range(5)]
+    system = fl.System(*rules, **options)
+    inputs = dict(a=rng.uniform(-1, 6, 50), b=rng.uniform(-1, 6, 50))
+    for step in range(40):
+        if rules and rng.uniform() < 0.4:
+            removed = rules.pop(rng.integers(len(rules)))
+            system.remove_rule(removed)
+        else:
+            rules.append(rule())
+            system.add_rule(rules[-1])
+
+        expected = fl.System(*rules, **options)
+        value, expected_value = system(a=1.5, b=2.5), expected(a=1.5, b=2.5)
+        assert list(value) == list(expected_value)
+        assert value == pytest.approx(expected_value, nan_ok=True)
+        result, expected_result = system.evaluate_batch(inputs), expected.evaluate_batch(inputs)
+        assert list(result) == list(expected_result)
+        for variable in result:
+            assert result[variable] == pytest.approx(expected_result[variable], nan_ok=True)
+
+    with pytest.raises(ValueError):
+        system.remove_rule(rule())
+
+
+@pytest.mark.parametrize('options', [dict(), dict(sparse=True), dict(compiled=False)], ids=['compiled', 'sparse', 'interpreted'])
+def test_add_rule_output_order(options):
+    """ Tests that added (and re-added) output variables are in the same order as in a new system. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    term_z = fl.Term('z', 'Z', fl.TriangularMembership(0, 1, 2))
+    system = fl.System(term_a >> term_z, **options)
+
+    system.add_rule(term_a >> term_x)
+    assert list(system(a=0.5)) == ['x', 'z']
+    assert list(system.evaluate_batch({'a': np.array([0.5])})) == ['x', 'z']
+
+    system.remove_rule(term_a >> term_z)
+    system.remove_rule(term_a >> term_x)
+    system.add_rule(term_a >> term_z)
+    system.add_rule(term_a >> term_x)
+    assert list(system(a=0.5)) == ['x', 'z']
+    assert list(system.evaluate_batch({'a': np.array([0.5])})) == ['x', 'z']
+
+
+def test_add_rule_profiling():
+    """ Tests that adding a rule while profiling starts a new profile of all the rules. """
+    term_a = fl.Term('a', 'A', fl.TriangularMembership(0, 1, 2))
+    term_b = fl.Term('b', 'B', fl.TriangularMembership(0, 1, 2))
+    term_x = fl.Term('x', 'X', fl.TriangularMembership(0, 1, 2))
+    system = fl.System(term_a >> term_x)
+    system.enable_profiling(bins=4)
+
+    system.add_rule(term_b >> term_x)
+    system(a=0.5, b=0.5)
+
+    assert system.profile.bins == 4
+    assert [rule['count'] for rule in system.profile.rules] == [1, 1]
+    assert system.disable_profiling() is not None
+    assert system(a=0.5, b=1.0) == {'x': 1.0}